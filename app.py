@@ -1,103 +1,159 @@
+import multiprocessing
+import os
 import sys
 
 import pandas as pd
-from PySide6.QtCore import QThread, Signal, Qt, QTimer, QCoreApplication, QObject, QEvent, Slot
+from PySide6.QtCore import Qt, QTimer, QObject, QEvent
+from PySide6.QtGui import QAction, QKeySequence
 from PySide6.QtWidgets import (QApplication, QMainWindow, QTableWidgetItem,
-                               QFileDialog, QMessageBox, QDialog, QTableWidget)
+                               QFileDialog, QMessageBox, QDialog, QTableWidget, QTableView)
 
-from text.compare_text import  fuzzy_match_column
+from text.compare_text import ENGINES, ENGINE_TFIDF, MatchCache, fuzzy_match_column, fuzzy_match_segments
+from utils import tracing
 from utils.config_set import config_instance
+from utils.dataframe_model import DataFrameTableModel
+from utils.db_writer import (DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE as WRITE_CHUNK_SIZE, DEFAULT_PARALLELISM,
+                             DEFAULT_PARTITION_SIZE, DEFAULT_RETRIES, bulk_write, get_engine, write_segments)
+from utils.db_staging import staged_load
+from utils.db_sync import sync_table
+from utils.write_tuner import (DEFAULT_MAX_BATCH_SIZE, DEFAULT_MIN_BATCH_SIZE, AdaptiveBatchSizer,
+                               format_throughput, save_run_summary)
+from utils.dtype_optimizer import format_report, optimize_dtypes
+from utils.df_cache import DataFrameCache
+from utils.batch_loader import load_workbooks
+from utils.excel_reader import DEFAULT_CHUNK_SIZE, concat_chunks
+from utils.file_reader import (BACKEND_AUTO, SUPPORTED_EXTENSIONS, choose_backend, format_read_report,
+                               iter_file_chunks, sheet_names)
+from utils.diagnostics_dialog import DiagnosticsDialog
+from utils.display_format import DisplayCache, format_frame, numeric_flags
 from utils.input_form_dialog import InputFormDialog
+from utils.pipeline_settings import WRITE_MODES, memory_budget, optimize_options, use_out_of_core
+from utils.segment_store import SegmentStore
+from utils.task_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, TaskScheduler
+from utils.tracing import span
 from ui.ui_general_excel import Ui_MainWindow
-from sqlalchemy import create_engine
 
 
-class Worker(QObject):
-    """通用工作线程类，用于在后台执行耗时操作"""
+def load_file_task(task, file_path, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, optimize=None, store=None,
+                   backend=BACKEND_AUTO, read_report=None, all_sheets=False, max_workers=None):
+    """文件加载任务，单次解析文件（Excel / CSV / Parquet）并按块发送事件
+
+    事件：preview（第一个数据块）、chunk（后续数据块）、full（合并后的完整数据）、
+    segment（磁盘分段模式下已写入的总行数）、spilled（磁盘分段模式下全部数据写入完成）。
+    每个数据块之前检查取消，打开其它文件后旧文件的解析在下一个块结束。
+    all_sheets 为 True 且工作簿有多个工作表时改为 load_files_task 的方式读取所有工作表，
+    发送 file_progress 事件，最后发送 sheets（合并后的完整数据）。
+
+    :param optimize: optimize_dtypes 的参数，为 None 时不压缩列类型
+    :param store: 磁盘分段存储，不为 None 时数据块写入磁盘而不在内存中合并
+    :param read_report: 解析统计，命中缓存时为空
+    :param all_sheets: 是否读取多工作表工作簿的所有工作表（batch.all_sheets）
+    """
+    if read_report is None:
+        read_report = {}
+    # 在加载线程中检查工作表个数，避免打开工作簿阻塞界面
+    if all_sheets and len(sheet_names(file_path, backend)) > 1:
+        task.emit("sheets", load_files_task(task, [file_path], max_workers, optimize, backend))
+        return
+    if store is not None:
+        # 磁盘分段模式：每个数据块写成一个段，内存中只保留当前数据块
+        for chunk in iter_file_chunks(file_path, chunk_size, preferred=backend, streaming=True,
+                                      report=read_report):
+            task.check()
+            store.append(chunk)
+            task.emit("segment", len(store))
+        task.span.set(rows=read_report.get("rows"), backend=read_report.get("backend"), spill=True)
+        task.emit("spilled")
+        return
+
+    # 文件未修改时直接读取缓存，跳过Excel解析；缓存的是压缩后的数据，后端、工作表和压缩设置也计入缓存键
+    variant = None
+    if cache:
+        variant = {"backend": choose_backend(file_path, backend)[0].name, "sheet": 0, "optimize": optimize}
+    cached_df = cache.get(file_path, variant) if cache else None
+    if cached_df is not None:
+        task.span.set(rows=len(cached_df), cached=True)
+        task.emit("preview", cached_df.head(chunk_size))
+        task.emit("full", cached_df)
+        return
+
+    chunks = []
+    for chunk in iter_file_chunks(file_path, chunk_size, preferred=backend, report=read_report):
+        task.check()
+        # 第一个数据块作为预览数据
+        task.emit("chunk" if chunks else "preview", chunk)
+        chunks.append(chunk)
+
+    # 合并所有数据块
+    full_df = concat_chunks(chunks)
+    full_df.attrs["read_report"] = read_report
+    task.span.set(rows=len(full_df), backend=read_report.get("backend"))
+    if optimize is not None:
+        task.check()
+        # 压缩列类型，缓存中保存的也是压缩后的数据
+        full_df, report = optimize_dtypes(full_df, **optimize)
+        full_df.attrs["dtype_optimization"] = report
+    task.check()
+    task.emit("full", full_df)
+
+    if cache:
+        cache.put(file_path, full_df, variant)
+
+
+def load_files_task(task, file_paths, max_workers=None, optimize=None, backend=BACKEND_AUTO):
+    """多文件加载任务，在子进程中并行解析所有工作簿的所有工作表并合并
+
+    事件：file_progress（文件路径, 已完成工作表数, 工作表总数）；返回合并后的 DataFrame。
+    """
+    df = load_workbooks(file_paths, max_workers, backend=backend, token=task.token,
+                        progress_callback=lambda *progress: task.emit("file_progress", progress))
+    if optimize is not None:
+        task.check()
+        stats = df.attrs["batch_load"]
+        df, report = optimize_dtypes(df, **optimize)
+        df.attrs["batch_load"] = stats
+        df.attrs["dtype_optimization"] = report
+    task.span.set(rows=len(df))
+    return df
+
+
+# 表格填充任务每次发往主线程的行数
+POPULATE_BLOCK_ROWS = 2000
+
+
+def populate_rows_task(task, dataframe, block_rows=POPULATE_BLOCK_ROWS):
+    """按行块加载DataFrame到表格的任务
+
+    事件：header（列名列表）、rows（起始行号, 各列显示文本数组）；每个行块发送一次事件和进度，
+    跨线程事件数为 行数/block_rows 而不是行数。每个行块之前检查取消，被新的数据取代后立即停止。
+    """
+    total_rows = len(dataframe)
+
+    # 先发送列名
+    task.emit("header", dataframe.columns.tolist())
+
+    for start in range(0, total_rows, block_rows):
+        task.check()
+        end = min(start + block_rows, total_rows)
+        # 整块按列向量化格式化，主线程只需按下标创建单元格
+        task.emit("rows", (start, format_frame(dataframe.iloc[start:end])))
+        task.progress(int(end / total_rows * 100))
+
+
+def write_task(task, func, *args, sizer=None, **kwargs):
+    """数据库写入任务：进度通过 progress 发送，每批写入后的吞吐量统计通过 telemetry 事件发送
+
+    写入不检查取消，已开始的写入总是执行完毕，避免留下写了一半的事务。
+    """
+    if sizer is not None:
+        sizer.on_batch = lambda stats: task.emit("telemetry", stats)
+    try:
+        return func(*args, progress_callback=task.progress, sizer=sizer, **kwargs)
+    finally:
+        if sizer is not None:
+            sizer.on_batch = None
 
-    finished = Signal(object)  # 操作完成信号，携带结果
-    error = Signal(tuple)  # 错误信号，携带异常类型和异常信息
-    progress = Signal(int)  # 进度信号，携带进度值(0-100)
 
-    def __init__(self, func, *args, **kwargs):
-        """
-        初始化工作线程
-
-        参数:
-            func: 要在后台执行的函数
-            *args: 传递给函数的位置参数
-            **kwargs: 传递给函数的关键字参数
-        """
-        super().__init__()
-        self.func = func
-        self.args = args
-        self.kwargs = kwargs
-        # 检查函数是否支持进度回调
-        if 'progress_callback' not in self.func.__code__.co_varnames:
-            self.kwargs.pop('progress_callback', None)
-        else:
-            self.kwargs['progress_callback'] = self.progress_callback
-
-    @Slot()
-    def run(self):
-        """执行工作函数，处理结果和异常"""
-        try:
-            result = self.func(*self.args, **self.kwargs)
-        except Exception as e:
-            # 发送错误信号
-            self.error.emit((type(e), str(e)))
-        else:
-            # 发送完成信号和结果
-            self.finished.emit(result)
-
-    def progress_callback(self, value):
-        """进度回调函数，用于发送进度信号"""
-        self.progress.emit(value)
-
-
-'''
-if hasattr(self, 'thread') and self.thread.isRunning():
-            return
-
-self.thread = QThread()
-self.worker = Worker(long_running_task, 10)  # 执行10秒的任务
-
-self.worker.progress.connect(self.update_progress)
-self.worker.finished.connect(self.task_finished)
-self.worker.error.connect(self.task_error)
-
-# 线程管理
-self.thread.started.connect(self.worker.run)
-self.worker.finished.connect(self.thread.quit)
-self.worker.finished.connect(self.worker.deleteLater)
-self.thread.finished.connect(self.thread.deleteLater)
-
-self.thread.start()
-'''
-
-
-class ExcelLoaderThread(QThread):
-    """Excel文件加载线程"""
-    preview_ready = Signal(pd.DataFrame)  # 预览数据就绪信号
-    full_data_ready = Signal(pd.DataFrame)  # 完整数据就绪信号
-    error = Signal(str)  # 错误信号
-
-    def __init__(self, file_path):
-        super().__init__()
-        self.file_path = file_path
-
-    def run(self):
-        """线程执行的主要任务"""
-        try:
-            # 读取前20行作为预览数据
-            preview_df = pd.read_excel(self.file_path, nrows=20)
-            self.preview_ready.emit(preview_df)
-
-            # 读取完整数据
-            full_df = pd.read_excel(self.file_path)
-            self.full_data_ready.emit(full_df)
-        except Exception as e:
-            self.error.emit(str(e))
 
 
 class EnterKeyFilter(QObject):
@@ -115,69 +171,63 @@ class EnterKeyFilter(QObject):
         return super().eventFilter(obj, event)
 
 
-class DataFrameLoader(QThread):
-    """简化的工作线程，用于加载DataFrame到表格"""
-    progress_updated = Signal(int)  # 进度信号(0-100)
-    row_loaded = Signal(int, list)  # 行加载信号(行号, 行数据)
-    loading_complete = Signal()  # 加载完成信号
-    error_occurred = Signal(str)  # 错误信号
-
-    def __init__(self, dataframe):
-        super().__init__()
-        self.dataframe = dataframe
-
-    def run(self):
-        """线程主方法"""
-        try:
-            total_rows = len(self.dataframe)
-            columns = self.dataframe.columns.tolist()
-
-            # 先发送列名
-            self.row_loaded.emit(-1, columns)
-
-            # 逐行加载数据
-            for row_idx in range(total_rows):
-                row_data = [
-                    str(self.dataframe.iloc[row_idx, col])
-                    if pd.notna(self.dataframe.iloc[row_idx, col])
-                    else ""
-                    for col in range(len(columns))
-                ]
-                self.row_loaded.emit(row_idx, row_data)
-
-                # 每10行更新一次进度
-                if row_idx % 10 == 0:
-                    progress = int((row_idx + 1) / total_rows * 100)
-                    self.progress_updated.emit(progress)
-
-            self.loading_complete.emit()
-
-        except Exception as e:
-            self.error_occurred.emit(str(e))
-
 class MyMainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.worker = None
-        self.thread = None
+        self.write_sizer = None
+        self.write_progress = 0
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
         self.setAcceptDrops(True)
 
+        # 后台任务调度器：加载（load）、表格填充（populate）、写入（write）各为一个分组，
+        # 打开新文件时自动取消仍在进行的旧加载
+        self.scheduler = TaskScheduler(self, max_threads=config_instance.get('scheduler.max_threads'))
+
         # 初始化变量
-        self.excel_thread = None
+        self.loading_file = None  # 正在加载的文件路径
+        self.read_report = {}  # 正在加载的文件的解析统计，命中缓存时为空
+        self.batch_progress = {}  # 多文件加载时每个文件的 (已完成工作表数, 工作表总数)
         self.df = None
+        self.store = None  # 磁盘分段模式下的数据源，此时 self.df 为 None
+        self.write_store = None  # 正在写入数据库的磁盘分段存储，写入结束前不删除段文件
         self.loading_timer = None
         self.batch_size = 500  # 每批处理行数
+        self.preview_rows = 20  # widget模式下预览显示的行数
+        # widget模式下的显示文本缓存：每列按行块向量化格式化一次，分批渲染和重新加载时复用
+        self.display_cache = DisplayCache()
+        self.display_frame = None  # 缓存对应的DataFrame，换成其它数据时清空缓存
+        self.display_numeric = []  # 逐行加载DataFrame时各列是否右对齐
         self.current_row = 0
         self.is_preview = True  # 是否处于预览状态
 
         # 已经选择的所在列名称
         self.selected_headers = []
 
-        self.df_thread = None
-        self.df_worker = None
+        # 匹配结果缓存，重复匹配相同数据时几乎无需重新打分
+        self.match_cache = MatchCache(max_entries=config_instance.get('match.cache_size', 100000))
+
+        # 解析结果的磁盘缓存，重新打开未修改的文件时无需再次解析
+        self.df_cache = None
+        if config_instance.get('cache.enabled', True):
+            self.df_cache = DataFrameCache(
+                config_instance.get('cache.dir', '.cache'),
+                max_bytes=int(config_instance.get('cache.max_mb', 1024)) * 1024 * 1024,
+            )
 
+        # 表格显示模式：model 为按需读取DataFrame的虚拟化视图，widget 为逐单元格创建的QTableWidget
+        self.table_mode = config_instance.get('table_mode', 'model')
+        self.table_model = DataFrameTableModel(self)
+        self.table_view = QTableView(self.ui.centralwidget)
+        self.table_view.setObjectName(u"tableView")
+        self.table_view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.table_view.setStyleSheet(self.ui.tableWidget.styleSheet().replace("QTableWidget", "QTableView"))
+        self.table_view.setModel(self.table_model)
+        self.ui.gridLayout.addWidget(self.table_view, 0, 0, 1, 2)
+        if self.table_mode == 'model':
+            self.ui.tableWidget.hide()
+        else:
+            self.table_view.hide()
 
         # **新增：设置状态栏样式表（全局修改颜色）**
         self.statusBar().setStyleSheet("""
@@ -187,6 +237,14 @@ class MyMainWindow(QMainWindow):
                            }
                        """)
 
+        # 阶段追踪：开启后记录加载、填充、匹配、写入各阶段的耗时，可在"诊断"菜单中查看汇总
+        tracing.configure_from(config_instance)
+        diagnostics_menu = self.ui.menubar.addMenu("诊断")
+        diagnostics_action = QAction("性能诊断", self)
+        diagnostics_action.setShortcut(QKeySequence("F12"))
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        diagnostics_menu.addAction(diagnostics_action)
+
         # 加载上次的文件
         last_path = config_instance.get('last_opened_file', None)
         if last_path:
@@ -194,6 +252,7 @@ class MyMainWindow(QMainWindow):
 
         # 连接选择变化信号到自定义槽函数
         self.ui.tableWidget.selectionModel().selectionChanged.connect(self.update_selected_headers)
+        self.table_view.selectionModel().selectionChanged.connect(self.update_selected_headers)
 
         # 连接写入数据库按钮
         self.ui.pushButton.clicked.connect(self.to_mysql)
@@ -201,6 +260,21 @@ class MyMainWindow(QMainWindow):
         # 连接匹配按钮
         self.ui.compare.clicked.connect(self.compare_clicked)
 
+    def show_diagnostics(self):
+        """打开性能诊断窗口"""
+        dialog = DiagnosticsDialog(self, log_file=config_instance.get('tracing.log_file', tracing.DEFAULT_LOG_FILE))
+        dialog.exec()
+
+    @property
+    def use_model(self):
+        """是否使用基于DataFrame模型的虚拟化表格"""
+        return self.table_mode == 'model'
+
+    @property
+    def table(self):
+        """当前显示模式下的表格控件"""
+        return self.table_view if self.use_model else self.ui.tableWidget
+
     # ----------------------------加载df----------------------------
     # 添加一个加载方法
     def load_dataframe_safely(self, df):
@@ -209,19 +283,18 @@ class MyMainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "无效的DataFrame数据")
             return
 
-        # 停止任何正在运行的线程
-        if hasattr(self, 'loader_thread') and self.loader_thread.isRunning():
-            self.loader_thread.quit()
-            self.loader_thread.wait()
-
-        # 创建并启动线程
-        self.loader_thread = DataFrameLoader(df)
+        # 放弃仍在进行的表格填充，旧数据之后发出的行不再显示
+        self.scheduler.cancel("populate")
+        if self.use_model:
+            # 模型模式下直接替换底层数据，无需逐行加载
+            self.df = df
+            self.table_model.set_dataframe(df)
+            self.table_view.resizeColumnsToContents()
+            self.statusBar().showMessage("数据加载完成", 3000)
+            return
 
-        # 连接信号
-        self.loader_thread.row_loaded.connect(self._update_table_row)
-        self.loader_thread.progress_updated.connect(self._update_progress)
-        self.loader_thread.loading_complete.connect(self._loading_finished)
-        self.loader_thread.error_occurred.connect(self._loading_error)
+        # 列对齐方式按 dtype 判断一次
+        self.display_numeric = numeric_flags(df.dtypes)
 
         # 准备表格
         self.ui.tableWidget.clear()
@@ -231,40 +304,62 @@ class MyMainWindow(QMainWindow):
         # 显示加载状态
         self.statusBar().showMessage("正在加载数据...", 0)
 
-        # 启动线程
-        self.loader_thread.start()
-
-    def _update_table_row(self, row_idx, row_data):
-        """更新表格行数据"""
-        if row_idx == -1:  # 这是列名
-            self.ui.tableWidget.setHorizontalHeaderLabels(row_data)
-        else:
-            for col_idx, value in enumerate(row_data):
-                item = QTableWidgetItem(value)
-                # 设置数字右对齐
-                if value.replace('.', '', 1).isdigit():
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.ui.tableWidget.setItem(row_idx, col_idx, item)
-
-        # 处理事件循环，保持UI响应
-        QCoreApplication.processEvents()
+        # 提交填充任务
+        self.scheduler.submit(
+            populate_rows_task, df,
+            name="populate_rows", group="populate", priority=PRIORITY_NORMAL, fields={"rows": len(df)},
+            on_event=self._on_populate_event,
+            on_progress=self._update_progress,
+            on_result=self._loading_finished,
+            on_error=self._loading_error,
+        )
+
+    def _on_populate_event(self, event, payload):
+        """表格填充任务的事件：列名或一个行块"""
+        if event == "header":
+            self.ui.tableWidget.setHorizontalHeaderLabels(payload)
+        elif event == "rows":
+            self._apply_rows(*payload, self.display_numeric)
+
+    def _apply_rows(self, start_row, texts, numeric):
+        """将一个行块的显示文本一次性写入表格
+
+        写入期间屏蔽信号并暂停重绘，整块只触发一次刷新；各行块之间回到事件循环，
+        不再逐行调用 processEvents。
+
+        :param start_row: 行块的起始行号
+        :param texts: 各列的显示文本数组
+        :param numeric: 各列是否右对齐
+        """
+        table = self.ui.tableWidget
+        align_right = Qt.AlignRight | Qt.AlignVCenter
+        signals_blocked = table.blockSignals(True)
+        table.setUpdatesEnabled(False)
+        try:
+            for col, column in enumerate(texts):
+                right = numeric[col]
+                for offset, text in enumerate(column):
+                    item = QTableWidgetItem(text)
+                    if right:
+                        item.setTextAlignment(align_right)
+                    table.setItem(start_row + offset, col, item)
+        finally:
+            table.setUpdatesEnabled(True)
+            table.blockSignals(signals_blocked)
 
     def _update_progress(self, progress):
         """更新进度"""
         self.statusBar().showMessage(f"加载进度: {progress}%", 0)
 
-    def _loading_finished(self):
+    def _loading_finished(self, _result=None):
         """加载完成处理"""
         self.ui.tableWidget.resizeColumnsToContents()
         self.statusBar().showMessage("数据加载完成", 3000)
-        self.loader_thread.quit()
 
-    def _loading_error(self, error_msg):
+    def _loading_error(self, error):
         """加载错误处理"""
         self.statusBar().showMessage("加载出错", 3000)
-        QMessageBox.critical(self, "错误", f"加载数据时出错:\n{error_msg}")
-        if hasattr(self, 'loader_thread'):
-            self.loader_thread.quit()
+        QMessageBox.critical(self, "错误", f"加载数据时出错:\n{error[1]}")
 
     # ----------------------------加载df end----------------------------
 
@@ -272,64 +367,275 @@ class MyMainWindow(QMainWindow):
         length = len(self.selected_headers)
         print(length,self.selected_headers)
         if length == 2:
-            df_result = fuzzy_match_column(
-                self.df,
+            engine = config_instance.get('match.engine', 'cdist')
+            n_best = config_instance.get('match.n_best', 1)
+            form_structure = [
+                {"label": "匹配引擎", "type": "combo", "items": list(ENGINES), "default": engine},
+                {"label": "输出匹配个数（仅tfidf）", "type": "spinbox", "default": n_best},
+            ]
+            dialog = InputFormDialog(form_structure, self)
+            if dialog.exec() != QDialog.Accepted:
+                return
+            engine, n_best = dialog.get_input_values()
+            n_best = max(1, n_best) if engine == ENGINE_TFIDF else 1
+            config_instance.update({"match": {"engine": engine, "n_best": n_best}}, save=True)
+
+            options = dict(
                 source_col=self.selected_headers[0],
-                candidate_col=self.selected_headers[1]
+                candidate_col=self.selected_headers[1],
+                cache=self.match_cache,
+                engine=engine,
+                top_k=config_instance.get('match.top_k', 20),
+                scan_ratio=config_instance.get('match.scan_ratio', 0.5),
+                n_best=n_best
             )
+            try:
+                if self.store is not None:
+                    # 磁盘分段模式：逐段匹配，结果列写回各段
+                    stats = fuzzy_match_segments(self.store, **options)
+                else:
+                    df_result = fuzzy_match_column(self.df, **options)
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"匹配失败:\n{e}")
+                return
+
+            if self.store is not None:
+                self.table_model.set_store(self.store)
+                self.table_view.resizeColumnsToContents()
+                self._show_match_stats(stats)
+                return
 
             # 加载新的DataFrame
             self.load_dataframe_safely(df_result)
+            self._show_match_stats(df_result.attrs.get("fuzzy_match"))
+
+    def _show_match_stats(self, stats):
+        """在状态栏显示去重率和缓存命中情况"""
+        if not stats or not stats["rows"]:
+            return
+        ratio = 1 - stats["unique"] / stats["rows"]
+        self.statusBar().showMessage(
+            f"匹配完成：{stats['rows']}行去重后{stats['unique']}个值（去重率{ratio:.1%}），"
+            f"归一化精确命中{stats['exact']}个，缓存命中{stats['cache_hits']}个", 5000
+        )
+
 
+    @staticmethod
+    def _dropped_files(event):
+        """拖入的所有支持的文件路径（Excel、CSV、Parquet）"""
+        if not event.mimeData().hasUrls():
+            return []
+        paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        return [path for path in paths if path.lower().endswith(SUPPORTED_EXTENSIONS)]
 
     def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls():
-            if event.mimeData().urls()[0].toLocalFile().lower().endswith(('.xlsx', '.xls')):
-                event.acceptProposedAction()
-            else:
-                event.ignore()
+        if self._dropped_files(event):
+            event.acceptProposedAction()
         else:
             event.ignore()
 
     def dropEvent(self, event):
-        if event.mimeData().hasUrls():
-            file_path = event.mimeData().urls()[0].toLocalFile()
-            self.open_file(file_path)
-            event.acceptProposedAction()
-        else:
+        file_paths = self._dropped_files(event)
+        if not file_paths:
             event.ignore()
+            return
+        if len(file_paths) > 1:
+            self.open_files(file_paths)
+        else:
+            self.open_file(file_paths[0])
+        event.acceptProposedAction()
+
+    def closeEvent(self, event):
+        """关闭窗口时取消后台任务（等待写入完成）并删除磁盘分段文件"""
+        self._cancel_loading()
+        self.scheduler.shutdown()
+        self._close_store()
+        self._release_write_store()
+        super().closeEvent(event)
 
     def open_file(self, file_path=None):
-        """打开Excel文件，支持拖放和手动选择"""
+        """打开Excel、CSV或Parquet文件，支持拖放和手动选择"""
         if not file_path:
-            file_path, _ = QFileDialog.getOpenFileName(
-                self, "选择Excel文件", "", "Excel Files (*.xlsx *.xls)"
+            file_paths, _ = QFileDialog.getOpenFileNames(
+                self, "选择数据文件", "",
+                "Data Files (*.xlsx *.xlsm *.xls *.csv *.parquet);;Excel Files (*.xlsx *.xlsm *.xls);;"
+                "CSV Files (*.csv);;Parquet Files (*.parquet)"
             )
+            if len(file_paths) > 1:
+                self.open_files(file_paths)
+                return
+            file_path = file_paths[0] if file_paths else None
 
         if file_path:
+            # 上一个文件仍在加载或填充时放弃它
+            self._cancel_loading()
             # 清空表格
-            self.ui.tableWidget.setRowCount(0)
-            self.ui.tableWidget.setColumnCount(0)
+            self._close_store()
+            if self.use_model:
+                self.table_model.set_dataframe(pd.DataFrame())
+            else:
+                self.ui.tableWidget.setRowCount(0)
+                self.ui.tableWidget.setColumnCount(0)
 
             # 显示加载中状态
             self.statusBar().showMessage("正在加载文件...", 0)
 
-            # 创建并启动Excel加载线程
-            self.excel_thread = ExcelLoaderThread(file_path)
-            self.excel_thread.preview_ready.connect(self._show_preview)
-            self.excel_thread.full_data_ready.connect(self._on_full_data_ready)
-            self.excel_thread.error.connect(lambda msg: self._show_error(f"读取失败: {msg}"))
-            self.excel_thread.start()
+            # 提交文件加载任务
+            optimize = optimize_options(config_instance)
+            if self._use_out_of_core(file_path):
+                # 超出内存预算的文件解析后写入磁盘分段，表格滚动时按段读取
+                self.df = None
+                self.store = SegmentStore(config_instance.get('out_of_core.dir', '.cache/segments'),
+                                          cache_bytes=memory_budget(config_instance))
+                self.table_model.set_store(self.store)
+            self.loading_file = file_path
+            self.read_report = {}
+            self.batch_progress = {file_path: (0, 0)}
+            self.scheduler.submit(
+                load_file_task, file_path,
+                cache=self.df_cache, optimize=optimize, store=self.store, read_report=self.read_report,
+                backend=config_instance.get('reader.backend', BACKEND_AUTO),
+                all_sheets=config_instance.get('batch.all_sheets', False),
+                max_workers=config_instance.get('batch.max_workers'),
+                name="load_file", group="load", priority=PRIORITY_INTERACTIVE,
+                fields={"file": os.path.basename(file_path)},
+                on_event=self._on_load_event,
+                on_error=lambda error: self._show_error(f"读取失败: {error[1]}"),
+            )
+
+    def _on_load_event(self, event, payload):
+        """文件加载任务的事件，只有当前文件的事件会送达"""
+        if event == "preview":
+            self._show_preview(payload)
+        elif event == "chunk":
+            self._on_chunk_ready(payload)
+        elif event == "full":
+            self._on_full_data_ready(payload)
+        elif event == "segment":
+            self._on_segment_ready(payload)
+        elif event == "spilled":
+            self._finish_file_loading()
+        elif event == "file_progress":
+            self._on_file_progress(*payload)
+        elif event == "sheets":
+            # 按多工作表方式读取时不使用磁盘分段
+            self._close_store()
+            self._on_batch_loaded(payload)
+            self._remember_file(self.loading_file)
+
+    def _cancel_loading(self):
+        """放弃正在进行的文件加载和表格填充，旧任务之后发出的数据不再显示"""
+        self.scheduler.cancel("load")
+        self.scheduler.cancel("populate")
+        if self.loading_timer is not None:
+            self.loading_timer.stop()
+            self.loading_timer = None
+
+    def open_files(self, file_paths):
+        """并行加载多个工作簿的所有工作表，合并后增加来源文件和来源工作表列"""
+        # 上一个文件或上一批文件仍在加载时放弃它
+        self._cancel_loading()
+        self._close_store()
+        if self.use_model:
+            self.table_model.set_dataframe(pd.DataFrame())
+        else:
+            self.ui.tableWidget.setRowCount(0)
+            self.ui.tableWidget.setColumnCount(0)
+
+        self.batch_progress = {path: (0, 0) for path in file_paths}
+        self.statusBar().showMessage(f"正在并行解析{len(file_paths)}个文件...", 0)
+
+        self.scheduler.submit(
+            load_files_task, list(file_paths),
+            max_workers=config_instance.get('batch.max_workers'),
+            optimize=optimize_options(config_instance),
+            backend=config_instance.get('reader.backend', BACKEND_AUTO),
+            name="load_files", group="load", priority=PRIORITY_NORMAL, fields={"files": len(file_paths)},
+            on_event=lambda event, progress: self._on_file_progress(*progress),
+            on_result=self._on_batch_loaded,
+            on_error=self._on_batch_error,
+        )
+
+    def _on_file_progress(self, file_path, done, total):
+        """显示每个文件的解析进度"""
+        self.batch_progress[file_path] = (done, total)
+        finished = sum(1 for d, t in self.batch_progress.values() if t and d >= t)
+        self.statusBar().showMessage(
+            f"已完成{finished}/{len(self.batch_progress)}个文件，"
+            f"{os.path.basename(file_path)}：工作表{done}/{total}", 0
+        )
+
+    def _on_batch_loaded(self, df):
+        """多文件数据合并完成"""
+        stats = df.attrs.get("batch_load", {})
+        report = df.attrs.get("dtype_optimization")
+        self.load_dataframe_safely(df)
+
+        message = f"已加载{stats.get('files', 0)}个文件的{stats.get('sheets', 0)}个工作表，共{len(df)}行，耗时{stats.get('seconds', 0)}秒"
+        if report:
+            message += f"，{format_report(report)}"
+        self.statusBar().showMessage(message, 5000)
+
+        errors = stats.get("errors")
+        if errors:
+            QMessageBox.warning(
+                self, "警告",
+                "以下文件读取失败：\n" + "\n".join(f"{os.path.basename(path)}: {msg}" for path, msg in errors.items())
+            )
+        if config_instance.get('batch.write_after_load', False):
+            # 全部文件合并后一次性写入数据库
+            self.to_mysql()
+
+    def _on_batch_error(self, error):
+        self._show_error(f"读取失败: {error[1]}")
+
+    def _use_out_of_core(self, file_path):
+        """按 out_of_core.mode 判断是否使用磁盘分段模式（仅 model 显示模式支持）"""
+        return self.use_model and use_out_of_core(config_instance, file_path)
+
+    def _close_store(self):
+        """关闭当前的磁盘分段存储并删除段文件
+
+        写入任务仍在逐段读取该存储时只与界面分离，段文件在写入结束后由 _release_write_store 删除。
+        """
+        if self.store is None:
+            return
+        store, self.store = self.store, None
+        self.table_model.set_dataframe(pd.DataFrame())
+        if store is not self.write_store:
+            store.close()
+
+    def _release_write_store(self, _handle=None):
+        """写入任务结束后，删除期间已被其它文件替换的磁盘分段存储"""
+        store, self.write_store = self.write_store, None
+        if store is not None and store is not self.store:
+            store.close()
+
+    def _on_segment_ready(self, total_rows):
+        """磁盘分段模式下新的段写入完成后，表格追加显示新增的行"""
+        first = self.table_model.rowCount() == 0
+        self.table_model.store_rows_appended()
+        if first:
+            self.table_view.resizeColumnsToContents()
+        self.statusBar().showMessage(f"已加载{total_rows}行（磁盘分段），正在继续解析...", 0)
 
     def _show_preview(self, preview_df):
         """显示数据预览"""
         self.df = preview_df
         self.is_preview = True
 
+        if self.use_model:
+            # 第一个数据块直接显示，后续数据块解析完成后陆续追加
+            self.statusBar().showMessage(f"已加载{preview_df.shape[0]}行，正在继续解析...", 0)
+            self.table_model.set_dataframe(preview_df)
+            self.table_view.resizeColumnsToContents()
+            return
+
         # 在状态栏显示预览提示
-        self.statusBar().showMessage("数据预览中（前20行），正在加载完整数据...", 0)
+        self.statusBar().showMessage(f"数据预览中（前{self.preview_rows}行），正在加载完整数据...", 0)
 
         # 设置表格结构并加载预览数据
+        preview_df = preview_df.head(self.preview_rows)
         table = self.ui.tableWidget
         table.setRowCount(preview_df.shape[0])
         table.setColumnCount(preview_df.shape[1])
@@ -338,16 +644,30 @@ class MyMainWindow(QMainWindow):
         self._load_data_batch(preview_df)
         table.resizeColumnsToContents()
 
+    def _on_chunk_ready(self, chunk):
+        """流式解析的后续数据块就绪后的处理"""
+        if not self.use_model:
+            return
+        self.table_model.append_dataframe(chunk)
+        self.statusBar().showMessage(f"已加载{self.table_model.rowCount()}行，正在继续解析...", 0)
+
     def _on_full_data_ready(self, full_df):
         """完整数据就绪后的处理"""
         self.df = full_df
-        self.current_row = 20  # 从第20行开始加载
+        self.current_row = min(self.preview_rows, full_df.shape[0])  # 从预览之后开始加载
         self.is_preview = False
 
         # 更新状态栏消息
         total_rows = full_df.shape[0]
         self.statusBar().showMessage(f"正在加载完整数据（共{total_rows}行）", 0)
 
+        if self.use_model:
+            # 模型模式下只需替换底层数据，视图只格式化可见行
+            self.table_model.set_dataframe(full_df)
+            self.table_view.resizeColumnsToContents()
+            self._finish_file_loading()
+            return
+
         # 更新表格行数为完整数据行数
         self.ui.tableWidget.setRowCount(full_df.shape[0])
 
@@ -361,56 +681,61 @@ class MyMainWindow(QMainWindow):
         if end_row is None:
             end_row = df.shape[0]
 
-        table = self.ui.tableWidget
-
-        for row in range(start_row, end_row):
-            for col in range(df.shape[1]):
-                value = df.iloc[row, col]
-                item = QTableWidgetItem(str(value) if pd.notna(value) else "")
-
-                if isinstance(value, (int, float)):
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                elif isinstance(value, pd.Timestamp):
-                    item.setText(value.strftime("%Y-%m-%d %H:%M:%S"))
-
-                table.setItem(row, col, item)
-
-                # **关键优化：每处理50行释放一次事件循环（避免长时间阻塞UI）**
-                if (row - start_row) % 50 == 0:
-                    QCoreApplication.processEvents()  # 主动释放控制权，刷新UI
+        if df is not self.display_frame:
+            self.display_cache.clear()
+            self.display_frame = df
+        # 整列向量化格式化（按行块缓存），对齐方式按 dtype 判断一次
+        texts = [
+            self.display_cache.column(col, df.iloc[:, col].array, start_row, end_row)
+            for col in range(df.shape[1])
+        ]
+        # 每批一次性写入，批与批之间由定时器回到事件循环
+        self._apply_rows(start_row, texts, numeric_flags(df.dtypes))
 
     def _load_next_batch(self):
         """分批次加载剩余数据"""
         if self.current_row >= self.df.shape[0]:
             self.loading_timer.stop()
             self.ui.tableWidget.resizeColumnsToContents()
-
-            # 更新状态栏为加载完成
-            total_rows = self.df.shape[0]
-            self.statusBar().showMessage(f"数据加载完成（共{total_rows}行）", 5000)
-
-            # 保存文件路径
-            config_instance.update({
-                'last_opened_file': self.excel_thread.file_path
-            })
-            config_instance.save()
-            self.excel_thread = None
+            self._finish_file_loading()
             return
 
         end_row = min(self.current_row + self.batch_size, self.df.shape[0])
-        self._load_data_batch(self.df, self.current_row, end_row)
+        with span("load_next_batch", rows=end_row - self.current_row):
+            self._load_data_batch(self.df, self.current_row, end_row)
 
         # 更新状态栏显示加载进度
         progress = f"{self.current_row}/{self.df.shape[0]}"
         self.statusBar().showMessage(f"正在加载: {progress}", 0)
         self.current_row = end_row
 
+    def _finish_file_loading(self):
+        """文件完整加载后更新状态栏并记录文件路径"""
+        # 更新状态栏为加载完成
+        if self.store is not None:
+            message = f"数据加载完成（共{len(self.store)}行，磁盘分段模式）"
+        else:
+            message = f"数据加载完成（共{self.df.shape[0]}行）"
+            report = self.df.attrs.get("dtype_optimization")
+            if report:
+                message += f"，{format_report(report)}"
+        if self.read_report:
+            message += f"，{format_read_report(self.read_report)}"
+        self.statusBar().showMessage(message, 5000)
+        self._remember_file(self.loading_file)
+
+    @staticmethod
+    def _remember_file(file_path):
+        """保存文件路径，下次启动时自动打开"""
+        config_instance.update({
+            'last_opened_file': file_path
+        })
+        config_instance.save()
+
     def _show_error(self, message):
-        """显示错误消息并清理资源"""
+        """显示错误消息"""
         self.statusBar().clearMessage()
         QMessageBox.critical(self, "错误", message)
-        if self.excel_thread:
-            self.excel_thread = None
 
     def to_mysql(self):
         user = config_instance.get('user')
@@ -424,6 +749,12 @@ class MyMainWindow(QMainWindow):
             {"label": "数据库名称", "type": "text", "default": db_name},
             {"label": "表名称", "type": "text", "default": table_name},
             {"label": "主机地址", "type": "text", "default": host},
+            {"label": "写入模式", "type": "combo", "items": list(WRITE_MODES),
+             "default": config_instance.get('write.mode', '追加')},
+            {"label": "主键列（增量同步，逗号分隔）", "type": "text",
+             "default": ",".join(config_instance.get('write.key_columns', []))},
+            {"label": "删除数据中已不存在的行（增量同步）", "type": "combo", "items": ["否", "是"],
+             "default": "是" if config_instance.get('write.delete_missing', False) else "否"},
         ]
 
         dialog = InputFormDialog(form_structure, self)
@@ -434,6 +765,9 @@ class MyMainWindow(QMainWindow):
             db_name = values[2]
             table_name = values[3]
             host = values[4]
+            mode = values[5]
+            key_columns = [col.strip() for col in values[6].split(",") if col.strip()]
+            delete_missing = values[7] == "是"
 
             config_instance.update(
                 {
@@ -442,21 +776,143 @@ class MyMainWindow(QMainWindow):
                     "db_name": db_name,
                     "table_name": table_name,
                     "host": host,
+                    "write": {
+                        "mode": mode,
+                        "key_columns": key_columns,
+                        "delete_missing": delete_missing,
+                    },
                 }, save=True
             )
 
-            engine = create_engine(f'mysql+pymysql://{user}:{password}@{host}/{db_name}')
-            self.df.to_sql(table_name, engine, if_exists='append', index=False)
+            if self.scheduler.is_busy("write"):
+                QMessageBox.warning(self, "警告", "上一次写入尚未完成")
+                return
+            if self.store is not None and WRITE_MODES[mode] != 'append':
+                QMessageBox.warning(self, "警告", "磁盘分段模式下只支持追加写入")
+                return
+
+            # 引擎及连接池按地址复用，多次写入无需重新建立连接
+            parallelism = config_instance.get('write.parallelism', DEFAULT_PARALLELISM)
+            engine = get_engine(f'mysql+pymysql://{user}:{password}@{host}/{db_name}', pool_size=parallelism)
+
+            chunk_size = config_instance.get('write.chunk_size', WRITE_CHUNK_SIZE)
+            batch_size = config_instance.get('write.batch_size', DEFAULT_BATCH_SIZE)
+            # 自适应批大小：chunk_size / batch_size 作为初始值，按实测吞吐量调整
+            self.write_sizer = None
+            if config_instance.get('write.adaptive', True):
+                self.write_sizer = AdaptiveBatchSizer(
+                    batch_size,
+                    min_size=config_instance.get('write.min_batch_size', DEFAULT_MIN_BATCH_SIZE),
+                    max_size=config_instance.get('write.max_batch_size', DEFAULT_MAX_BATCH_SIZE),
+                )
+            self.write_progress = 0
+
+            if WRITE_MODES[mode] == 'sync':
+                # 增量同步：只写入新增和变化的行
+                func, args, kwargs = sync_table, (self.df, engine, table_name, key_columns), dict(
+                    delete_missing=delete_missing,
+                    chunk_size=chunk_size,
+                    batch_size=batch_size,
+                )
+            elif self.store is not None:
+                # 磁盘分段模式：逐段读取并写入，内存中同时只有一个段
+                func, args, kwargs = write_segments, (self.store, engine, table_name), dict(
+                    chunk_size=chunk_size,
+                    batch_size=batch_size,
+                    retries=config_instance.get('write.retries', DEFAULT_RETRIES),
+                    resumable=config_instance.get('write.resumable', True),
+                )
+            elif WRITE_MODES[mode] == 'staging':
+                # 整表替换：写入暂存表、建索引后原子切换
+                func, args, kwargs = staged_load, (self.df, engine, table_name), dict(
+                    index_columns=config_instance.get('write.index_columns', []),
+                    chunk_size=chunk_size,
+                    batch_size=batch_size,
+                )
+            else:
+                func, args, kwargs = bulk_write, (self.df, engine, table_name), dict(
+                    chunk_size=chunk_size,
+                    batch_size=batch_size,
+                    parallelism=parallelism,
+                    partition_size=config_instance.get('write.partition_size', DEFAULT_PARTITION_SIZE),
+                    retries=config_instance.get('write.retries', DEFAULT_RETRIES),
+                    resumable=config_instance.get('write.resumable', True),
+                )
+
+            self.statusBar().showMessage("正在写入数据库...", 0)
+            # 写入期间打开其它文件时，段文件保留到写入结束
+            self.write_store = self.store
+            # 写入优先级低于加载，排队时让用户正在等待的预览先执行；进度和每批的吞吐量统计在主线程中更新状态栏
+            self.scheduler.submit(
+                write_task, func, *args, sizer=self.write_sizer, **kwargs,
+                name="to_mysql", group="write", priority=PRIORITY_BULK,
+                fields={
+                    "rows": len(self.store) if self.store is not None else len(self.df),
+                    "mode": WRITE_MODES[mode],
+                    "table": table_name,
+                },
+                on_event=lambda event, stats: self._write_telemetry(stats),
+                on_progress=self._write_progress,
+                on_result=self._write_finished,
+                on_error=self._write_error,
+                on_finished=self._release_write_store,
+            )
+
+    def _write_progress(self, value):
+        """更新写入进度"""
+        self.write_progress = value
+        message = f"写入进度: {value}%"
+        if self.write_sizer is not None:
+            stats = self.write_sizer.snapshot()
+            if stats["rows"]:
+                message += f"（{format_throughput(stats)}）"
+        self.statusBar().showMessage(message, 0)
+
+    def _write_telemetry(self, stats):
+        """实时显示写入吞吐量"""
+        self.statusBar().showMessage(f"写入进度: {self.write_progress}%（{format_throughput(stats)}）", 0)
+
+    def _write_finished(self, result):
+        """写入完成处理"""
+        if isinstance(result, dict):
+            # 增量同步返回各类行数
+            self.statusBar().showMessage(
+                f"同步完成：新增{result['inserted']}行，更新{result['updated']}行，"
+                f"删除{result['deleted']}行，未变化{result['unchanged']}行", 5000
+            )
+        else:
+            self.statusBar().showMessage(f"数据写入完成（共{result}行）", 5000)
+
+        if self.write_sizer is not None:
+            # 保存本次写入的吞吐量汇总，用于之后调整批大小设置
+            summary = self.write_sizer.summary()
+            summary.update({
+                "table": config_instance.get('table_name'),
+                "mode": config_instance.get('write.mode', '追加'),
+            })
+            try:
+                save_run_summary(summary, config_instance.get('write.summary_file', 'write_runs.jsonl'))
+            except OSError:
+                pass
+
+    def _write_error(self, error):
+        """写入错误处理"""
+        self.statusBar().showMessage("写入出错", 3000)
+        message = f"写入数据库时出错:\n{error[1]}"
+        if WRITE_MODES.get(config_instance.get('write.mode', '追加')) == 'append' \
+                and config_instance.get('write.resumable', True):
+            message += "\n\n已提交的分区已记录断点，使用相同数据重新写入将从断点继续"
+        QMessageBox.critical(self, "错误", message)
 
     # 获取选中所在列的表头
     def update_selected_headers(self):
         # 获取选中的列索引
         selected_columns = set()
-        for index in self.ui.tableWidget.selectedIndexes():
+        for index in self.table.selectionModel().selectedIndexes():
             selected_columns.add(index.column())
 
         # 获取水平表头
-        header = self.ui.tableWidget.horizontalHeader()
+        header = self.table.horizontalHeader()
 
         # 获取选中列的表头文本
         for col in selected_columns:
@@ -468,6 +924,8 @@ class MyMainWindow(QMainWindow):
 
 if __name__ == "__main__":
     # pyside6-uic general_excel.ui -o ui_general_excel.py
+    # 打包为可执行文件后，多文件加载的子进程需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MyMainWindow()
     window.show()
@@ -0,0 +1,144 @@
+"""读取、模糊匹配、数据库写入的基准测试（不需要图形界面和网络）
+
+- parse：与 load_file_task 相同的流程（逐块解析 → 合并 → 列类型压缩），对每个可用的
+  解析后端分别计时，同时记录第一个块的耗时
+- match：fuzzy_match_column 在多个 源值个数×候选个数 规模下的耗时，每个匹配引擎分别计时
+- write：与"写入数据库"相同的写入函数和参数（追加 / 整表替换 / 增量同步），写入本地 SQLite
+
+示例：
+    python -m benchmarks.bench_core --rows 10000 100000 --output .cache/bench/results.json
+    python -m benchmarks.bench_core --baseline old.json   # 与之前提交的结果比较，退化时退出码为 1
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from benchmarks.common import DEFAULT_THRESHOLD, Results, finish, measure
+from benchmarks.synthetic import DEFAULT_DIR, DEFAULT_SEED, address_pool, generate, make_dataframe, perturb
+from text.compare_text import ENGINE_CDIST, ENGINE_INDEX, ENGINE_TFIDF, fuzzy_match_column
+from text.tfidf_match import sparse
+from utils.db_staging import staged_load
+from utils.db_sync import sync_table
+from utils.db_writer import DEFAULT_BATCH_SIZE, DEFAULT_PARTITION_SIZE, bulk_write, dispose_engines, get_engine
+from utils.dtype_optimizer import DEFAULT_CATEGORY_RATIO, optimize_dtypes
+from utils.excel_reader import DEFAULT_CHUNK_SIZE, concat_chunks
+from utils.file_reader import BACKENDS, iter_file_chunks
+from utils.write_tuner import AdaptiveBatchSizer
+
+DEFAULT_ROWS = (10000, 50000)
+DEFAULT_MATCH_SIZES = ("1000x200", "5000x1000", "20000x5000")
+DEFAULT_WRITE_MODES = ("append", "staging", "sync")
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    """解析 "源值个数x候选个数" 形式的匹配规模"""
+    n, _, m = text.lower().partition("x")
+    return int(n), int(m)
+
+
+def bench_parse(results: Results, rows: Sequence[int], repeat: int, directory: str, seed: int) -> None:
+    for n in rows:
+        path = generate(n, directory, seed)
+        for backend in BACKENDS:
+            if not backend.available() or not backend.supports(path):
+                continue
+            reports = []
+
+            def load():
+                report = {}
+                df = concat_chunks(list(iter_file_chunks(path, DEFAULT_CHUNK_SIZE, preferred=backend.name,
+                                                         report=report)))
+                df, _ = optimize_dtypes(df, category_ratio=DEFAULT_CATEGORY_RATIO)
+                reports.append(report)
+                return df
+
+            timing, df = measure(load, repeat)
+            results.add("parse", backend.name, {"rows": n}, timing,
+                        first_chunk=min(report["first_chunk_seconds"] for report in reports),
+                        parse=min(report["seconds"] for report in reports),
+                        file_bytes=path.stat().st_size)
+
+
+def bench_match(results: Results, sizes: Sequence[Tuple[int, int]], engines: Sequence[str], repeat: int,
+                seed: int) -> None:
+    import random
+
+    for n, m in sizes:
+        candidates = address_pool(m, seed)
+        rng = random.Random(seed)
+        # 每个源值都是某个候选值的"脏"副本，与真实数据一样大部分需要模糊打分
+        source = [perturb(candidates[rng.randrange(m)], rng) for _ in range(n)]
+        df = pd.DataFrame({"订单地址": source})
+        for engine in engines:
+            timing, matched = measure(lambda: fuzzy_match_column(
+                df, "订单地址", "门店地址", engine=engine, candidates=candidates), repeat)
+            stats = matched.attrs["fuzzy_match"]
+            results.add("match", engine, {"n": n, "m": m}, timing, unique=stats["unique"], exact=stats["exact"])
+
+
+def bench_write(results: Results, rows: Sequence[int], modes: Sequence[str], repeat: int, seed: int) -> None:
+    for n in rows:
+        df, _ = optimize_dtypes(make_dataframe(n, seed=seed), category_ratio=DEFAULT_CATEGORY_RATIO)
+        for mode in modes:
+            with tempfile.TemporaryDirectory(prefix="bench_write_") as directory:
+                url = f"sqlite:///{Path(directory) / 'bench.db'}"
+                engine = get_engine(url, pool_size=1)
+                runs = iter(range(repeat))
+
+                def write():
+                    # 每次写入不同的表，避免断点表或指纹表影响下一次
+                    table = f"t_{mode}_{next(runs)}"
+                    sizer = AdaptiveBatchSizer(DEFAULT_BATCH_SIZE)
+                    if mode == "sync":
+                        sync_table(df, engine, table, ["订单编号"], sizer=sizer)
+                    elif mode == "staging":
+                        staged_load(df, engine, table, index_columns=["订单编号"], sizer=sizer)
+                    else:
+                        bulk_write(df, engine, table, parallelism=1, partition_size=DEFAULT_PARTITION_SIZE,
+                                   resumable=True, sizer=sizer)
+                    return sizer.summary()
+
+                timing, summary = measure(write, repeat)
+                dispose_engines()
+            results.add("write", mode, {"rows": n}, timing, rows_per_s=round(n / timing["median"], 1),
+                        best_batch_size=summary["best_batch_size"])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="读取、模糊匹配、数据库写入的基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS), help="读取和写入测试的行数")
+    parser.add_argument("--match-sizes", nargs="+", default=list(DEFAULT_MATCH_SIZES),
+                        help="匹配测试的规模，格式为 源值个数x候选个数")
+    parser.add_argument("--engines", nargs="+", help="匹配引擎，默认 cdist、index 及 tfidf（已安装 scipy 时）")
+    parser.add_argument("--write-modes", nargs="+", choices=DEFAULT_WRITE_MODES, default=list(DEFAULT_WRITE_MODES))
+    parser.add_argument("--only", nargs="+", choices=("parse", "match", "write"), help="只运行指定的分组")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，结果取中位数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="合成数据的随机种子")
+    parser.add_argument("--data-dir", default=DEFAULT_DIR, help="合成工作簿的目录，已存在的文件直接复用")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="与之前保存的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="视为退化的变慢比例")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    groups = set(args.only or ("parse", "match", "write"))
+    engines = args.engines or [ENGINE_CDIST, ENGINE_INDEX] + ([ENGINE_TFIDF] if sparse is not None else [])
+
+    results = Results("core")
+    if "parse" in groups:
+        bench_parse(results, args.rows, args.repeat, args.data_dir, args.seed)
+    if "match" in groups:
+        bench_match(results, [parse_size(size) for size in args.match_sizes], engines, args.repeat, args.seed)
+    if "write" in groups:
+        bench_write(results, args.rows, args.write_modes, args.repeat, args.seed)
+    return finish(results, args.output, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
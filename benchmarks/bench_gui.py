@@ -0,0 +1,279 @@
+"""表格填充路径的界面基准测试，在 QT_QPA_PLATFORM=offscreen 下运行 MyMainWindow
+
+对每种表格显示模式（model / widget）和每个行数计时：
+- drop：拖入文件 → 第一次绘制出数据（first_paint）→ 全部数据填充完成（populated）
+- dataframe：load_dataframe_safely 直接加载 DataFrame → 填充完成（widget 模式为 populate_rows_task 在后台格式化，按行块发往主线程写入表格）
+- resize：数据填充后 resizeColumnsToContents 的耗时
+- scroll：跳转到随机位置后同步重绘可见区域的延迟（中位数、p95、最大值）
+
+运行时在临时目录中使用独立的 config.yaml（关闭解析缓存和磁盘分段），不会修改程序目录下的配置。
+
+示例：
+    python -m benchmarks.bench_gui --rows 10000 100000 1000000 --output .cache/bench/gui.json
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# 运行时会切换到临时目录，先把程序目录加入搜索路径
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.common import DEFAULT_THRESHOLD, Results, finish, measure  # noqa: E402
+from benchmarks.synthetic import DEFAULT_DIR, DEFAULT_SEED, generate, make_dataframe  # noqa: E402
+
+DEFAULT_ROWS = (10000, 100000)
+TABLE_MODES = ("model", "widget")
+# widget 模式逐单元格创建 QTableWidgetItem，超过该行数时跳过，避免运行数小时
+DEFAULT_MAX_WIDGET_ROWS = 100000
+DEFAULT_TIMEOUT = 600
+DEFAULT_SCROLL_STEPS = 50
+WINDOW_SIZE = (1280, 800)
+
+
+class PaintProbe:
+    """记录表格视口第一次在有数据时完成绘制的时间"""
+
+    def __init__(self, table, started: float):
+        from PySide6.QtCore import QEvent, QObject
+
+        probe = self
+
+        class _Filter(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Paint and probe.first_paint is None and probe.has_rows():
+                    probe.first_paint = time.perf_counter() - probe.started
+                return False
+
+        self.table = table
+        self.started = started
+        self.first_paint: Optional[float] = None
+        self._filter = _Filter()
+        table.viewport().installEventFilter(self._filter)
+
+    def has_rows(self) -> bool:
+        model = self.table.model()
+        return model.rowCount() > 0 and model.index(0, 0).data() not in (None, "")
+
+    def remove(self) -> None:
+        self.table.viewport().removeEventFilter(self._filter)
+
+
+class GuiBench:
+    """创建窗口、触发加载并在事件循环中等待完成"""
+
+    def __init__(self, timeout: float):
+        from PySide6.QtWidgets import QApplication
+
+        self.app = QApplication.instance() or QApplication([])
+        self.timeout = timeout
+
+        import app as app_module
+        from utils.config_set import config_instance
+
+        self.app_module = app_module
+        self.config = config_instance
+
+    def window(self, table_mode: str):
+        self.config.update({
+            "table_mode": table_mode,
+            "last_opened_file": "",
+            "cache": {"enabled": False},
+            "out_of_core": {"mode": "off"},
+            "batch": {"all_sheets": False},
+        })
+        window = self.app_module.MyMainWindow()
+        window.resize(*WINDOW_SIZE)
+        window.show()
+        self.app.processEvents()
+        return window
+
+    def wait(self, done: Callable[[], bool]) -> bool:
+        """处理事件直到 done() 为真，超时返回 False"""
+        from PySide6.QtCore import QEventLoop
+
+        deadline = time.perf_counter() + self.timeout
+        while not done():
+            if time.perf_counter() > deadline:
+                return False
+            self.app.processEvents(QEventLoop.AllEvents, 50)
+        return True
+
+    def close(self, window) -> None:
+        # closeEvent 取消加载任务并等待线程池中的任务返回
+        window.close()
+        window.deleteLater()
+        self.app.processEvents()
+
+    @staticmethod
+    def _drop_event(path: Path):
+        from PySide6.QtCore import QMimeData, QPointF, Qt, QUrl
+        from PySide6.QtGui import QDropEvent
+
+        mime = QMimeData()
+        mime.setUrls([QUrl.fromLocalFile(str(path))])
+        event = QDropEvent(QPointF(10, 10), Qt.CopyAction, mime, Qt.LeftButton, Qt.NoModifier)
+        return event, mime
+
+    def drop(self, table_mode: str, path: Path) -> Dict[str, Any]:
+        """拖入文件，返回第一次绘制和填充完成的耗时"""
+        window = self.window(table_mode)
+        state: Dict[str, Any] = {"populated": None}
+        finish_loading = window._finish_file_loading
+
+        def finished():
+            state["populated"] = time.perf_counter() - started
+            finish_loading()
+
+        window._finish_file_loading = finished
+        started = time.perf_counter()
+        probe = PaintProbe(window.table, started)
+        event, _mime = self._drop_event(path)
+        window.dropEvent(event)
+        completed = self.wait(lambda: state["populated"] is not None)
+        probe.remove()
+        return {"window": window, "first_paint": probe.first_paint, "populated": state["populated"],
+                "completed": completed}
+
+    def load_dataframe(self, table_mode: str, df) -> Dict[str, Any]:
+        """load_dataframe_safely 加载 DataFrame，返回填充完成的耗时"""
+        window = self.window(table_mode)
+        state: Dict[str, Any] = {"populated": None}
+        started = time.perf_counter()
+        if table_mode == "model":
+            window.load_dataframe_safely(df)
+            state["populated"] = time.perf_counter() - started
+        else:
+            loading_finished = window._loading_finished
+
+            def finished(*args):
+                loading_finished(*args)
+                state["populated"] = time.perf_counter() - started
+
+            window._loading_finished = finished
+            window.load_dataframe_safely(df)
+        completed = self.wait(lambda: state["populated"] is not None)
+        return {"window": window, "populated": state["populated"], "completed": completed}
+
+    def scroll(self, window, steps: int, seed: int) -> Dict[str, Any]:
+        """跳转到随机行后同步重绘，统计每次的延迟"""
+        table = window.table
+        bar = table.verticalScrollBar()
+        rng = random.Random(seed)
+        latencies = []
+        for _ in range(steps):
+            bar.setValue(rng.randint(bar.minimum(), bar.maximum()))
+            started = time.perf_counter()
+            table.viewport().repaint()
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        return {
+            "median": round(statistics.median(latencies), 5),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 5),
+            "max": round(latencies[-1], 5),
+        }
+
+
+def _seconds(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+def run(args: argparse.Namespace) -> Results:
+    args.repeat = max(1, args.repeat)
+    paths = {n: generate(n, Path(args.data_dir).resolve(), args.seed, fmt=args.format) for n in args.rows}
+    workdir = tempfile.mkdtemp(prefix="bench_gui_")
+    os.chdir(workdir)  # 独立的 config.yaml
+    bench = GuiBench(args.timeout)
+    results = Results("gui")
+
+    for n in args.rows:
+        for table_mode in args.modes:
+            params = {"rows": n, "mode": table_mode}
+            if table_mode == "widget" and n > args.max_widget_rows:
+                print(f"跳过 widget 模式 {n} 行（超过 --max-widget-rows）", file=sys.stderr)
+                continue
+
+            # drop：拖入 → 第一次绘制 → 填充完成，填充完成后在同一个窗口上测量列宽调整和滚动
+            runs = []
+            for index in range(args.repeat):
+                outcome = bench.drop(table_mode, paths[n])
+                window = outcome.pop("window")
+                if not outcome["completed"]:
+                    bench.close(window)
+                    raise TimeoutError(f"{table_mode} 模式加载 {n} 行超过 {args.timeout} 秒")
+                runs.append(outcome)
+                if index == args.repeat - 1:
+                    resize, _ = measure(window.table.resizeColumnsToContents, args.repeat)
+                    scroll = bench.scroll(window, args.scroll_steps, args.seed)
+                bench.close(window)
+
+            populated = sorted(run["populated"] for run in runs)
+            first_paint = [run["first_paint"] for run in runs if run["first_paint"] is not None]
+            results.add("drop", "populated", params, {
+                "runs": [_seconds(value) for value in populated],
+                "median": _seconds(statistics.median(populated)),
+                "min": _seconds(populated[0]),
+            }, first_paint=_seconds(statistics.median(first_paint)) if first_paint else None)
+            results.add("resize", "resizeColumnsToContents", params, resize)
+            results.add("scroll", "repaint", params, {"runs": [], "median": scroll["median"],
+                                                      "min": None}, p95=scroll["p95"], max=scroll["max"])
+
+            # dataframe：load_dataframe_safely（匹配结果等 DataFrame 的加载路径）
+            df = make_dataframe(n, seed=args.seed)
+            runs = []
+            for _ in range(args.repeat):
+                outcome = bench.load_dataframe(table_mode, df)
+                bench.close(outcome.pop("window"))
+                if not outcome["completed"]:
+                    raise TimeoutError(f"{table_mode} 模式加载 {n} 行 DataFrame 超过 {args.timeout} 秒")
+                runs.append(outcome["populated"])
+            runs.sort()
+            results.add("dataframe", "populated", params, {
+                "runs": [_seconds(value) for value in runs],
+                "median": _seconds(statistics.median(runs)),
+                "min": _seconds(runs[0]),
+            })
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="表格填充、列宽调整和滚动的界面基准测试（offscreen）")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS), help="生成的工作表行数")
+    parser.add_argument("--modes", nargs="+", choices=TABLE_MODES, default=list(TABLE_MODES), help="表格显示模式")
+    parser.add_argument("--format", choices=("xlsx", "csv", "parquet"), default="xlsx", help="拖入的文件格式")
+    parser.add_argument("--max-widget-rows", type=int, default=DEFAULT_MAX_WIDGET_ROWS,
+                        help="widget 模式的最大行数，超过时跳过")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，结果取中位数")
+    parser.add_argument("--scroll-steps", type=int, default=DEFAULT_SCROLL_STEPS, help="滚动延迟的采样次数")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="单次加载的超时秒数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="合成数据的随机种子")
+    parser.add_argument("--data-dir", default=DEFAULT_DIR, help="合成工作簿的目录，已存在的文件直接复用")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--baseline", help="与之前保存的结果 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="视为退化的变慢比例")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    cwd = os.getcwd()
+    output = str(Path(cwd, args.output)) if args.output else None
+    baseline = str(Path(cwd, args.baseline)) if args.baseline else None
+    try:
+        results = run(args)
+    finally:
+        os.chdir(cwd)
+    return finish(results, output, baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
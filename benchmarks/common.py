@@ -0,0 +1,138 @@
+"""基准测试的计时、结果保存和跨提交比较"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+# 比较两次结果时，中位数变慢超过该比例视为退化
+DEFAULT_THRESHOLD = 0.2
+
+
+def git_revision() -> Optional[str]:
+    """当前提交的短哈希，工作区有未提交的修改时加 -dirty 后缀；不在 git 仓库中时返回 None"""
+    root = Path(__file__).resolve().parent.parent
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息，随结果一起保存，比较结果时确认是否在同一环境下测得"""
+    import pandas as pd
+
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int = 3, warmup: int = 0) -> Tuple[Dict[str, Any], Any]:
+    """重复执行 func 并计时
+
+    :return: (计时统计，最后一次执行的返回值)；统计包含每次的秒数、中位数和最小值
+    """
+    for _ in range(warmup):
+        func()
+    runs = []
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs": [round(seconds, 4) for seconds in runs],
+        "median": round(statistics.median(runs), 4),
+        "min": round(min(runs), 4),
+    }, result
+
+
+class Results:
+    """收集基准测试结果，每条结果以 (分组, 名称, 参数) 标识，用于跨提交比较"""
+
+    def __init__(self, suite: str):
+        self.suite = suite
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, group: str, name: str, params: Dict[str, Any], timing: Dict[str, Any], **extra: Any) -> None:
+        record = {"group": group, "name": name, "params": params, **timing, **extra}
+        self.records.append(record)
+        print(f"{group:<8} {name:<24} {_format_params(params):<32} 中位数 {timing['median']:.4f}s",
+              file=sys.stderr, flush=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"suite": self.suite, "environment": environment(), "results": self.records}
+
+    def save(self, path: Union[str, Path], data: Optional[Dict[str, Any]] = None) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data or self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def _format_params(params: Dict[str, Any]) -> str:
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def _key(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    return record["group"], record["name"], json.dumps(record["params"], sort_keys=True, ensure_ascii=False)
+
+
+def compare(baseline: Union[str, Path, Dict[str, Any]], current: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """按 (分组, 名称, 参数) 对齐两次结果，打印中位数的变化
+
+    :param baseline: 基线结果文件或字典
+    :param current: 本次结果
+    :param threshold: 变慢超过该比例时标记为退化
+    :return: 退化的条目
+    """
+    if not isinstance(baseline, dict):
+        with open(baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    before = {_key(record): record for record in baseline["results"]}
+    regressions = []
+    print(f"\n与基线 {baseline['environment'].get('revision')} 比较（中位数，>{threshold:.0%} 视为退化）：",
+          file=sys.stderr)
+    for record in current["results"]:
+        old = before.get(_key(record))
+        if old is None or not old["median"]:
+            continue
+        ratio = record["median"] / old["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  退化"
+            regressions.append({**record, "baseline_median": old["median"], "ratio": round(ratio, 3)})
+        elif ratio < 1 - threshold:
+            flag = "  提升"
+        print(f"{record['group']:<8} {record['name']:<24} {_format_params(record['params']):<32} "
+              f"{old['median']:.4f}s → {record['median']:.4f}s（×{ratio:.2f}）{flag}", file=sys.stderr)
+    return regressions
+
+
+def finish(results: Results, output: Optional[str], baseline: Optional[str], threshold: float) -> int:
+    """保存结果（未指定文件时输出到标准输出）并与基线比较，返回退出码（有退化时为 1）"""
+    data = results.to_dict()
+    if output:
+        print(f"\n结果已保存到 {results.save(output, data)}", file=sys.stderr)
+    else:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if baseline:
+        return 1 if compare(baseline, data, threshold) else 0
+    return 0
@@ -0,0 +1,169 @@
+"""生成基准测试用的合成工作簿
+
+地址由省、市、区、街道、门牌号、小区、楼栋和房号随机组合而成，订单地址是门店地址的
+"脏"副本（插入分隔符、全角数字、省略省份或房号），模拟实际数据中需要模糊匹配的情况。
+同样的参数和随机种子总是生成同样的数据，结果可以跨提交比较。
+
+示例：
+    python -m benchmarks.synthetic 100000 -o .cache/bench/orders_100k.xlsx
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+DEFAULT_SEED = 20240601
+DEFAULT_DIR = ".cache/bench"
+
+PROVINCES = {
+    "广东省": {"广州市": ["天河区", "越秀区", "海珠区", "番禺区", "白云区"],
+              "深圳市": ["南山区", "福田区", "罗湖区", "宝安区", "龙岗区"],
+              "珠海市": ["香洲区", "斗门区", "金湾区"]},
+    "浙江省": {"杭州市": ["西湖区", "上城区", "拱墅区", "滨江区", "余杭区"],
+              "宁波市": ["海曙区", "江北区", "鄞州区"]},
+    "江苏省": {"南京市": ["玄武区", "秦淮区", "鼓楼区", "建邺区"],
+              "苏州市": ["姑苏区", "吴中区", "相城区", "工业园区"]},
+    "四川省": {"成都市": ["锦江区", "青羊区", "武侯区", "成华区", "高新区"]},
+    "湖北省": {"武汉市": ["江岸区", "武昌区", "洪山区", "汉阳区"]},
+}
+STREETS = ["中山路", "人民路", "解放路", "建设路", "和平路", "新华路", "长江路", "黄河路", "学府路", "科技路",
+           "滨海大道", "迎宾大道", "环城北路", "工业大道", "文化路", "体育西路", "珠江路", "花园路"]
+ESTATES = ["荷塘物语", "翠湖山庄", "锦绣花园", "阳光城", "碧桂园", "万科城", "保利花园", "金地名苑",
+           "海岸城", "星河湾", "绿地中心", "东方明珠苑", "御景华庭", "时代广场"]
+SEPARATORS = ["+", "-", " ", "·", "/"]
+FULLWIDTH = str.maketrans("0123456789", "０１２３４５６７８９")
+
+
+def random_address(rng: random.Random) -> str:
+    """生成一个完整的收货地址"""
+    province = rng.choice(list(PROVINCES))
+    city = rng.choice(list(PROVINCES[province]))
+    district = rng.choice(PROVINCES[province][city])
+    return (f"{province}{city}{district}{rng.choice(STREETS)}{rng.randint(1, 999)}号"
+            f"{rng.choice(ESTATES)}{rng.randint(1, 60)}栋{rng.randint(1, 33)}{rng.randint(1, 8):02d}")
+
+
+def perturb(address: str, rng: random.Random) -> str:
+    """生成地址的"脏"副本：随机省略省份或房号、插入分隔符、数字改为全角"""
+    result = address
+    if rng.random() < 0.5:
+        # 省略省份
+        for province in PROVINCES:
+            if result.startswith(province):
+                result = result[len(province):]
+                break
+    if rng.random() < 0.3:
+        # 省略末尾的房号
+        result = result.rstrip("0123456789")
+    if rng.random() < 0.5:
+        position = rng.randint(1, len(result) - 1)
+        result = result[:position] + rng.choice(SEPARATORS) + result[position:]
+    if rng.random() < 0.2:
+        result = result.translate(FULLWIDTH)
+    return result
+
+
+def address_pool(n: int, seed: int = DEFAULT_SEED) -> List[str]:
+    """生成 n 个不重复的地址"""
+    rng = random.Random(seed)
+    seen = {}
+    while len(seen) < n:
+        seen[random_address(rng)] = None
+    return list(seen)
+
+
+def make_dataframe(rows: int, n_stores: Optional[int] = None, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """生成订单数据
+
+    :param rows: 行数
+    :param n_stores: 不同门店地址的个数，默认为行数的 1%（至少 10 个），每行的订单地址是随机一个门店地址的"脏"副本
+    :param seed: 随机种子
+    :return: 含订单编号、订单地址、门店地址、数量、金额、下单时间列的 DataFrame
+    """
+    rng = random.Random(seed)
+    n_stores = n_stores or max(10, rows // 100)
+    stores = address_pool(n_stores, seed)
+    start = datetime(2024, 1, 1)
+
+    records = []
+    for i in range(rows):
+        store = stores[rng.randrange(n_stores)]
+        records.append((
+            f"DD{seed % 1000:03d}{i:09d}",
+            perturb(store, rng),
+            store,
+            rng.randint(1, 20),
+            round(rng.uniform(5, 5000), 2),
+            start + timedelta(seconds=rng.randrange(366 * 24 * 3600)),
+        ))
+    return pd.DataFrame.from_records(records, columns=["订单编号", "订单地址", "门店地址", "数量", "金额", "下单时间"])
+
+
+def write_workbook(df: pd.DataFrame, path: Union[str, Path], sheets: int = 1) -> Path:
+    """用 openpyxl 的 write_only 模式写出 xlsx，sheets 大于 1 时按行均分到多个工作表"""
+    from openpyxl import Workbook
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    size = -(-len(df) // sheets) if len(df) else 0
+    for index in range(sheets):
+        ws = wb.create_sheet(f"Sheet{index + 1}")
+        ws.append(list(df.columns))
+        part = df.iloc[index * size:(index + 1) * size] if size else df
+        for row in part.itertuples(index=False, name=None):
+            ws.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+    wb.save(path)
+    return path
+
+
+def generate(rows: int, directory: Union[str, Path] = DEFAULT_DIR, seed: int = DEFAULT_SEED, sheets: int = 1,
+             fmt: str = "xlsx") -> Path:
+    """生成（或复用已生成的）合成文件，文件名包含行数、工作表数和随机种子
+
+    :param fmt: xlsx / csv / parquet
+    """
+    path = Path(directory) / f"orders_{rows}_{sheets}_{seed}.{fmt}"
+    if path.exists():
+        return path
+    df = make_dataframe(rows, seed=seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 先写临时文件再改名，中途中断不会留下不完整的文件被之后复用
+    tmp = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    if fmt == "xlsx":
+        write_workbook(df, tmp, sheets)
+    elif fmt == "csv":
+        df.to_csv(tmp, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        raise ValueError(f"不支持的格式: {fmt}")
+    tmp.replace(path)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="生成含中文地址的合成订单工作簿")
+    parser.add_argument("rows", type=int, help="行数")
+    parser.add_argument("-o", "--output", help="输出路径，默认写入 .cache/bench 并按参数命名")
+    parser.add_argument("--sheets", type=int, default=1, help="工作表个数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子")
+    parser.add_argument("--format", choices=("xlsx", "csv", "parquet"), default="xlsx")
+    args = parser.parse_args(argv)
+    if args.output:
+        df = make_dataframe(args.rows, seed=args.seed)
+        if args.format == "xlsx":
+            path = write_workbook(df, args.output, args.sheets)
+        else:
+            path = Path(args.output)
+            getattr(df, f"to_{args.format}")(path, index=False)
+    else:
+        path = generate(args.rows, seed=args.seed, sheets=args.sheets, fmt=args.format)
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
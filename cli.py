@@ -0,0 +1,287 @@
+"""无界面的批处理入口：读取文件 → 可选的模糊匹配 → 写入数据库
+
+不导入 Qt，可在服务器上由 cron 等调度执行。连接信息、写入模式、匹配引擎等默认取自
+config.yaml（与界面共用），命令行参数优先。进度和耗时输出到标准输出，--json 时每行
+一个 JSON 事件；任一步骤失败时返回非零退出码。多个输入中有文件读取失败时默认不写入、
+返回失败，--allow-partial 时跳过失败的文件继续处理。
+
+示例：
+    python cli.py orders.xlsx --match 订单地址 门店地址
+    python cli.py a.xlsx b.csv --mode 追加 --url sqlite:///out.db --json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from text.compare_text import ENGINES, ENGINE_TFIDF, MatchCache, fuzzy_match_column, fuzzy_match_segments
+from utils.batch_loader import load_workbooks
+from utils import tracing
+from utils.config_set import Config
+from utils.db_staging import staged_load
+from utils.db_sync import sync_table
+from utils.db_writer import (DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE as WRITE_CHUNK_SIZE, DEFAULT_PARALLELISM,
+                             DEFAULT_PARTITION_SIZE, DEFAULT_RETRIES, bulk_write, get_engine, write_segments)
+from utils.dtype_optimizer import optimize_dtypes
+from utils.excel_reader import DEFAULT_CHUNK_SIZE, concat_chunks
+from utils.file_reader import BACKEND_AUTO, iter_file_chunks, sheet_names
+from utils.pipeline_settings import memory_budget, optimize_options, resolve_mode, use_out_of_core
+from utils.segment_store import SegmentStore
+from utils.tracing import span
+from utils.write_tuner import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MIN_BATCH_SIZE, AdaptiveBatchSizer, save_run_summary
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+class Reporter:
+    """输出进度和耗时：文本模式为便于阅读的行，JSON 模式为每行一个事件对象"""
+
+    def __init__(self, as_json: bool = False, stream=None):
+        self.as_json = as_json
+        self.stream = stream or sys.stdout
+
+    def emit(self, event: str, message: str = "", **fields: Any) -> None:
+        if self.as_json:
+            record = {"event": event, "time": round(time.time(), 3), **fields}
+            line = json.dumps(record, ensure_ascii=False, default=str)
+        else:
+            line = f"[{event}] {message}" if message else f"[{event}] {fields}"
+        print(line, file=self.stream, flush=True)
+
+
+def database_url(config: Config, url: Optional[str] = None) -> str:
+    """命令行指定的连接地址，或由配置文件中的连接信息拼接的 MySQL 地址"""
+    if url:
+        return url
+    missing = [key for key in ("user", "host", "db_name") if not config.get(key)]
+    if missing:
+        raise ValueError(f"配置文件缺少数据库连接信息: {', '.join(missing)}（或使用 --url 指定）")
+    return (f"mysql+pymysql://{config.get('user')}:{config.get('password', '')}"
+            f"@{config.get('host')}/{config.get('db_name')}")
+
+
+def load(config: Config, file_paths: List[str], reporter: Reporter, out_of_core: Optional[str] = None):
+    """读取输入文件
+
+    单个文件（且只有一个工作表）逐块解析：超出内存预算时每个块写入磁盘分段存储，返回
+    SegmentStore；否则合并为 DataFrame。多个文件或多个工作表并行解析后合并。
+
+    :return: (DataFrame 或 SegmentStore, 统计)
+    """
+    backend = config.get('reader.backend', BACKEND_AUTO)
+    chunk_size = DEFAULT_CHUNK_SIZE
+    started = time.perf_counter()
+
+    multi_sheet = (len(file_paths) == 1 and config.get('batch.all_sheets', False)
+                   and len(sheet_names(file_paths[0], backend)) > 1)
+    if len(file_paths) > 1 or multi_sheet:
+        def progress(path, done, total):
+            reporter.emit("load", f"{path}：工作表 {done}/{total}", file=path, done=done, total=total)
+
+        df = load_workbooks(file_paths, config.get('batch.max_workers'), chunk_size,
+                            progress_callback=progress, backend=backend)
+        stats = dict(df.attrs["batch_load"])
+        for path, error in stats["errors"].items():
+            reporter.emit("warning", f"{path} 读取失败：{error}", file=path, error=error)
+    else:
+        report: Dict[str, Any] = {}
+        store = None
+        if use_out_of_core(config, file_paths[0], out_of_core):
+            store = SegmentStore(config.get('out_of_core.dir', '.cache/segments'), cache_bytes=memory_budget(config))
+        chunks = []
+        try:
+            for chunk in iter_file_chunks(file_paths[0], chunk_size, preferred=backend,
+                                          streaming=store is not None, report=report):
+                if store is not None:
+                    store.append(chunk)
+                else:
+                    chunks.append(chunk)
+                reporter.emit("load", f"已解析 {report['rows']} 行", rows=report["rows"])
+        except BaseException:
+            if store is not None:
+                store.close()
+            raise
+        stats = {"files": 1, "rows": report["rows"], "read": report}
+        if store is not None:
+            stats.update(out_of_core=True, segments=store.n_segments,
+                         seconds=round(time.perf_counter() - started, 3))
+            return store, stats
+        df = concat_chunks(chunks)
+
+    options = optimize_options(config)
+    if options is not None:
+        df, optimization = optimize_dtypes(df, **options)
+        stats["memory_before"] = optimization["before"]
+        stats["memory_after"] = optimization["after"]
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return df, stats
+
+
+def match(config: Config, data, source_col: str, candidate_col: str, engine: Optional[str] = None):
+    """对 source_col 在 candidate_col 中做模糊匹配，磁盘分段存储逐段匹配并写回各段
+
+    :return: (增加了结果列的 DataFrame 或原 SegmentStore, 统计)
+    """
+    started = time.perf_counter()
+    engine = engine or config.get('match.engine', 'cdist')
+    options = dict(
+        source_col=source_col,
+        candidate_col=candidate_col,
+        cache=MatchCache(config.get('match.cache_size', 100000)),
+        engine=engine,
+        top_k=config.get('match.top_k', 20),
+        scan_ratio=config.get('match.scan_ratio', 0.5),
+        n_best=config.get('match.n_best', 1) if engine == ENGINE_TFIDF else 1,
+    )
+    if isinstance(data, SegmentStore):
+        stats = fuzzy_match_segments(data, **options)
+    else:
+        data = fuzzy_match_column(data, **options)
+        stats = dict(data.attrs["fuzzy_match"])
+    stats.update(engine=engine, seconds=round(time.perf_counter() - started, 3))
+    return data, stats
+
+
+def write(config: Config, data, reporter: Reporter, url: Optional[str] = None, table_name: Optional[str] = None,
+          mode: Optional[str] = None):
+    """按写入模式写入数据库，参数与界面的写入表单相同，取自配置文件
+
+    :return: 统计（写入行数或增量同步的各类行数、吞吐量）
+    """
+    table_name = table_name or config.get('table_name')
+    if not table_name:
+        raise ValueError("未指定表名（配置文件 table_name 或 --table）")
+    mode = resolve_mode(mode or config.get('write.mode', '追加'))
+    if isinstance(data, SegmentStore) and mode != 'append':
+        raise ValueError("磁盘分段模式下只支持追加写入")
+
+    parallelism = config.get('write.parallelism', DEFAULT_PARALLELISM)
+    engine = get_engine(database_url(config, url), pool_size=parallelism)
+    chunk_size = config.get('write.chunk_size', WRITE_CHUNK_SIZE)
+    batch_size = config.get('write.batch_size', DEFAULT_BATCH_SIZE)
+    sizer = None
+    if config.get('write.adaptive', True):
+        sizer = AdaptiveBatchSizer(
+            batch_size,
+            min_size=config.get('write.min_batch_size', DEFAULT_MIN_BATCH_SIZE),
+            max_size=config.get('write.max_batch_size', DEFAULT_MAX_BATCH_SIZE),
+        )
+
+    def progress(value):
+        fields = {"percent": value}
+        message = f"写入进度 {value}%"
+        if sizer is not None:
+            throughput = sizer.snapshot()
+            fields.update(rows_per_s=round(throughput["rows_per_s"], 1), batch_size=throughput["batch_size"])
+            message += f"（{throughput['rows_per_s']:,.0f} 行/秒，批大小 {throughput['batch_size']}）"
+        reporter.emit("write", message, **fields)
+
+    started = time.perf_counter()
+    if mode == 'sync':
+        result = sync_table(data, engine, table_name, config.get('write.key_columns', []),
+                            delete_missing=config.get('write.delete_missing', False),
+                            chunk_size=chunk_size, batch_size=batch_size, progress_callback=progress, sizer=sizer)
+    elif isinstance(data, SegmentStore):
+        result = write_segments(data, engine, table_name, chunk_size=chunk_size, batch_size=batch_size,
+                                retries=config.get('write.retries', DEFAULT_RETRIES), progress_callback=progress,
+                                resumable=config.get('write.resumable', True), sizer=sizer)
+    elif mode == 'staging':
+        result = staged_load(data, engine, table_name, index_columns=config.get('write.index_columns', []),
+                             chunk_size=chunk_size, batch_size=batch_size, progress_callback=progress, sizer=sizer)
+    else:
+        result = bulk_write(data, engine, table_name, chunk_size=chunk_size, batch_size=batch_size,
+                            parallelism=parallelism,
+                            partition_size=config.get('write.partition_size', DEFAULT_PARTITION_SIZE),
+                            retries=config.get('write.retries', DEFAULT_RETRIES), progress_callback=progress,
+                            resumable=config.get('write.resumable', True), sizer=sizer)
+
+    stats = dict(result) if isinstance(result, dict) else {"rows": result}
+    stats.update(table=table_name, mode=mode, seconds=round(time.perf_counter() - started, 3))
+    if sizer is not None:
+        summary = sizer.summary()
+        stats["throughput"] = summary
+        summary.update({"table": table_name, "mode": mode})
+        try:
+            save_run_summary(summary, config.get('write.summary_file', 'write_runs.jsonl'))
+        except OSError:
+            pass
+    return stats
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="读取 Excel / CSV / Parquet 文件，可选模糊匹配后写入数据库")
+    parser.add_argument("files", nargs="+", help="输入文件，多个文件或多个工作表时合并并增加来源列")
+    parser.add_argument("--config", default="config.yaml", help="配置文件路径（默认 config.yaml）")
+    parser.add_argument("--match", nargs=2, metavar=("SOURCE", "CANDIDATE"), help="模糊匹配的源列和候选列")
+    parser.add_argument("--engine", choices=ENGINES, help="匹配引擎（默认取 match.engine）")
+    parser.add_argument("--url", help="SQLAlchemy 连接地址，默认由配置文件中的连接信息拼接")
+    parser.add_argument("--table", help="目标表名（默认取 table_name）")
+    parser.add_argument("--mode", help="写入模式：追加/增量同步/整表替换 或 append/sync/staging（默认取 write.mode）")
+    parser.add_argument("--out-of-core", choices=("auto", "on", "off"), help="磁盘分段模式（默认取 out_of_core.mode）")
+    parser.add_argument("--no-write", action="store_true", help="只读取和匹配，不写入数据库")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="多个输入中有文件读取失败时跳过这些文件继续处理（默认以失败结束）")
+    parser.add_argument("--json", action="store_true", help="每行输出一个 JSON 事件")
+    return parser
+
+
+def run(args: argparse.Namespace, reporter: Reporter) -> Dict[str, Any]:
+    """依次执行读取、匹配、写入，返回各阶段统计"""
+    config = Config(args.config)
+    # 阶段名称与界面相同，开启 tracing.enabled 后两者的记录可以直接比较
+    tracing.configure_from(config)
+    summary: Dict[str, Any] = {}
+    started = time.perf_counter()
+
+    with span("load_files" if len(args.files) > 1 else "load_file", files=len(args.files)) as current:
+        data, summary["load"] = load(config, args.files, reporter, args.out_of_core)
+        current.set(rows=summary["load"]["rows"])
+    errors = summary["load"].get("errors")
+    if errors and not args.allow_partial:
+        raise RuntimeError(f"{len(errors)} 个文件读取失败，未写入数据库（--allow-partial 可跳过失败的文件）")
+    reporter.emit("loaded", f"读取完成：{summary['load']['rows']} 行，耗时 {summary['load']['seconds']} 秒",
+                  **summary["load"])
+    try:
+        if args.match:
+            data, summary["match"] = match(config, data, args.match[0], args.match[1], args.engine)
+            reporter.emit("matched", f"匹配完成：{summary['match']['rows']} 行，耗时 {summary['match']['seconds']} 秒",
+                          **summary["match"])
+        if not args.no_write:
+            with span("to_mysql", rows=len(data)) as current:
+                summary["write"] = write(config, data, reporter, args.url, args.table, args.mode)
+                current.set(mode=summary["write"]["mode"], table=summary["write"]["table"])
+            result = summary["write"]
+            if result["mode"] == 'sync':
+                message = (f"同步完成：新增{result['inserted']}行，更新{result['updated']}行，"
+                           f"删除{result['deleted']}行，未变化{result['unchanged']}行")
+            else:
+                message = f"写入完成：{result['rows']} 行"
+            reporter.emit("written", f"{message}，耗时 {result['seconds']} 秒", **result)
+    finally:
+        if isinstance(data, SegmentStore):
+            data.close()
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    reporter = Reporter(args.json)
+    try:
+        summary = run(args, reporter)
+    except KeyboardInterrupt:
+        reporter.emit("error", "已中断", error="interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        reporter.emit("error", f"{type(e).__name__}: {e}", error=str(e), type=type(e).__name__)
+        return EXIT_FAILED
+    reporter.emit("done", f"全部完成，总耗时 {summary['seconds']} 秒", **summary)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
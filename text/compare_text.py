@@ -1,15 +1,222 @@
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 from rapidfuzz import process, fuzz
-from typing import Callable
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from text.ngram_index import NGramIndex
+from text.tfidf_match import tfidf_top_k
+from utils.tracing import traced
+
+# 可选的匹配引擎
+ENGINE_EXTRACT = "extract"  # 逐个值调用 process.extractOne
+ENGINE_CDIST = "cdist"  # 分块调用 process.cdist 批量打分，多线程执行
+ENGINE_INDEX = "index"  # 先用 n-gram 倒排索引筛选候选，再对少量候选打分
+ENGINE_TFIDF = "tfidf"  # 字符 n-gram TF-IDF 稀疏矩阵乘法，输出前 n_best 个匹配（需要 scipy）
+ENGINES = (ENGINE_CDIST, ENGINE_INDEX, ENGINE_TFIDF, ENGINE_EXTRACT)
+
+DEFAULT_BLOCK_SIZE = 200
+DEFAULT_TOP_K = 20
+
+# 归一化时删除的字符：标点、空白、下划线及 +/- 等分隔符（中文字符属于 \w，会被保留）
+_SEPARATOR_PATTERN = r"[\W_]+"
+
+
+class MatchCache:
+    """跨调用的匹配结果缓存，按最近使用顺序淘汰（LRU）。
+
+    缓存键由候选集指纹、打分函数和源值组成，候选列或算法变化后不会误命中。
+
+    示例：
+    >>> cache = MatchCache(max_entries=100000)
+    >>> fuzzy_match_column(df, "订单地址", "门店地址", cache=cache)
+    >>> fuzzy_match_column(df, "订单地址", "门店地址", cache=cache)  # 几乎不再打分
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self._max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值并标记为最近使用"""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_keys(values) -> np.ndarray:
+    """向量化地生成归一化匹配键：全角转半角（NFKC）、转小写、去掉标点和分隔符"""
+    # 保持 object 类型，使用 Python re 的 Unicode 语义（Arrow 字符串的正则中 \W 只识别 ASCII）
+    keys = pd.Series([str(value) for value in values], dtype=object)
+    keys = keys.str.normalize("NFKC").str.lower().str.replace(_SEPARATOR_PATTERN, "", regex=True)
+    return keys.to_numpy(dtype=object)
+
+
+def _cached_keys(values: List, cache: Optional[MatchCache]) -> np.ndarray:
+    """获取一列值的归一化键，提供缓存时按列内容复用"""
+    if cache is None:
+        return normalize_keys(values)
+    cache_key = ("normalized_keys", len(values), hash(tuple(values)))
+    keys = cache.get(cache_key)
+    if keys is None:
+        keys = normalize_keys(values)
+        cache.put(cache_key, keys)
+    return keys
+
+
+def _exact_join(values: List, candidates: List, cache: Optional[MatchCache] = None) -> np.ndarray:
+    """按归一化键做哈希连接，返回每个值精确命中的候选编号，未命中为 -1
+
+    多个候选归一化后相同时取第一个；归一化后为空字符串的值不参与连接。
+    """
+    if not values or not candidates:
+        return np.full(len(values), -1, dtype=np.int64)
+
+    candidate_keys = pd.Index(_cached_keys(candidates, cache))
+    first = ~candidate_keys.duplicated(keep="first")
+    lookup = pd.Index(candidate_keys[first])
+    positions = np.flatnonzero(first)
+
+    value_keys = _cached_keys(values, cache)
+    hit = lookup.get_indexer(value_keys)
+    result = np.where(hit >= 0, positions[hit], -1)
+    result[value_keys == ""] = -1
+    return result
+
+
+def _match_extract(
+        values: List[str],
+        candidates: List[str],
+        scorer: Callable
+) -> Tuple[List[Optional[str]], List[Optional[float]]]:
+    """逐个值在候选列表中查找最佳匹配"""
+    matches = []
+    scores = []
+    for val in values:
+        match = process.extractOne(val, candidates, scorer=scorer)
+        if match:
+            best_match, score, _ = match
+            matches.append(best_match)
+            scores.append(score)
+        else:
+            matches.append(None)
+            scores.append(None)
+    return matches, scores
+
+
+def _match_cdist(
+        values: List[str],
+        candidates: List[str],
+        scorer: Callable,
+        workers: int = -1,
+        block_size: int = DEFAULT_BLOCK_SIZE
+) -> Tuple[List[Optional[str]], List[Optional[float]]]:
+    """分块计算得分矩阵并取每行最大值
 
+    每块只生成 block_size × len(candidates) 的得分矩阵，峰值内存由块大小决定；
+    argmax 取第一个最大值，与 extractOne 的结果保持一致。
+    """
+    if not candidates:
+        return [None] * len(values), [None] * len(values)
+
+    candidate_arr = np.asarray(candidates, dtype=object)
+    matches = []
+    scores = []
+    for start in range(0, len(values), block_size):
+        block = values[start:start + block_size]
+        matrix = process.cdist(block, candidates, scorer=scorer, dtype=np.float64, workers=workers)
+        best_idx = matrix.argmax(axis=1)
+        matches.extend(candidate_arr[best_idx].tolist())
+        scores.extend(matrix[np.arange(len(block)), best_idx].tolist())
+    return matches, scores
+
+
+def _match_index(
+        values: List[str],
+        candidates: List[str],
+        scorer: Callable,
+        top_k: int = DEFAULT_TOP_K,
+        ngram: int = 2,
+        scan_ratio: float = 0.5
+) -> Tuple[List[Optional[str]], List[Optional[float]]]:
+    """通过 n-gram 倒排索引为每个值筛选 top_k 个候选后再打分
+
+    top_k、scan_ratio 越大召回越高、速度越慢；没有任何共享 n-gram 的值回退到全量候选。
+    """
+    if not candidates:
+        return [None] * len(values), [None] * len(values)
+
+    index = NGramIndex(candidates, n=ngram, scan_ratio=scan_ratio)
+    matches = []
+    scores = []
+    for val in values:
+        ids = index.query(val, top_k)
+        subset = [candidates[i] for i in ids] if len(ids) else candidates
+        match = process.extractOne(val, subset, scorer=scorer)
+        if match:
+            best_match, score, _ = match
+            matches.append(best_match)
+            scores.append(score)
+        else:
+            matches.append(None)
+            scores.append(None)
+    return matches, scores
 
+
+def _match_tfidf(
+        values: List[str],
+        candidates: List[str],
+        n_best: int = 1
+) -> Tuple[List[List[Optional[str]]], List[List[Optional[float]]]]:
+    """TF-IDF 余弦相似度匹配，返回每个值前 n_best 个匹配及得分，不足的位置为 None"""
+    ids, scores = tfidf_top_k(values, candidates, k=n_best)
+    candidate_arr = np.append(np.asarray(candidates, dtype=object), None)
+    # 编号 -1 对应末尾的 None
+    matches = candidate_arr[ids].tolist()
+    scores = np.where(ids >= 0, scores, np.nan).tolist()
+    scores = [[None if np.isnan(score) else score for score in row] for row in scores]
+    # 候选数少于 n_best 时补齐
+    pad = [None] * (n_best - ids.shape[1])
+    return [row + pad for row in matches], [row + pad for row in scores]
+
+
+@traced("fuzzy_match_column", rows=len, fields=("engine", "n_best"))
 def fuzzy_match_column(
         df: pd.DataFrame,
         source_col: str,
         candidate_col: str,
         scorer: Callable = fuzz.token_sort_ratio,
         result_col_match: str = "最佳匹配",
-        result_col_score: str = "相似度"
+        result_col_score: str = "相似度",
+        engine: str = ENGINE_CDIST,
+        workers: int = -1,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        cache: Optional[MatchCache] = None,
+        top_k: int = DEFAULT_TOP_K,
+        ngram: int = 2,
+        scan_ratio: float = 0.5,
+        n_best: int = 1,
+        exact_first: bool = True,
+        candidates: Optional[List] = None
 ) -> pd.DataFrame:
     """
     对 DataFrame 中 source_col 的每一项，在 candidate_col 中找到最相似的一项。
@@ -21,33 +228,135 @@ def fuzzy_match_column(
     - scorer: 匹配算法，默认为 fuzz.token_sort_ratio
     - result_col_match: 输出的匹配结果列名
     - result_col_score: 输出的匹配得分列名
+    - engine: 匹配引擎，"cdist" 为分块矩阵打分（默认），"extract" 为逐个值匹配，
+      "index" 为 n-gram 倒排索引筛选候选后再打分（近似匹配，适合大候选集），
+      "tfidf" 为字符 n-gram TF-IDF 余弦相似度（稀疏矩阵乘法，不使用 scorer，需要 scipy）
+    - workers: cdist 引擎使用的线程数，-1 表示使用全部 CPU 核心
+    - block_size: cdist 引擎每块的源值个数，决定峰值内存
+    - cache: 可选的 MatchCache，跨调用复用已匹配过的值
+    - top_k: index 引擎为每个值保留的候选数，越大召回越高、速度越慢
+    - ngram: index 引擎切分 n-gram 的字符数
+    - scan_ratio: index 引擎每次查询最多扫描的倒排条目占候选总数的比例，越小越快、召回越低
+    - n_best: 输出的匹配个数，仅 tfidf 引擎支持大于 1；第 i 个匹配写入
+      f"{result_col_match}{i}" 和 f"{result_col_score}{i}" 列（i >= 2）
+    - exact_first: 先对两列做归一化（全角转半角、去标点和分隔符）后精确连接，
+      命中的值得分记为 100，只有未命中的值才进行模糊打分
+    - candidates: 直接指定候选值列表（不含空值），为空时取 candidate_col 列的不同值；
+      分段匹配时用于传入全部数据的候选值
 
     返回:
-    - 增加了匹配结果和分数的新 DataFrame
+    - 增加了匹配结果和分数的新 DataFrame，df.attrs["fuzzy_match"] 中记录
+      非空行数、去重后的值个数、归一化精确命中数和缓存命中数
     """
-    candidates = df[candidate_col].dropna().unique().tolist()
+    if engine not in ENGINES:
+        raise ValueError(f"未知的匹配引擎: {engine}")
+    if n_best > 1 and engine != ENGINE_TFIDF:
+        raise ValueError(f"{engine} 引擎只支持输出 1 个匹配")
 
-    matches = []
-    scores = []
+    if candidates is None:
+        candidates = df[candidate_col].dropna().unique().tolist()
 
-    for val in df[source_col]:
-        if pd.isna(val):
-            matches.append(None)
-            scores.append(None)
-        else:
-            match = process.extractOne(val, candidates, scorer=scorer)
-            if match:
-                best_match, score, _ = match
-                matches.append(best_match)
-                scores.append(f"{score:.2f}")
+    # 源列去重，每个不同的值只匹配一次；codes 中空值为 -1
+    codes, uniques = pd.factorize(df[source_col])
+    unique_values = uniques.tolist()
+
+    # 每个值的结果为 n_best 个 (匹配值, 得分文本)
+    unique_results: List[Optional[Tuple[Tuple[Optional[str], Optional[str]], ...]]] = [None] * len(unique_values)
+    pending = list(range(len(unique_values)))
+
+    # 归一化键精确命中的值直接得 100 分，无需模糊打分
+    exact_hits = 0
+    if exact_first:
+        exact = _exact_join(unique_values, candidates, cache)
+        padding = ((None, None),) * (n_best - 1)
+        for i in np.flatnonzero(exact >= 0):
+            unique_results[i] = ((candidates[exact[i]], f"{100:.2f}"),) + padding
+        pending = np.flatnonzero(exact < 0).tolist()
+        exact_hits = len(unique_values) - len(pending)
+
+    # 再从缓存中取已匹配过的值
+    if cache is not None:
+        candidates_key = (len(candidates), hash(tuple(candidates)))
+        if engine == ENGINE_INDEX:
+            # 近似引擎的结果与参数有关，不能与精确结果共用缓存
+            candidates_key += (engine, top_k, ngram, scan_ratio)
+        elif engine == ENGINE_TFIDF:
+            # TF-IDF 得分与 rapidfuzz 打分函数无关
+            candidates_key += (engine, n_best)
+        still_pending = []
+        for i in pending:
+            cached = cache.get((candidates_key, scorer, unique_values[i]))
+            if cached is None:
+                still_pending.append(i)
             else:
-                matches.append(None)
-                scores.append(None)
+                unique_results[i] = cached
+        pending = still_pending
+
+    values = [unique_values[i] for i in pending]
+    if engine == ENGINE_TFIDF:
+        value_matches, value_scores = _match_tfidf(values, candidates, n_best)
+    else:
+        if engine == ENGINE_EXTRACT:
+            value_matches, value_scores = _match_extract(values, candidates, scorer)
+        elif engine == ENGINE_CDIST:
+            value_matches, value_scores = _match_cdist(values, candidates, scorer, workers, block_size)
+        else:
+            value_matches, value_scores = _match_index(values, candidates, scorer, top_k, ngram, scan_ratio)
+        value_matches = [[match] for match in value_matches]
+        value_scores = [[score] for score in value_scores]
 
-    df[result_col_match] = matches
-    df[result_col_score] = scores
+    for i, matches, scores in zip(pending, value_matches, value_scores):
+        result = tuple(
+            (match, None if score is None else f"{score:.2f}")
+            for match, score in zip(matches, scores)
+        )
+        unique_results[i] = result
+        if cache is not None:
+            cache.put((candidates_key, scorer, unique_values[i]), result)
+
+    # 按 codes 将去重后的结果广播回每一行
+    for k in range(n_best):
+        suffix = "" if k == 0 else str(k + 1)
+        unique_matches = np.empty(len(unique_values) + 1, dtype=object)
+        unique_scores = np.empty(len(unique_values) + 1, dtype=object)
+        unique_matches[:-1] = [result[k][0] for result in unique_results]
+        unique_scores[:-1] = [result[k][1] for result in unique_results]
+        # 末尾的 None 对应空值（codes 为 -1）
+        df[f"{result_col_match}{suffix}"] = unique_matches[codes]
+        df[f"{result_col_score}{suffix}"] = unique_scores[codes]
+
+    df.attrs["fuzzy_match"] = {
+        "rows": int((codes >= 0).sum()),
+        "unique": len(unique_values),
+        "exact": exact_hits,
+        "cache_hits": len(unique_values) - exact_hits - len(pending),
+    }
     return df
 
+@traced("fuzzy_match_segments", rows=lambda stats: stats["rows"], fields=("engine", "n_best"))
+def fuzzy_match_segments(store, source_col: str, candidate_col: str, cache: Optional[MatchCache] = None,
+                         **kwargs) -> dict:
+    """对磁盘分段存储（SegmentStore）逐段执行 fuzzy_match_column，结果列写回各段
+
+    候选值先从全部段中收集，各段共用同一个 MatchCache，不同段中重复出现的值只打分一次；
+    内存中同时只有一个段。其余参数与 fuzzy_match_column 相同。
+
+    :return: 各段统计的合计，"unique" 为各段去重后值个数之和
+    """
+    candidates = store.unique_values(candidate_col)
+    if cache is None:
+        cache = MatchCache()
+    stats = {"rows": 0, "unique": 0, "exact": 0, "cache_hits": 0}
+    for index in range(store.n_segments):
+        segment = fuzzy_match_column(
+            store.read_segment(index), source_col, candidate_col, cache=cache, candidates=candidates, **kwargs
+        )
+        for key in stats:
+            stats[key] += segment.attrs["fuzzy_match"][key]
+        store.replace(index, segment)
+    return stats
+
+
 if __name__=="__main__":
     # 示例数据
     data = {
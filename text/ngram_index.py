@@ -0,0 +1,70 @@
+from collections import defaultdict
+from typing import Iterable, List, Set
+
+import numpy as np
+
+
+class NGramIndex:
+    """候选值的字符 n-gram 倒排索引，用于在模糊匹配前筛选候选集。
+
+    中文地址没有空格分词，按连续字符切分 n-gram（默认二元）即可覆盖
+    "荷塘物语"、"天河路" 这类片段。查询时只返回与源值共享 n-gram 最多的
+    top_k 个候选，打分函数只需在这些候选上执行。
+
+    示例：
+    >>> index = NGramIndex(["珠海店+荷塘物语11栋1601", "广州店-天河路123"])
+    >>> index.query("广州店天河路123号", top_k=1)
+    array([1], dtype=int32)
+    """
+
+    def __init__(self, candidates: Iterable, n: int = 2, scan_ratio: float = 0.5):
+        """构建索引
+
+        :param candidates: 候选值序列，索引位置即候选编号
+        :param n: n-gram 的字符数
+        :param scan_ratio: 每次查询最多扫描的倒排条目数占候选总数的比例，
+                           越小越快、召回越低
+        """
+        self.candidates: List = list(candidates)
+        self.n = n
+
+        postings = defaultdict(list)
+        for idx, candidate in enumerate(self.candidates):
+            for gram in self.grams(candidate):
+                postings[gram].append(idx)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._scan_budget = max(1, int(scan_ratio * len(self.candidates)))
+
+    def grams(self, text) -> Set[str]:
+        """切分字符 n-gram，长度不足 n 时以整个字符串作为一个 gram"""
+        text = str(text)
+        if len(text) < self.n:
+            return {text} if text else set()
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def query(self, text, top_k: int = 20) -> np.ndarray:
+        """返回共享 n-gram 最多的 top_k 个候选编号（按编号升序），无重叠时返回空数组"""
+        lists = [self._postings[gram] for gram in self.grams(text) if gram in self._postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+
+        # 从最稀有的 n-gram 开始累加，倒排列表总长度超过预算后停止，
+        # 常见 n-gram 区分度低且列表很长，是查询耗时的主要来源
+        lists.sort(key=len)
+        total = len(lists[0])
+        used = 1
+        while used < len(lists) and total + len(lists[used]) <= self._scan_budget:
+            total += len(lists[used])
+            used += 1
+        lists = lists[:used]
+
+        # 候选编号是稠密整数，bincount 计数比排序去重快得多
+        counts = np.bincount(np.concatenate(lists))
+        ids = np.flatnonzero(counts)
+        if len(ids) > top_k:
+            keep = np.argpartition(-counts[ids], top_k - 1)[:top_k]
+            ids = np.sort(ids[keep])
+        return ids.astype(np.int32, copy=False)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
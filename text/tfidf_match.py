@@ -0,0 +1,164 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# 每块得分矩阵的最大单元格数；得分矩阵按稀疏格式保存，实际内存只与其中的非零得分个数有关
+MAX_BLOCK_CELLS = 20_000_000
+# 文档数不超过该值的 n-gram 总是保留：max_df 只为防止大数据量时相似度矩阵过于稠密，
+# 小数据量下按比例剔除会删掉几乎所有共享 n-gram，导致匹配不到任何候选
+MAX_DF_MIN_COUNT = 1000
+
+
+def char_ngrams(text, ngram_range: Tuple[int, int] = (2, 3)) -> List[str]:
+    """切分字符 n-gram，适用于没有空格分词的中文文本"""
+    text = str(text)
+    grams = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+class CharTfidf:
+    """字符 n-gram TF-IDF 向量化器，输出 L2 归一化的稀疏矩阵（CSR）。
+
+    idf 采用平滑公式 log((1 + N) / (1 + df)) + 1，在源值与候选值的并集上统计。
+    出现在超过 max_df 比例文本中的 n-gram（如地址里的"店"、"号"）区分度很低，
+    却会让相似度矩阵变成稠密矩阵，因此不进入词表；出现次数不超过 MAX_DF_MIN_COUNT 的
+    n-gram 不受此限制，小数据量时全部保留。
+
+    >>> vectorizer = CharTfidf().fit(["北京市朝阳区", "北京市海淀区"])
+    >>> "北京" in vectorizer.vocabulary
+    True
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (2, 3), max_df: float = 0.1):
+        if sparse is None:
+            raise ImportError("TF-IDF 匹配引擎需要安装 scipy：pip install scipy")
+        self.ngram_range = ngram_range
+        self.max_df = max_df
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+
+    def fit(self, *corpora: List) -> "CharTfidf":
+        """在一个或多个文本集合上建立词表并统计 idf"""
+        df_counter = Counter()
+        n_docs = 0
+        for corpus in corpora:
+            for text in corpus:
+                df_counter.update(set(char_ngrams(text, self.ngram_range)))
+                n_docs += 1
+
+        max_count = max(self.max_df * n_docs, MAX_DF_MIN_COUNT)
+        kept = [(gram, count) for gram, count in df_counter.items() if count <= max_count]
+        self.vocabulary = {gram: i for i, (gram, _) in enumerate(kept)}
+        df = np.fromiter((count for _, count in kept), dtype=np.float64, count=len(kept))
+        self.idf = np.log((1 + n_docs) / (1 + df)) + 1
+        return self
+
+    def transform(self, texts: List) -> "sparse.csr_matrix":
+        """将文本转换为 TF-IDF 稀疏矩阵，词表外的 n-gram 忽略"""
+        indptr = [0]
+        indices = []
+        data = []
+        vocabulary = self.vocabulary
+        for text in texts:
+            counts = Counter(
+                vocabulary[gram] for gram in char_ngrams(text, self.ngram_range) if gram in vocabulary
+            )
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(texts), len(vocabulary)),
+        )
+        matrix = matrix @ sparse.diags(self.idf)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ matrix
+
+    def __repr__(self) -> str:
+        return f"CharTfidf(ngram_range={self.ngram_range}, vocabulary_size={len(self.vocabulary)})"
+
+
+def _csr_top_k(matrix: "sparse.csr_matrix", k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """从 CSR 矩阵的非零元素中选出每行得分最高的 k 个列编号及得分
+
+    直接在 data / indices / indptr 上按行求最大值 k 次，不展开为稠密矩阵，也不对全部非零元素排序；
+    得分相同时编号小的在前，不足 k 个的位置编号为 -1、得分为 0。
+    """
+    n_rows, n_cols = matrix.shape
+    ids = np.full((n_rows, k), -1, dtype=np.int64)
+    scores = np.zeros((n_rows, k), dtype=np.float64)
+    matrix.eliminate_zeros()
+    if not matrix.nnz:
+        return ids, scores
+
+    counts = np.diff(matrix.indptr)
+    rows = np.flatnonzero(counts)
+    starts = matrix.indptr[:-1][rows]
+    # 每个非零元素所在的行（在非空行中的序号）
+    owner = np.repeat(np.arange(len(rows)), counts[rows])
+    data = matrix.data.copy()
+    indices = matrix.indices
+    for j in range(k):
+        best = np.maximum.reduceat(data, starts)
+        is_best = data == best[owner]
+        col = np.minimum.reduceat(np.where(is_best, indices, n_cols), starts)
+        found = best > 0
+        ids[rows[found], j] = col[found]
+        scores[rows[found], j] = best[found]
+        # 已选中的元素不再参与下一轮
+        data[is_best & (indices == col[owner])] = -np.inf
+    return ids, scores
+
+
+def tfidf_top_k(
+        values: List,
+        candidates: List,
+        k: int = 1,
+        ngram_range: Tuple[int, int] = (2, 3),
+        max_df: float = 0.1
+) -> Tuple[np.ndarray, np.ndarray]:
+    """计算每个值与候选值的 TF-IDF 余弦相似度，返回前 k 个候选编号及得分（0-100）
+
+    源矩阵按块与候选矩阵的转置相乘，每块得分矩阵不超过 MAX_BLOCK_CELLS 个单元格；
+    得分相同时编号小的候选在前。没有共享 n-gram 的位置编号为 -1、得分为 0。
+
+    :return: (编号矩阵, 得分矩阵)，形状均为 (len(values), k)
+
+    >>> ids, scores = tfidf_top_k(["北京市朝阳区建国路88号", "上海市浦东新区世纪大道100号"],
+    ...                           ["上海浦东世纪大道100号", "北京朝阳区建国路88号", "深圳市南山区科技园"])
+    >>> ids[:, 0].tolist()
+    [1, 0]
+    """
+    k = min(k, len(candidates))
+    ids = np.full((len(values), k), -1, dtype=np.int64)
+    scores = np.zeros((len(values), k), dtype=np.float64)
+    if not values or not k:
+        return ids, scores
+
+    vectorizer = CharTfidf(ngram_range, max_df).fit(values, candidates)
+    source = vectorizer.transform(values)
+    target_t = vectorizer.transform(candidates).T.tocsr()
+
+    block_size = max(1, MAX_BLOCK_CELLS // len(candidates))
+    for start in range(0, len(values), block_size):
+        block = (source[start:start + block_size] @ target_t).tocsr()
+        block_ids, block_scores = _csr_top_k(block, k)
+        ids[start:start + block.shape[0]] = block_ids
+        scores[start:start + block.shape[0]] = np.clip(block_scores, 0, 1) * 100
+    return ids, scores
+
+
+def tfidf_available() -> bool:
+    """是否已安装 TF-IDF 引擎所需的 scipy"""
+    return sparse is not None
+
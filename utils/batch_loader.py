@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from utils.cancellation import CancellationToken
+from utils.excel_reader import DEFAULT_CHUNK_SIZE, concat_chunks
+from utils.file_reader import BACKEND_AUTO, iter_file_chunks, sheet_names
+
+SOURCE_FILE_COL = "来源文件"
+SOURCE_SHEET_COL = "来源工作表"
+# 等待子进程结果时检查取消标志的间隔（秒）
+CANCEL_POLL_SECONDS = 0.05
+
+
+def read_sheet(
+        file_path: str,
+        sheet: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        backend: str = BACKEND_AUTO
+) -> pd.DataFrame:
+    """完整读取一个工作表（在子进程中执行，须为模块级函数以便序列化），解析统计保存在 attrs["read_report"]"""
+    report = {}
+    df = concat_chunks(list(iter_file_chunks(file_path, chunk_size, sheet=sheet or 0, preferred=backend, report=report)))
+    df.attrs["read_report"] = report
+    return df
+
+
+def _tag(df: pd.DataFrame, file_path: str, sheet: str) -> pd.DataFrame:
+    """在最前面插入来源文件和来源工作表列"""
+    df = df.reset_index(drop=True)
+    df.insert(0, SOURCE_SHEET_COL, sheet, allow_duplicates=True)
+    df.insert(0, SOURCE_FILE_COL, os.path.basename(file_path), allow_duplicates=True)
+    return df
+
+
+def load_workbooks(
+        file_paths: Sequence[Union[str, Path]],
+        max_workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        backend: str = BACKEND_AUTO,
+        token: Optional[CancellationToken] = None
+) -> pd.DataFrame:
+    """并行解析多个工作簿的所有工作表，合并为一个 DataFrame
+
+    解析是 CPU 密集型操作且受 GIL 限制，因此每个工作表作为一个任务提交到
+    ProcessPoolExecutor。结果按文件和工作表的原始顺序合并，并增加"来源文件"、
+    "来源工作表"两列；各表列不一致时取并集，缺失的值为空。CSV、Parquet 文件视为
+    只有一个工作表，来源工作表为空。
+
+    单个文件解析失败不影响其它文件，错误记录在 df.attrs["batch_load"]["errors"] 中，
+    各解析后端的累计耗时记录在 df.attrs["batch_load"]["backends"] 中。
+
+    :param file_paths: 工作簿路径
+    :param max_workers: 进程数，为空时使用 CPU 核心数
+    :param chunk_size: 读取时每个块的行数
+    :param progress_callback: 每完成一个工作表调用一次，参数为 (文件路径, 该文件已完成的工作表数, 该文件工作表总数)
+    :param backend: 指定的解析后端名称，默认自动选择
+    :param token: 取消标志，取消后不再提交新的工作表并抛出 TaskCancelled（已在子进程中解析的工作表不等待其结束）
+    :return: 合并后的 DataFrame
+    """
+    started = time.perf_counter()
+    file_paths = [str(path) for path in file_paths]
+
+    errors: Dict[str, str] = {}
+    tasks: List[Tuple[str, str]] = []
+    sheet_counts: Dict[str, int] = {}
+    for path in file_paths:
+        try:
+            names = sheet_names(path, backend)
+        except Exception as e:
+            errors[path] = str(e)
+            continue
+        sheet_counts[path] = len(names)
+        tasks.extend((path, name) for name in names)
+
+    results: Dict[Tuple[str, str], pd.DataFrame] = {}
+    done_counts = dict.fromkeys(sheet_counts, 0)
+    backend_seconds: Dict[str, float] = {}
+
+    def collect(task: Tuple[str, str], result: Optional[pd.DataFrame], error: Optional[Exception]) -> None:
+        path = task[0]
+        if error is not None:
+            errors.setdefault(path, f"{task[1]}: {error}" if task[1] else str(error))
+        else:
+            report = result.attrs.get("read_report", {})
+            if report.get("backend"):
+                name = report["backend"]
+                backend_seconds[name] = round(backend_seconds.get(name, 0) + (report["seconds"] or 0), 3)
+            if not result.empty:
+                results[task] = result
+        done_counts[path] += 1
+        if progress_callback:
+            progress_callback(path, done_counts[path], sheet_counts[path])
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        # 只有一个任务或一个进程时不必启动子进程
+        for task in tasks:
+            if token is not None:
+                token.raise_if_cancelled()
+            try:
+                collect(task, read_sheet(task[0], task[1], chunk_size, backend), None)
+            except Exception as e:
+                collect(task, None, e)
+    else:
+        # 从带有 Qt 线程池、数据库连接池的进程 fork 可能死锁，子进程以 spawn 方式重新启动
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = {executor.submit(read_sheet, path, sheet, chunk_size, backend): (path, sheet) for path, sheet in tasks}
+            pending = set(futures)
+            while pending:
+                if token is not None:
+                    token.raise_if_cancelled()
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        collect(futures[future], None, e)
+                    else:
+                        collect(futures[future], result, None)
+        finally:
+            # 取消时丢弃排队中的工作表，不等待正在解析的子进程
+            executor.shutdown(wait=not (token is not None and token.cancelled), cancel_futures=True)
+
+    frames = [_tag(results[task], *task) for task in tasks if task in results]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        if errors:
+            raise ValueError("所有文件读取失败：\n" + "\n".join(f"{path}: {msg}" for path, msg in errors.items()))
+        df = pd.DataFrame(columns=[SOURCE_FILE_COL, SOURCE_SHEET_COL])
+
+    df.attrs["batch_load"] = {
+        "files": len(file_paths),
+        "sheets": len(results),
+        "rows": len(df),
+        "seconds": round(time.perf_counter() - started, 3),
+        "errors": errors,
+        "backends": backend_seconds,
+    }
+    return df
@@ -0,0 +1,34 @@
+import threading
+
+
+class TaskCancelled(Exception):
+    """任务已被取消（或被更新的任务取代），长循环检查到取消后抛出"""
+
+
+class CancellationToken:
+    """线程安全的取消标志，由调度器设置，任务中的长循环定期检查
+
+    示例：
+    >>> token = CancellationToken()
+    >>> for chunk in chunks:
+    ...     token.raise_if_cancelled()
+    """
+
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TaskCancelled()
+
+    def __bool__(self) -> bool:
+        return self._event.is_set()
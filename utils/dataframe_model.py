@@ -0,0 +1,183 @@
+from bisect import bisect_right
+from typing import Any, Optional
+
+import pandas as pd
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from utils.display_format import DATETIME_FORMAT, DisplayCache, format_value, numeric_flags
+
+# data() 每个可见单元格的每个角色都会调用一次，预先取出整数值，避免每次比较 Qt 枚举
+_DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole.value
+_ALIGNMENT_ROLE = Qt.ItemDataRole.TextAlignmentRole.value
+_ALIGN_RIGHT = (Qt.AlignRight | Qt.AlignVCenter).value
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    """直接以 pandas DataFrame 为数据源的只读表格模型。
+
+    特性：
+    - 单元格按需格式化，只有可见行所在的行块才会被整块向量化转换为显示文本，结果缓存供重绘复用
+    - 不创建任何 QTableWidgetItem，内存占用接近 DataFrame 本身
+    - 通过 set_dataframe 整体替换底层数据，视图自动刷新
+    - 通过 append_dataframe 追加分块数据，适配流式加载
+    - 通过 set_store 以磁盘分段存储（SegmentStore）为数据源，滚动时按段从磁盘读取
+
+    示例：
+    >>> model = DataFrameTableModel()
+    >>> view.setModel(model)
+    >>> model.set_dataframe(df)
+    """
+
+    DATETIME_FORMAT = DATETIME_FORMAT
+
+    def __init__(self, parent=None, dataframe: Optional[pd.DataFrame] = None):
+        super().__init__(parent)
+        self._frames = []
+        self._chunks = []  # 每个块的列数组列表
+        self._offsets = []  # 每个块的起始行号
+        self._row_count = 0
+        self._header = []
+        self._numeric = []
+        self._store = None
+        self._display = DisplayCache()  # 格式化后的显示文本，数据源替换时清空
+        if dataframe is not None:
+            self.set_dataframe(dataframe)
+
+    # ----------------------------数据源----------------------------
+    @staticmethod
+    def _column_arrays(dataframe: pd.DataFrame) -> list:
+        # category、Arrow 字符串等扩展类型直接使用原数组，转换为 numpy 会重新生成 object 数组
+        return [
+            series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+            for series in (dataframe.iloc[:, i] for i in range(dataframe.shape[1]))
+        ]
+
+    def _reset_storage(self, dataframe: pd.DataFrame) -> None:
+        self._store = None
+        self._frames = [dataframe]
+        self._chunks = [self._column_arrays(dataframe)]
+        self._offsets = [0]
+        self._row_count = dataframe.shape[0]
+        self._header = [str(col) for col in dataframe.columns]
+        self._numeric = numeric_flags(dataframe.dtypes)
+        self._display.clear()
+
+    def set_dataframe(self, dataframe: pd.DataFrame) -> None:
+        """替换底层 DataFrame 并通知视图刷新
+
+        行数和列名不变时（如流式加载结束后换成合并后的完整数据）只发出 dataChanged，
+        保留视图的滚动位置和选区；否则重置整个模型。
+        """
+        same_shape = (
+            dataframe.shape[0] == self._row_count
+            and [str(col) for col in dataframe.columns] == self._header
+        )
+        if same_shape and self._row_count:
+            self._reset_storage(dataframe)
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self._row_count - 1, len(self._header) - 1),
+            )
+            return
+
+        self.beginResetModel()
+        self._reset_storage(dataframe)
+        self.endResetModel()
+
+    def append_dataframe(self, dataframe: pd.DataFrame) -> None:
+        """在末尾追加一个列结构相同的数据块"""
+        if not self._row_count and not self._header:
+            self.set_dataframe(dataframe)
+            return
+        if dataframe.empty:
+            return
+
+        first = self._row_count
+        last = first + dataframe.shape[0] - 1
+        self.beginInsertRows(QModelIndex(), first, last)
+        self._frames.append(dataframe)
+        self._chunks.append(self._column_arrays(dataframe))
+        self._offsets.append(first)
+        self._row_count = last + 1
+        self.endInsertRows()
+
+    def set_store(self, store) -> None:
+        """以磁盘分段存储为数据源，显示其中已写入的行"""
+        self.beginResetModel()
+        self._frames = []
+        self._chunks = []
+        self._offsets = []
+        self._store = store
+        self._row_count = len(store)
+        self._header = list(store.columns)
+        self._numeric = numeric_flags(store.dtypes) if store.dtypes is not None else []
+        self._display.clear()
+        self.endResetModel()
+
+    def store_rows_appended(self) -> None:
+        """分段存储追加了新的段后调用，通知视图插入新增的行"""
+        if self._store is None:
+            return
+        if len(self._header) != len(self._store.columns):
+            # 第一个段写入前列结构未知，或新的段增加了列，直接重置
+            self.set_store(self._store)
+            return
+        total = len(self._store)
+        if total <= self._row_count:
+            return
+        self.beginInsertRows(QModelIndex(), self._row_count, total - 1)
+        self._row_count = total
+        self.endInsertRows()
+
+    def dataframe(self) -> pd.DataFrame:
+        """返回当前的底层 DataFrame，多个块时合并后返回"""
+        if not self._frames:
+            return pd.DataFrame()
+        if len(self._frames) == 1:
+            return self._frames[0]
+        return pd.concat(self._frames)
+
+    # ----------------------------模型接口----------------------------
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._row_count
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._header)
+
+    def _text(self, row: int, col: int) -> str:
+        """单元格的显示文本，所在行块整块格式化后缓存"""
+        if self._store is not None:
+            index, local = self._store.locate(row)
+            return self._display.text(("segment", index, col), self._store.segment_column(index, col), local)
+        chunk_idx = bisect_right(self._offsets, row) - 1
+        return self._display.text(("chunk", chunk_idx, col), self._chunks[chunk_idx][col],
+                                  row - self._offsets[chunk_idx])
+
+    def data(self, index: QModelIndex, role: int = _DISPLAY_ROLE) -> Any:
+        if role == _DISPLAY_ROLE:
+            if not index.isValid():
+                return None
+            return self._text(index.row(), index.column())
+
+        if role == _ALIGNMENT_ROLE and index.isValid() and self._numeric[index.column()]:
+            return _ALIGN_RIGHT
+
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = _DISPLAY_ROLE) -> Any:
+        if role != _DISPLAY_ROLE:
+            return None
+        if orientation == Qt.Horizontal:
+            if section < len(self._header):
+                return self._header[section]
+            return None
+        return str(section + 1)
+
+    @staticmethod
+    def format_value(value: Any) -> str:
+        """将单个值转换为显示文本，空值显示为空字符串"""
+        return format_value(value)
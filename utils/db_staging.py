@@ -0,0 +1,219 @@
+import uuid
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, Float, Integer, MetaData, Numeric, SmallInteger,
+                        String, Table, Text, inspect)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.types import TypeEngine
+
+from utils.db_sync import fingerprint_table_name
+from utils.db_writer import DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, create_index, insert_rows
+from utils.write_tuner import AdaptiveBatchSizer
+
+STAGING_SUFFIX = "__staging"
+OLD_SUFFIX = "__old"
+
+# 超过该长度的字符串列使用 TEXT
+MAX_VARCHAR_LENGTH = 2048
+# MySQL 单行 VARCHAR 总字节数上限（utf8mb4 每字符最多 4 字节）
+MAX_ROW_BYTES = 65535
+# 判断浮点列能否存为 DECIMAL 时允许的最大小数位数
+MAX_DECIMAL_SCALE = 4
+
+
+def _varchar_length(max_len: int) -> int:
+    """按观测到的最大长度向上取整到 16 的倍数"""
+    return max(16, -(-max_len // 16) * 16)
+
+
+def _decimal_type(series: pd.Series) -> Optional[TypeEngine]:
+    """浮点列的所有值都能用不超过 MAX_DECIMAL_SCALE 位小数精确表示时返回 DECIMAL 类型"""
+    values = series.dropna().to_numpy(dtype=np.float64)
+    if not len(values) or not np.isfinite(values).all():
+        return None
+    for scale in range(MAX_DECIMAL_SCALE + 1):
+        if np.allclose(values, np.round(values, scale), rtol=0, atol=1e-9):
+            break
+    else:
+        return None
+    integer_digits = len(str(int(np.abs(values).max())))
+    precision = integer_digits + scale
+    if precision > 38:
+        return None
+    return Numeric(precision=max(precision, 1), scale=scale)
+
+
+def infer_sql_types(df: pd.DataFrame) -> Dict[str, TypeEngine]:
+    """根据 DataFrame 的 dtype 和实际数据推断紧凑的列类型
+
+    - 布尔列为 BOOLEAN，整数列按取值范围选择 SMALLINT / INT / BIGINT
+    - 浮点列能精确表示为不超过 4 位小数时为 DECIMAL，否则为 DOUBLE
+    - 日期时间列为 DATETIME
+    - 其它列按观测到的最大字符长度生成 VARCHAR，过长或超出单行上限时改为 TEXT
+    """
+    types: Dict[str, TypeEngine] = {}
+    varchar_lengths: Dict[str, int] = {}
+    for col in df.columns:
+        series = df[col]
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            types[col] = Boolean()
+        elif pd.api.types.is_integer_dtype(dtype):
+            low, high = (series.min(), series.max()) if series.notna().any() else (0, 0)
+            if -32768 <= low and high <= 32767:
+                types[col] = SmallInteger()
+            elif -2 ** 31 <= low and high < 2 ** 31:
+                types[col] = Integer()
+            else:
+                types[col] = BigInteger()
+        elif pd.api.types.is_float_dtype(dtype):
+            types[col] = _decimal_type(series) or Float(precision=53)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            types[col] = DateTime()
+        else:
+            lengths = series.dropna().astype(str).str.len()
+            max_len = int(lengths.max()) if len(lengths) else 0
+            if max_len > MAX_VARCHAR_LENGTH:
+                types[col] = Text()
+            else:
+                varchar_lengths[col] = _varchar_length(max_len)
+
+    # 超出单行字节上限时，从最长的 VARCHAR 开始改为 TEXT
+    for col in sorted(varchar_lengths, key=varchar_lengths.get, reverse=True):
+        if sum(varchar_lengths.values()) * 4 < MAX_ROW_BYTES:
+            break
+        types[col] = Text()
+        del varchar_lengths[col]
+    for col, length in varchar_lengths.items():
+        types[col] = String(length)
+
+    return {col: types[col] for col in df.columns}
+
+
+def _to_decimal_frame(df: pd.DataFrame, types: Dict[str, TypeEngine]) -> pd.DataFrame:
+    """DECIMAL 列转换为 Decimal 对象，避免浮点误差写入数据库"""
+    decimal_cols = [col for col, type_ in types.items() if isinstance(type_, Numeric) and not isinstance(type_, Float)]
+    if not decimal_cols:
+        return df
+    df = df.copy()
+    for col in decimal_cols:
+        scale = types[col].scale
+        df[col] = df[col].map(lambda v: None if pd.isna(v) else Decimal(f"{v:.{scale}f}")).astype(object)
+    return df
+
+
+def _restore_checks(conn) -> None:
+    """恢复会话的唯一性和外键检查
+
+    会话变量不随事务回滚，写入失败时同样要恢复，否则连接放回连接池后，之后的追加、同步都会跳过约束检查；
+    恢复失败（如连接已断开）时作废该连接，不再放回连接池。
+    """
+    try:
+        conn.exec_driver_sql("SET unique_checks = 1, foreign_key_checks = 1")
+    except DBAPIError:
+        conn.invalidate()
+
+
+def _swap_tables(conn, table_name: str, staging_name: str, old_name: str, target_exists: bool) -> None:
+    """用暂存表原子替换目标表"""
+    quote = conn.dialect.identifier_preparer.quote
+    # 上次替换在 RENAME 之后、DROP 之前中断时会留下旧表，先删除，否则 RENAME 因表已存在而失败
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {quote(old_name)}")
+    if conn.dialect.name == "mysql":
+        if target_exists:
+            conn.exec_driver_sql(
+                f"RENAME TABLE {quote(table_name)} TO {quote(old_name)}, "
+                f"{quote(staging_name)} TO {quote(table_name)}"
+            )
+        else:
+            conn.exec_driver_sql(f"RENAME TABLE {quote(staging_name)} TO {quote(table_name)}")
+    else:
+        # SQLite 等数据库的 DDL 可在事务中执行，多条 ALTER 在同一事务内同样是原子的
+        if target_exists:
+            conn.exec_driver_sql(f"ALTER TABLE {quote(table_name)} RENAME TO {quote(old_name)}")
+        conn.exec_driver_sql(f"ALTER TABLE {quote(staging_name)} RENAME TO {quote(table_name)}")
+    if target_exists:
+        conn.exec_driver_sql(f"DROP TABLE {quote(old_name)}")
+    # 整表替换后增量同步的指纹已失效，下次同步重新建立
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {quote(fingerprint_table_name(table_name))}")
+
+
+def staged_load(
+        df: pd.DataFrame,
+        engine: Engine,
+        table_name: str,
+        index_columns: Sequence[str] = (),
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> int:
+    """通过暂存表整表替换目标表
+
+    1. 按推断出的紧凑类型创建不带索引的暂存表（表名加 __staging 后缀）
+    2. 关闭唯一性和外键检查后批量写入暂存表
+    3. 写入完成后再为 index_columns 逐列建立索引
+    4. 使用 RENAME TABLE 将暂存表原子地切换为目标表，并删除旧表和增量同步的指纹表
+
+    上次替换中断后遗留的暂存表和旧表在写入和切换前删除。
+
+    读取方在切换前始终看到完整的旧表，切换后看到完整的新表。
+
+    :param df: 新的完整数据
+    :param engine: SQLAlchemy 引擎
+    :param table_name: 目标表名
+    :param index_columns: 需要建立索引的列
+    :param chunk_size: LOAD DATA 每个临时文件的行数
+    :param batch_size: 多行 INSERT 每批的行数
+    :param progress_callback: 进度回调，参数为已写入行数占比（0-100）
+    :param sizer: 自适应批大小调整器，为空时使用固定的 chunk_size / batch_size
+    :return: 写入的行数
+    """
+    missing_columns = [col for col in index_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"索引列不存在: {missing_columns}")
+
+    staging_name = f"{table_name}{STAGING_SUFFIX}"
+    old_name = f"{table_name}{OLD_SUFFIX}"
+    types = infer_sql_types(df)
+
+    metadata = MetaData()
+    staging = Table(staging_name, metadata, *[Column(col, type_) for col, type_ in types.items()])
+    staging.drop(engine, checkfirst=True)
+    staging.create(engine)
+
+    total = len(df)
+    # 写入占 90% 进度，建索引和切换占剩余部分
+    def progress(rows_done: int) -> None:
+        if progress_callback and total:
+            progress_callback(int(rows_done / total * 90))
+
+    data = _to_decimal_frame(df, types)
+    with engine.begin() as conn:
+        relaxed = conn.dialect.name == "mysql"
+        if relaxed:
+            conn.exec_driver_sql("SET unique_checks = 0, foreign_key_checks = 0")
+        try:
+            insert_rows(conn, data, staging_name, staging, chunk_size, batch_size, progress, sizer)
+        finally:
+            if relaxed:
+                _restore_checks(conn)
+
+    # 数据写入后再建索引，比逐行维护索引快得多
+    token = uuid.uuid4().hex[:8]
+    for i, col in enumerate(index_columns):
+        create_index(engine, staging, [col], f"ix_{token}_{i}")
+    if progress_callback:
+        progress_callback(95)
+
+    target_exists = inspect(engine).has_table(table_name)
+    with engine.begin() as conn:
+        _swap_tables(conn, table_name, staging_name, old_name, target_exists)
+
+    if progress_callback:
+        progress_callback(100)
+    return total
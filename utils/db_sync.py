@@ -0,0 +1,196 @@
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import MetaData, Table, inspect, select, tuple_
+from sqlalchemy.engine import Engine
+
+from utils.db_writer import (DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, create_index, ensure_table, has_index,
+                             insert_rows)
+from utils.dtype_optimizer import widen_dtypes
+from utils.write_tuner import AdaptiveBatchSizer
+
+KEY_HASH_COL = "_key_hash"
+ROW_HASH_COL = "_row_hash"
+FINGERPRINT_SUFFIX = "__fingerprints"
+
+# 按键删除时每条语句携带的键个数
+DELETE_BATCH_SIZE = 1000
+
+
+def fingerprint_table_name(table_name: str) -> str:
+    """目标表对应的指纹表名"""
+    return f"{table_name}{FINGERPRINT_SUFFIX}"
+
+
+def row_fingerprints(df: pd.DataFrame, key_columns: Sequence[str]) -> pd.DataFrame:
+    """向量化计算每行的键哈希和整行哈希
+
+    hash_pandas_object 的结果与 dtype 有关，先将各列还原为固定的宽类型，
+    列类型压缩方式变化（如 int8 变为 int16、category 变为字符串）时未变化的行哈希不变。
+
+    :return: 包含键列、_key_hash、_row_hash 的 DataFrame，哈希以 int64 存储以兼容各数据库
+    """
+    df = widen_dtypes(df)
+    key_hash = pd.util.hash_pandas_object(df[list(key_columns)], index=False).to_numpy()
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    fingerprints = df[list(key_columns)].copy()
+    fingerprints[KEY_HASH_COL] = key_hash.view(np.int64)
+    fingerprints[ROW_HASH_COL] = row_hash.view(np.int64)
+    return fingerprints
+
+
+def stored_key_columns(engine: Engine, table_name: str) -> Optional[List[str]]:
+    """指纹表记录的键列（指纹表中哈希列以外的列），还没有指纹表时返回 None"""
+    inspector = inspect(engine)
+    fp_name = fingerprint_table_name(table_name)
+    if not inspector.has_table(fp_name):
+        return None
+    return [col["name"] for col in inspector.get_columns(fp_name) if col["name"] not in (KEY_HASH_COL, ROW_HASH_COL)]
+
+
+def _delete_by_keys(conn, table: Table, columns: Sequence[str], keys: List[tuple]) -> None:
+    """按键值分批删除行"""
+    if not keys:
+        return
+    if len(columns) == 1:
+        target = table.c[columns[0]]
+        keys = [key[0] for key in keys]
+    else:
+        target = tuple_(*[table.c[col] for col in columns])
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        conn.execute(table.delete().where(target.in_(keys[start:start + DELETE_BATCH_SIZE])))
+
+
+def _key_tuples(df: pd.DataFrame, columns: Sequence[str]) -> List[tuple]:
+    return list(df[list(columns)].astype(object).itertuples(index=False, name=None))
+
+
+def _keys_by_hash(conn, fp_table: Table, columns: Sequence[str], key_hashes: List[int]) -> List[tuple]:
+    """按键哈希分批从指纹表查询键值（使用 _key_hash 索引）"""
+    keys = []
+    for start in range(0, len(key_hashes), DELETE_BATCH_SIZE):
+        batch = key_hashes[start:start + DELETE_BATCH_SIZE]
+        stmt = select(*[fp_table.c[col] for col in columns]).where(fp_table.c[KEY_HASH_COL].in_(batch))
+        keys.extend(tuple(row) for row in conn.execute(stmt))
+    return keys
+
+
+def _ensure_index(engine: Engine, table: Table, columns: Sequence[str]) -> None:
+    """columns 上还没有索引时建立，按键删除和按哈希查找不必扫描全表"""
+    if not has_index(engine, table.name, columns):
+        create_index(engine, table, columns)
+
+
+def sync_table(
+        df: pd.DataFrame,
+        engine: Engine,
+        table_name: str,
+        key_columns: Sequence[str],
+        delete_missing: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> Dict[str, int]:
+    """按行指纹将 DataFrame 增量同步到数据库表
+
+    指纹表（表名加 __fingerprints 后缀）记录每个键的键哈希和整行哈希。同步时只写入
+    新增和内容变化的行：变化的行先按键删除再插入（即 upsert），新增的行直接插入；
+    delete_missing 为 True 时删除本次数据中已不存在的键。目标表和指纹表的修改在同一
+    事务中提交。指纹表的 _key_hash 和目标表的键列上建有索引，只读取指纹表的两个哈希列，
+    需要删除的缺失键再按哈希查询键值。
+
+    首次同步（还没有指纹表）时，目标表中可能已有以往追加写入的行，因此所有行都先按键删除再插入。
+    指纹表中保存了键列，本次的 key_columns 与之不同时旧的键哈希全部失效，删除指纹表后按首次同步处理。
+
+    :param df: 完整的最新数据
+    :param engine: SQLAlchemy 引擎
+    :param table_name: 目标表名，不存在时自动创建
+    :param key_columns: 唯一标识一行的键列
+    :param delete_missing: 是否删除本次数据中不存在的键
+    :param chunk_size: LOAD DATA 每个临时文件的行数
+    :param batch_size: 多行 INSERT 每批的行数
+    :param progress_callback: 进度回调，参数为已写入行数占比（0-100）
+    :param sizer: 自适应批大小调整器，为空时使用固定的 chunk_size / batch_size
+    :return: 新增、更新、删除、未变化的行数
+    """
+    key_columns = list(key_columns)
+    if not key_columns:
+        raise ValueError("增量同步需要指定主键列")
+    missing_columns = [col for col in key_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"主键列不存在: {missing_columns}")
+    if df[key_columns].isna().any().any():
+        raise ValueError("主键列不能包含空值")
+    if df.duplicated(subset=key_columns).any():
+        raise ValueError("主键列存在重复的键")
+
+    fp_name = fingerprint_table_name(table_name)
+    fingerprints = row_fingerprints(df, key_columns)
+
+    previous_keys = stored_key_columns(engine, table_name)
+    if previous_keys is not None and previous_keys != key_columns:
+        Table(fp_name, MetaData(), autoload_with=engine).drop(engine)
+        previous_keys = None
+    bootstrap = previous_keys is None
+    target_exists = inspect(engine).has_table(table_name)
+    if bootstrap:
+        stored = fingerprints[[KEY_HASH_COL, ROW_HASH_COL]].iloc[0:0]
+    else:
+        stored = pd.read_sql_table(fp_name, engine, columns=[KEY_HASH_COL, ROW_HASH_COL])
+
+    # 与已保存的指纹比较，区分新增、变化、未变化和缺失的键
+    # 用 get_indexer 查找而不是 merge，避免未命中时哈希列被转为 float 丢失精度
+    key_hashes = fingerprints[KEY_HASH_COL].to_numpy()
+    row_hashes = fingerprints[ROW_HASH_COL].to_numpy()
+    position = pd.Index(stored[KEY_HASH_COL].to_numpy()).get_indexer(key_hashes)
+    is_new = position < 0
+    is_changed = np.zeros(len(key_hashes), dtype=bool)
+    found = ~is_new
+    is_changed[found] = stored[ROW_HASH_COL].to_numpy()[position[found]] != row_hashes[found]
+    upsert_mask = is_new | is_changed
+
+    missing_hashes = []
+    if delete_missing:
+        missing_hashes = stored[KEY_HASH_COL][~stored[KEY_HASH_COL].isin(key_hashes)].tolist()
+
+    upserts = df[upsert_mask]
+    stats = {
+        "inserted": int(is_new.sum()),
+        "updated": int(is_changed.sum()),
+        "deleted": len(missing_hashes),
+        "unchanged": int((~upsert_mask).sum()),
+    }
+
+    ensure_table(df, engine, table_name)
+    ensure_table(fingerprints, engine, fp_name)
+    metadata = MetaData()
+    table = Table(table_name, metadata, autoload_with=engine)
+    fp_table = Table(fp_name, metadata, autoload_with=engine)
+    _ensure_index(engine, fp_table, [KEY_HASH_COL])
+    _ensure_index(engine, table, key_columns)
+
+    total = len(upserts)
+
+    def progress(rows_done: int) -> None:
+        if progress_callback and total:
+            progress_callback(int(rows_done / total * 100))
+
+    with engine.begin() as conn:
+        # 已存在的键先删除再插入
+        replace_mask = upsert_mask if bootstrap and target_exists else is_changed
+        _delete_by_keys(conn, table, key_columns, _key_tuples(df[replace_mask], key_columns))
+        _delete_by_keys(conn, table, key_columns, _keys_by_hash(conn, fp_table, key_columns, missing_hashes))
+
+        stale_hashes = [(h,) for h in key_hashes[is_changed].tolist()]
+        stale_hashes += [(h,) for h in missing_hashes]
+        _delete_by_keys(conn, fp_table, [KEY_HASH_COL], stale_hashes)
+
+        if total:
+            insert_rows(conn, upserts, table_name, table, chunk_size, batch_size, progress, sizer)
+            insert_rows(conn, fingerprints[upsert_mask], fp_name, fp_table, chunk_size, batch_size)
+
+    if progress_callback:
+        progress_callback(100)
+    return stats
@@ -0,0 +1,491 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, Text, create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from utils.dtype_optimizer import widen_dtypes
+from utils.write_tuner import AdaptiveBatchSizer
+
+DEFAULT_CHUNK_SIZE = 50000  # LOAD DATA 每个临时文件的行数
+DEFAULT_BATCH_SIZE = 1000  # 回退方式每批插入的行数
+DEFAULT_PARTITION_SIZE = 100000  # 并行写入时每个分区的行数
+DEFAULT_PARALLELISM = 4  # 并行写入的连接数
+DEFAULT_RETRIES = 2  # 分区写入失败后的重试次数
+
+# 按连接地址复用的引擎（含连接池），避免每次写入重新建立连接
+_engines: Dict[str, Tuple[Engine, int]] = {}
+_engines_lock = threading.Lock()
+
+# 服务器或客户端禁止 LOCAL INFILE 时返回的 MySQL 错误码
+LOCAL_INFILE_DISABLED_CODES = {1148, 2068, 3948}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# 断点表名后缀，记录每个已提交分区
+CHECKPOINT_SUFFIX = "__checkpoints"
+
+# TEXT 列建索引时使用的前缀长度
+TEXT_INDEX_PREFIX = 191
+
+
+class LocalInfileDisabled(Exception):
+    """服务器不允许 LOAD DATA LOCAL INFILE"""
+
+
+def get_engine(url: str, pool_size: int = DEFAULT_PARALLELISM, **kwargs) -> Engine:
+    """获取（或创建并缓存）指定地址的引擎，连接池大小不小于 pool_size
+
+    MySQL 引擎默认以 local_infile=True 连接，以便使用 LOAD DATA LOCAL INFILE。
+    """
+    with _engines_lock:
+        cached = _engines.get(url)
+        if cached is not None:
+            engine, size = cached
+            if size >= pool_size:
+                return engine
+            engine.dispose()
+
+        if url.startswith("mysql"):
+            kwargs.setdefault("connect_args", {"local_infile": True})
+            kwargs.setdefault("pool_recycle", 3600)
+        engine = create_engine(url, pool_size=pool_size, pool_pre_ping=True, **kwargs)
+        _engines[url] = (engine, pool_size)
+        return engine
+
+
+def dispose_engines() -> None:
+    """关闭所有缓存的引擎及其连接"""
+    with _engines_lock:
+        for engine, _ in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def _quote_identifier(name) -> str:
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _escape_tsv(series: pd.Series) -> pd.Series:
+    """将一列转换为 LOAD DATA 默认格式的文本：反斜杠转义，空值为 \\N"""
+    mask = series.isna()
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        text = series.dt.strftime(DATETIME_FORMAT)
+    elif pd.api.types.is_bool_dtype(series.dtype):
+        text = series.astype("Int64").astype(str)
+    else:
+        text = series.astype(str)
+    text = text.astype(object)
+    text = (
+        text.str.replace("\\", "\\\\", regex=False)
+        .str.replace("\t", "\\t", regex=False)
+        .str.replace("\n", "\\n", regex=False)
+        .str.replace("\r", "\\r", regex=False)
+    )
+    return text.mask(mask, "\\N")
+
+
+def write_tsv_chunk(df: pd.DataFrame, path: str) -> None:
+    """将 DataFrame 写成 LOAD DATA 可直接读取的 TSV 文件（无表头）"""
+    columns = [_escape_tsv(df.iloc[:, i]) for i in range(df.shape[1])]
+    lines = columns[0].str.cat(columns[1:], sep="\t") if len(columns) > 1 else columns[0]
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(lines.tolist()))
+        f.write("\n")
+
+
+def ensure_table(df: pd.DataFrame, engine: Engine, table_name: str) -> None:
+    """表不存在时按 DataFrame 结构建表，与 to_sql 的建表方式一致
+
+    列类型按还原后的宽类型（int64、float64、字符串）生成，不随 optimize_dtypes 的压缩结果变化，
+    以免建成 SMALLINT、FLOAT(23) 等过窄的列，之后追加的更大的值溢出或丢失精度。
+    """
+    widen_dtypes(df.head(0)).to_sql(table_name, engine, if_exists="append", index=False)
+
+
+def create_index(engine: Engine, table: Table, columns: Sequence[str], name: Optional[str] = None) -> None:
+    """为 columns 建立（联合）索引，TEXT 列按 TEXT_INDEX_PREFIX 个字符的前缀建索引（MySQL 要求）"""
+    lengths = {col: TEXT_INDEX_PREFIX for col in columns if isinstance(table.c[col].type, Text)}
+    kwargs = {"mysql_length": lengths} if lengths else {}
+    name = name or f"ix_{uuid.uuid4().hex[:8]}"
+    Index(name, *[table.c[col] for col in columns], **kwargs).create(engine)
+
+
+def has_index(engine: Engine, table_name: str, columns: Sequence[str]) -> bool:
+    """表的主键或某个索引是否以 columns 开头，可用于按这些列查找"""
+    columns = list(columns)
+    inspector = inspect(engine)
+    candidates = [inspector.get_pk_constraint(table_name).get("constrained_columns") or []]
+    candidates += [index["column_names"] for index in inspector.get_indexes(table_name)]
+    return any(list(existing[:len(columns)]) == columns for existing in candidates)
+
+
+def max_packet_bytes(conn) -> Optional[int]:
+    """MySQL 的 max_allowed_packet，其它数据库返回 None"""
+    if conn.dialect.name != "mysql":
+        return None
+    return int(conn.exec_driver_sql("SELECT @@max_allowed_packet").scalar())
+
+
+def estimate_row_bytes(df: pd.DataFrame, sample_size: int = 1000) -> float:
+    """按抽样行转换为文本后的 UTF-8 长度估算每行字节数"""
+    if df.empty:
+        return 0.0
+    sample = df.iloc[:sample_size]
+    # 逐个值转换为文本：整列为空值时 .str 访问器不可用
+    nbytes = sum(
+        sum(len(str(value).encode("utf-8")) for value in sample.iloc[:, i].tolist()) + len(sample)
+        for i in range(sample.shape[1])
+    )
+    return nbytes / len(sample)
+
+
+def _load_data_infile(
+        conn,
+        df: pd.DataFrame,
+        table_name: str,
+        sizer: AdaptiveBatchSizer,
+        progress: Callable[[int], None]
+) -> None:
+    """分块写入临时 TSV 并逐块执行 LOAD DATA LOCAL INFILE，每块行数由 sizer 决定"""
+    column_list = ", ".join(_quote_identifier(col) for col in df.columns)
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    os.close(fd)
+    try:
+        start = 0
+        while start < len(df):
+            # LOAD DATA 以流的方式发送文件，不受 max_allowed_packet 限制
+            chunk = df.iloc[start:start + sizer.size_for()]
+            began = time.perf_counter()
+            write_tsv_chunk(chunk, path)
+            sql = (
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' "
+                f"INTO TABLE {_quote_identifier(table_name)} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                "LINES TERMINATED BY '\\n' "
+                f"({column_list})"
+            )
+            try:
+                conn.exec_driver_sql(sql)
+            except DBAPIError as e:
+                code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+                if start == 0 and code in LOCAL_INFILE_DISABLED_CODES:
+                    raise LocalInfileDisabled(str(e)) from e
+                raise
+            sizer.record(len(chunk), os.path.getsize(path), time.perf_counter() - began)
+            start += len(chunk)
+            progress(start)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _timestamp_to_text(value):
+    return str(value) if isinstance(value, pd.Timestamp) else value
+
+
+def _to_records(df: pd.DataFrame) -> list:
+    """转换为数据库驱动可接受的记录列表，空值转换为 None
+
+    先还原为宽类型，float32 等压缩后的值转换为 Python 的 float / int 而不是 numpy 标量。
+    object 列建表时为文本列，其中的日期值（如多个文件合并后同一列既有日期又有文本）
+    转换为与 LOAD DATA 相同的文本，驱动不接受 pandas 的 Timestamp。
+    """
+    df = widen_dtypes(df)
+    values = df.astype(object).where(df.notna(), None)
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if column.dtype == object and pd.api.types.infer_dtype(column, skipna=True) not in ("string", "empty"):
+            values.isetitem(i, values.iloc[:, i].map(_timestamp_to_text))
+    return values.to_dict("records")
+
+
+def _insert_batches(
+        conn,
+        df: pd.DataFrame,
+        table: Table,
+        sizer: AdaptiveBatchSizer,
+        progress: Callable[[int], None]
+) -> None:
+    """按批执行多行 INSERT（executemany），每批行数由 sizer 决定"""
+    stmt = table.insert()
+    row_bytes = estimate_row_bytes(df)
+    start = 0
+    while start < len(df):
+        batch = df.iloc[start:start + sizer.size_for(row_bytes)]
+        began = time.perf_counter()
+        conn.execute(stmt, _to_records(batch))
+        sizer.record(len(batch), int(row_bytes * len(batch)), time.perf_counter() - began)
+        start += len(batch)
+        progress(start)
+
+
+def insert_rows(
+        conn,
+        df: pd.DataFrame,
+        table_name: str,
+        table: Table,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Callable[[int], None] = lambda rows_done: None,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> None:
+    """在调用方的事务中插入数据，MySQL 优先使用 LOAD DATA LOCAL INFILE，不可用时回退为多行 INSERT
+
+    sizer 为空时 LOAD DATA 每块 chunk_size 行、INSERT 每批 batch_size 行；
+    传入 AdaptiveBatchSizer 时按实测吞吐量调整，chunk_size / batch_size 作为初始值。
+    """
+    if conn.dialect.name == "mysql":
+        infile_sizer = sizer or AdaptiveBatchSizer(chunk_size, chunk_size, chunk_size)
+        infile_sizer.use_method("infile", chunk_size)
+        try:
+            _load_data_infile(conn, df, table_name, infile_sizer, progress)
+            return
+        except LocalInfileDisabled:
+            pass
+    if sizer is None:
+        sizer = AdaptiveBatchSizer(batch_size, batch_size, batch_size)
+    elif sizer.max_bytes is None:
+        sizer.limit_bytes(max_packet_bytes(conn))
+    sizer.use_method("insert", batch_size)
+    _insert_batches(conn, df, table, sizer, progress)
+
+
+def data_fingerprint(df: pd.DataFrame, partition_size: int) -> str:
+    """数据内容及分区大小的指纹，数据或分区方式变化后断点不再适用"""
+    digest = hashlib.sha1()
+    digest.update(repr((list(map(str, df.columns)), len(df), partition_size)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _checkpoint_table(table_name: str) -> Table:
+    return Table(
+        f"{table_name}{CHECKPOINT_SUFFIX}", MetaData(),
+        Column("fingerprint", String(40), nullable=False),
+        Column("part", Integer, nullable=False),
+        Column("rows", Integer, nullable=False),
+    )
+
+
+def committed_parts(engine: Engine, table_name: str, fingerprint: str) -> Set[int]:
+    """读取指定数据已提交的分区编号"""
+    checkpoints = _checkpoint_table(table_name)
+    checkpoints.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            checkpoints.select().with_only_columns(checkpoints.c.part)
+            .where(checkpoints.c.fingerprint == fingerprint)
+        )
+        return {row[0] for row in rows}
+
+
+def clear_checkpoints(engine: Engine, table_name: str, fingerprint: Optional[str] = None) -> None:
+    """删除断点记录，fingerprint 为空时删除全部"""
+    checkpoints = _checkpoint_table(table_name)
+    checkpoints.create(engine, checkfirst=True)
+    stmt = checkpoints.delete()
+    if fingerprint is not None:
+        stmt = stmt.where(checkpoints.c.fingerprint == fingerprint)
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+
+def _write_partition(
+        engine: Engine,
+        df: pd.DataFrame,
+        table_name: str,
+        table: Table,
+        chunk_size: int,
+        batch_size: int,
+        progress: Callable[[int], None],
+        checkpoint: Optional[Tuple[str, int]] = None,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> None:
+    """在单个事务中写入一个分区，checkpoint 为 (指纹, 分区编号) 时在同一事务中记录断点"""
+    with engine.begin() as conn:
+        insert_rows(conn, df, table_name, table, chunk_size, batch_size, progress, sizer)
+        if checkpoint is not None:
+            fingerprint, part = checkpoint
+            conn.execute(
+                _checkpoint_table(table_name).insert(),
+                {"fingerprint": fingerprint, "part": part, "rows": len(df)},
+            )
+
+
+def _write_with_retries(
+        engine: Engine,
+        df: pd.DataFrame,
+        table_name: str,
+        table: Table,
+        chunk_size: int,
+        batch_size: int,
+        progress: Callable[[int], None],
+        checkpoint: Optional[Tuple[str, int]],
+        sizer: Optional[AdaptiveBatchSizer],
+        retries: int
+) -> None:
+    """写入一个分区，出现数据库错误时回滚并按指数退避重试"""
+    for attempt in range(retries + 1):
+        try:
+            _write_partition(engine, df, table_name, table, chunk_size, batch_size, progress, checkpoint, sizer)
+            return
+        except DBAPIError:
+            progress(0)
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def bulk_write(
+        df: pd.DataFrame,
+        engine: Engine,
+        table_name: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        parallelism: int = 1,
+        partition_size: int = DEFAULT_PARTITION_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        resumable: bool = False,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> int:
+    """将 DataFrame 批量追加写入数据库表
+
+    MySQL 优先使用 LOAD DATA LOCAL INFILE（引擎需以 local_infile=True 连接），
+    服务器禁止时回退为每批 batch_size 行的多行 INSERT；其它数据库直接使用多行 INSERT。
+
+    parallelism 为 1 时整个写入在同一个事务中完成；大于 1 时按 partition_size 行
+    划分分区，通过连接池中的多个连接并行写入，每个分区各自一个事务。
+    分区写入出现数据库错误时回滚并重试，最多 retries 次。
+
+    resumable 为 True 时无论 parallelism 多少都按分区写入，每个分区提交时在同一事务中
+    向断点表（表名加 __checkpoints 后缀）记录数据指纹和分区编号。写入中途失败后用
+    相同数据再次调用，会跳过已提交的分区，从第一个未提交的分区继续，不会产生重复行；
+    全部写入成功后删除该数据的断点记录。
+
+    :param df: 要写入的数据
+    :param engine: SQLAlchemy 引擎，并行写入时连接池大小应不小于 parallelism
+    :param table_name: 目标表名，不存在时自动创建
+    :param chunk_size: LOAD DATA 每个临时文件的行数
+    :param batch_size: 多行 INSERT 每批的行数
+    :param parallelism: 并行写入的连接数
+    :param partition_size: 并行写入时每个分区的行数
+    :param retries: 每个分区失败后的重试次数
+    :param progress_callback: 进度回调，参数为已写入行数占比（0-100）
+    :param resumable: 是否记录断点以便失败后续写
+    :param sizer: 自适应批大小调整器，为空时使用固定的 chunk_size / batch_size
+    :return: 写入的行数（含之前已提交的分区）
+    """
+    total = len(df)
+    ensure_table(df, engine, table_name)
+    if not total:
+        return 0
+
+    table = Table(table_name, MetaData(), autoload_with=engine)
+
+    if parallelism <= 1 and not resumable:
+        ranges = [(0, total)]
+    else:
+        ranges = [(start, min(start + partition_size, total)) for start in range(0, total, partition_size)]
+
+    fingerprint = data_fingerprint(df, partition_size) if resumable else None
+    skipped = committed_parts(engine, table_name, fingerprint) if resumable else set()
+
+    # 各分区已写入的行数，重试时清零；已提交的分区直接计为完成
+    done = [end - start if part in skipped else 0 for part, (start, end) in enumerate(ranges)]
+    pending = [part for part in range(len(ranges)) if part not in skipped]
+    lock = threading.Lock()
+
+    def report(part: int, rows_done: int) -> None:
+        with lock:
+            done[part] = rows_done
+            written = sum(done)
+        if progress_callback:
+            progress_callback(int(written / total * 100))
+
+    def run(part: int) -> None:
+        start, end = ranges[part]
+        _write_with_retries(
+            engine, df.iloc[start:end], table_name, table, chunk_size, batch_size,
+            lambda rows_done: report(part, rows_done),
+            (fingerprint, part) if resumable else None,
+            sizer, retries
+        )
+
+    if parallelism <= 1 or len(pending) <= 1:
+        for part in pending:
+            run(part)
+    else:
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            futures = [executor.submit(run, part) for part in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    if resumable:
+        clear_checkpoints(engine, table_name, fingerprint)
+    return total
+
+
+def write_segments(
+        store,
+        engine: Engine,
+        table_name: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        retries: int = DEFAULT_RETRIES,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        resumable: bool = False,
+        sizer: Optional[AdaptiveBatchSizer] = None
+) -> int:
+    """将磁盘分段存储（SegmentStore）中的数据逐段追加写入数据库表
+
+    每次只从磁盘读取一个段，每个段一个事务，内存占用与段大小相关而与总行数无关。
+    resumable 为 True 时以段为单位记录断点，与 bulk_write 的断点续写方式相同。
+
+    :return: 写入的行数（含之前已提交的段）
+    """
+    total = len(store)
+    if not total:
+        return 0
+    ensure_table(store.head(0), engine, table_name)
+    table = Table(table_name, MetaData(), autoload_with=engine)
+
+    fingerprint = store.fingerprint() if resumable else None
+    skipped = committed_parts(engine, table_name, fingerprint) if resumable else set()
+
+    written = 0
+    for index in range(store.n_segments):
+        segment_rows = store.segment_rows(index)
+        if index in skipped:
+            written += segment_rows
+            continue
+
+        def progress(rows_done: int) -> None:
+            if progress_callback:
+                progress_callback(int((written + rows_done) / total * 100))
+
+        _write_with_retries(
+            engine, store.read_segment(index), table_name, table, chunk_size, batch_size, progress,
+            (fingerprint, index) if resumable else None,
+            sizer, retries
+        )
+        written += segment_rows
+
+    if resumable:
+        clear_checkpoints(engine, table_name, fingerprint)
+    return total
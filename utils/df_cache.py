@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  Feather 格式需要 pyarrow
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class DataFrameCache:
+    """解析后 DataFrame 的磁盘缓存，避免重复解析未修改的 Excel 文件。
+
+    特性：
+    - 以 文件绝对路径 + 大小 + 修改时间 + 解析设置（variant）作为缓存键，文件变动或设置改变后自动失效
+    - 安装 pyarrow 时使用 Feather 列式格式，否则回退到 pickle
+    - 按总大小限制进行 LRU 淘汰（以缓存文件的修改时间记录最近访问）
+
+    示例：
+    >>> cache = DataFrameCache('.cache', max_bytes=512 * 1024 * 1024)
+    >>> variant = {"backend": "openpyxl", "sheet": 0}
+    >>> df = cache.get('data.xlsx', variant)
+    >>> if df is None:
+    ...     df = pd.read_excel('data.xlsx')
+    ...     cache.put('data.xlsx', df, variant)
+    """
+
+    FEATHER_SUFFIX = '.feather'
+    PICKLE_SUFFIX = '.pkl'
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = 1024 * 1024 * 1024):
+        """初始化缓存
+
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存总大小上限（字节）
+        """
+        self._dir = Path(cache_dir)
+        self._max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(file_path: Union[str, Path], variant: Optional[Dict[str, Any]] = None) -> str:
+        """根据文件路径、大小、修改时间和解析设置生成缓存键
+
+        :param variant: 影响缓存内容的设置，如解析后端、工作表、列类型压缩选项；
+                        缓存的是按这些设置处理后的 DataFrame，设置不同时不能共用
+        """
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        raw = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+        if variant:
+            raw += "|" + json.dumps(variant, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _find(self, key: str) -> Optional[Path]:
+        for suffix in (self.FEATHER_SUFFIX, self.PICKLE_SUFFIX):
+            path = self._dir / f"{key}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def get(self, file_path: Union[str, Path], variant: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+        """读取缓存，未命中或缓存损坏时返回 None"""
+        try:
+            path = self._find(self.make_key(file_path, variant))
+        except OSError:
+            return None
+        if path is None:
+            return None
+
+        try:
+            if path.suffix == self.FEATHER_SUFFIX:
+                df = pd.read_feather(path)
+            else:
+                df = pd.read_pickle(path)
+        except Exception:
+            # 缓存文件损坏时删除，交由调用方重新解析
+            path.unlink(missing_ok=True)
+            return None
+
+        # 更新访问时间，用于 LRU 淘汰
+        os.utime(path)
+        return df
+
+    def put(self, file_path: Union[str, Path], df: pd.DataFrame,
+            variant: Optional[Dict[str, Any]] = None) -> Optional[Path]:
+        """写入缓存并按大小上限淘汰最久未使用的条目，返回缓存文件路径"""
+        key = self.make_key(file_path, variant)
+        os.makedirs(self._dir, exist_ok=True)
+
+        path = None
+        if HAS_PYARROW:
+            path = self._dir / f"{key}{self.FEATHER_SUFFIX}"
+            try:
+                # Feather 要求默认索引和字符串列名
+                self._write_atomic(path, lambda tmp: df.reset_index(drop=True).to_feather(tmp))
+            except Exception:
+                path = None
+        if path is None:
+            path = self._dir / f"{key}{self.PICKLE_SUFFIX}"
+            self._write_atomic(path, df.to_pickle)
+
+        self.evict()
+        return path if path.exists() else None
+
+    @staticmethod
+    def _write_atomic(path: Path, writer) -> None:
+        """先写临时文件再替换，避免读到写了一半的缓存"""
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            writer(tmp)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _entries(self) -> list:
+        if not self._dir.exists():
+            return []
+        return [
+            p for p in self._dir.iterdir()
+            if p.suffix in (self.FEATHER_SUFFIX, self.PICKLE_SUFFIX)
+        ]
+
+    def size(self) -> int:
+        """返回缓存当前占用的总字节数"""
+        return sum(p.stat().st_size for p in self._entries())
+
+    def evict(self) -> None:
+        """按最近访问时间从旧到新删除缓存，直到总大小不超过上限"""
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        for path in entries:
+            if total <= self._max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """清空全部缓存"""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def __repr__(self) -> str:
+        return f"DataFrameCache(cache_dir={str(self._dir)!r}, max_bytes={self._max_bytes})"
@@ -0,0 +1,78 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget,
+                               QTableWidgetItem, QVBoxLayout)
+
+from utils import tracing
+
+
+class DiagnosticsDialog(QDialog):
+    """性能诊断窗口：按阶段汇总最近记录的耗时，定位解析、表格填充、匹配还是写入最慢
+
+    数据来自 utils.tracing 在内存中保留的最近阶段记录，追踪关闭时提示如何开启。
+    """
+
+    COLUMNS = ["阶段", "次数", "总耗时(秒)", "平均(秒)", "最长(秒)", "CPU(秒)", "行数", "行/秒", "最大内存增长(MB)",
+               "进程峰值内存(MB)", "失败"]
+
+    def __init__(self, parent=None, log_file=None):
+        super().__init__(parent)
+        self.log_file = log_file
+        self.setWindowTitle("性能诊断")
+        self.resize(900, 400)
+
+        layout = QVBoxLayout(self)
+        self.hint = QLabel()
+        self.hint.setWordWrap(True)
+        layout.addWidget(self.hint)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        for text, slot in (("刷新", self.refresh), ("清空", self.clear), ("关闭", self.accept)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        if not tracing.is_enabled():
+            self.hint.setText("阶段追踪未开启：在 config.yaml 中设置 tracing.enabled: true 后重新启动程序")
+        else:
+            spans = tracing.recent_spans()
+            hint = f"最近 {len(spans)} 条阶段记录"
+            if self.log_file:
+                hint += f"，完整记录见 {self.log_file}"
+            self.hint.setText(hint)
+
+        summary = tracing.summarize()
+        self.table.setRowCount(len(summary))
+        for row, item in enumerate(summary):
+            values = [
+                item["span"],
+                item["count"],
+                f"{item['wall']:.3f}",
+                f"{item['mean_wall']:.3f}",
+                f"{item['max_wall']:.3f}",
+                f"{item['cpu']:.3f}",
+                item["rows"] or "",
+                f"{item['rows_per_s']:,.0f}" if item["rows_per_s"] else "",
+                f"{item['max_rss_delta'] / 1024 / 1024:.1f}" if item["max_rss_delta"] is not None else "",
+                f"{item['process_peak_rss'] / 1024 / 1024:.1f}" if item["process_peak_rss"] else "",
+                item["errors"] or "",
+            ]
+            for col, value in enumerate(values):
+                cell = QTableWidgetItem(str(value))
+                if col:
+                    cell.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, cell)
+
+    def clear(self):
+        tracing.clear()
+        self.refresh()
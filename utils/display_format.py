@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from typing import Any, Hashable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 每次向量化格式化的行数，视图滚动时按块格式化并缓存
+DEFAULT_BLOCK_ROWS = 1024
+# 缓存的显示文本单元格数上限，超出后淘汰最久未使用的块
+DEFAULT_MAX_CELLS = 2_000_000
+
+
+def format_value(value: Any) -> str:
+    """将单个值转换为显示文本，空值显示为空字符串"""
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        # 列表等非标量值无法判断空值，直接转字符串
+        return str(value)
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    if isinstance(value, pd.Timestamp):
+        return value.strftime(DATETIME_FORMAT)
+    return str(value)
+
+
+def is_numeric(dtype) -> bool:
+    """按列类型判断是否右对齐显示（布尔列除外）"""
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def numeric_flags(dtypes) -> List[bool]:
+    """每列是否右对齐，只按 dtype 判断一次"""
+    return [is_numeric(dtype) for dtype in dtypes]
+
+
+def format_column(values) -> np.ndarray:
+    """将一列整体转换为显示文本（object 数组）
+
+    时间列使用 dt.strftime，category 列只格式化各个类别再按编码取值，数值、布尔和
+    字符串列整体 astype(str)；空值为空字符串。只有混有时间值的 object 列逐个调用 format_value。
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, copy=False)
+    if series.empty:
+        return np.empty(0, dtype=object)
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = format_column(pd.Series(dtype.categories))
+        codes = series.cat.codes.to_numpy()
+        text = np.append(categories, "").astype(object)
+        # 编码 -1（空值）取到末尾追加的空字符串
+        return text[codes]
+
+    if dtype == object:
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if "date" in inferred or "time" in inferred or inferred.startswith("mixed"):
+            return np.array([format_value(value) for value in series.to_numpy()], dtype=object)
+
+    mask = series.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        text = series.dt.strftime(DATETIME_FORMAT)
+    else:
+        text = series.astype(str)
+    text = text.to_numpy(dtype=object, na_value="")
+    if mask.any():
+        text[mask] = ""
+    return text
+
+
+def format_frame(dataframe: pd.DataFrame) -> List[np.ndarray]:
+    """DataFrame 每列的显示文本"""
+    return [format_column(dataframe.iloc[:, i]) for i in range(dataframe.shape[1])]
+
+
+class DisplayCache:
+    """按 (数据源, 列, 行块) 缓存格式化后的显示文本
+
+    视图滚动、重绘或列宽调整时反复读取同一批单元格，每个块只向量化格式化一次；
+    缓存的单元格数超过 max_cells 时淘汰最久未使用的块。数据源替换后调用 clear。
+
+    示例：
+    >>> cache = DisplayCache()
+    >>> cache.text(("chunk", 0, col), column_array, row)
+    """
+
+    def __init__(self, block_rows: int = DEFAULT_BLOCK_ROWS, max_cells: int = DEFAULT_MAX_CELLS):
+        self.block_rows = max(1, block_rows)
+        self.max_cells = max_cells
+        self._blocks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._cells = 0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def clear(self) -> None:
+        self._blocks.clear()
+        self._cells = 0
+
+    def block(self, key: Hashable, values: Sequence, index: int) -> np.ndarray:
+        """values 第 index 个行块的显示文本，key 标识 values 所属的数据源和列"""
+        cache_key = (key, index)
+        text = self._blocks.get(cache_key)
+        if text is not None:
+            self._blocks.move_to_end(cache_key)
+            return text
+
+        start = index * self.block_rows
+        text = format_column(values[start:start + self.block_rows])
+        self._blocks[cache_key] = text
+        self._cells += len(text)
+        while self._cells > self.max_cells and len(self._blocks) > 1:
+            _, evicted = self._blocks.popitem(last=False)
+            self._cells -= len(evicted)
+        return text
+
+    def text(self, key: Hashable, values: Sequence, row: int) -> str:
+        """values 第 row 行的显示文本"""
+        index, local = divmod(row, self.block_rows)
+        return self.block(key, values, index)[local]
+
+    def column(self, key: Hashable, values: Sequence, start: int, end: int) -> np.ndarray:
+        """values 第 start 到 end 行（不含 end）的显示文本"""
+        if end <= start:
+            return np.empty(0, dtype=object)
+        first, last = start // self.block_rows, (end - 1) // self.block_rows
+        blocks = [self.block(key, values, index) for index in range(first, last + 1)]
+        text = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        offset = first * self.block_rows
+        return text[start - offset:end - offset]
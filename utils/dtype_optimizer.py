@@ -0,0 +1,138 @@
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# 不同值个数占行数的比例不超过该值的字符串列转换为 category
+DEFAULT_CATEGORY_RATIO = 0.5
+# 行数少于该值时不转换 category，小表的类别编码反而更占内存
+MIN_CATEGORY_ROWS = 100
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """DataFrame 占用的内存字节数（含字符串对象本身）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _is_text(series: pd.Series) -> bool:
+    """是否为纯字符串列（允许空值）"""
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)):
+        return False
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    """能无损转换为 float32 时转换，否则保持原样（金额等数据不能损失精度）"""
+    values = series.to_numpy()
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def optimize_dtypes(
+        df: pd.DataFrame,
+        category_ratio: float = DEFAULT_CATEGORY_RATIO,
+        arrow_strings: bool = False
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """压缩 DataFrame 的列类型以减少内存占用
+
+    - 整数列按取值范围降为 int8 / int16 / int32
+    - 浮点列能无损表示时降为 float32
+    - 不同值较少的字符串列转换为 category
+    - arrow_strings 为 True 且安装了 pyarrow 时，其余字符串列转换为 Arrow 字符串
+
+    日期、布尔及混合类型的列保持不变。
+
+    :return: (压缩后的 DataFrame, 报告)，报告包含压缩前后的字节数及每个变化列的类型
+    """
+    before = memory_usage(df)
+    result = df.copy(deep=False)
+    changes = {}
+    for i, col in enumerate(df.columns):
+        series = df.iloc[:, i]
+        dtype = series.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            new = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+            new = _downcast_float(series)
+        elif _is_text(series):
+            n_unique = series.nunique(dropna=True)
+            if len(series) >= MIN_CATEGORY_ROWS and n_unique <= len(series) * category_ratio:
+                new = series.astype("category")
+            elif arrow_strings and HAS_PYARROW:
+                new = series.astype("string[pyarrow]")
+            else:
+                continue
+        else:
+            continue
+        if new.dtype != dtype:
+            result.isetitem(i, new)
+            changes[str(col)] = (str(dtype), str(new.dtype))
+
+    report = {
+        "before": before,
+        "after": memory_usage(result) if changes else before,
+        "columns": changes,
+    }
+    return result, report
+
+
+def _widen_series(series: pd.Series) -> pd.Series:
+    """单列还原为固定的宽类型，已是宽类型时原样返回"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return series
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype) and dtype != object:
+        # 空值统一为 NaN，与 object 列一致（Arrow 字符串的空值为 pd.NA）
+        return series.astype(object).where(series.notna(), np.nan)
+    if pd.api.types.is_integer_dtype(dtype):
+        if not isinstance(dtype, np.dtype):
+            return series if dtype == "Int64" else series.astype("Int64")
+        if dtype == np.uint64:
+            return series
+        return series if dtype == np.int64 else series.astype(np.int64)
+    if pd.api.types.is_float_dtype(dtype):
+        if not isinstance(dtype, np.dtype):
+            return series if dtype == "Float64" else series.astype("Float64")
+        return series if dtype == np.float64 else series.astype(np.float64)
+    return series
+
+
+def widen_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """将 optimize_dtypes 压缩过的列还原为固定的宽类型
+
+    整数列为 int64、浮点列为 float64、category 和 Arrow 字符串列为 object。
+    同一份数据的压缩结果随取值范围变化（如新增一行后 int8 变为 int16），
+    建表、计算行指纹等依赖 dtype 的操作先调用本函数，结果才与压缩方式无关。
+
+    :return: 没有需要还原的列时返回原 DataFrame，否则返回浅拷贝
+    """
+    result = None
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        widened = _widen_series(series)
+        if widened is not series:
+            if result is None:
+                result = df.copy(deep=False)
+            result.isetitem(i, widened)
+    return df if result is None else result
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """格式化为状态栏显示的内存报告"""
+    before = report["before"] / 1024 / 1024
+    after = report["after"] / 1024 / 1024
+    saved = 1 - report["after"] / report["before"] if report["before"] else 0
+    return f"内存 {before:.1f} MB → {after:.1f} MB（减少 {saved:.0%}，{len(report['columns'])} 列已压缩）"
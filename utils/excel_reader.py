@@ -0,0 +1,165 @@
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _make_header(raw_header) -> List[str]:
+    """生成与 pd.read_excel 一致的列名：空列名为 Unnamed: i，重复列名追加 .1/.2 后缀"""
+    header = []
+    seen = {}
+    for i, name in enumerate(raw_header):
+        name = f"Unnamed: {i}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def _rows_to_frame(rows: list, header: List[str]) -> pd.DataFrame:
+    """将原始行数据转换为带类型的 DataFrame"""
+    df = pd.DataFrame.from_records(rows, columns=header)
+    return df.infer_objects()
+
+
+def sheet_names(file_path: Union[str, Path]) -> List[str]:
+    """列出工作簿中所有工作表的名称"""
+    if str(file_path).lower().endswith('.xls'):
+        with pd.ExcelFile(file_path) as xls:
+            return list(xls.sheet_names)
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def iter_excel_chunks(
+        file_path: Union[str, Path],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sheet: Union[int, str] = 0,
+) -> Iterator[pd.DataFrame]:
+    """单次解析 Excel 文件，按块产出 DataFrame。
+
+    xlsx 使用 openpyxl 的 read_only 模式逐行读取，只解析一遍文件；
+    openpyxl 不支持的 xls 格式回退到 pd.read_excel 一次性读取并作为单个块返回。
+
+    :param file_path: Excel 文件路径
+    :param chunk_size: 每个块的行数
+    :param sheet: 工作表序号或名称，默认第一个工作表
+    :return: DataFrame 块迭代器，块的行索引全局连续
+    """
+    if str(file_path).lower().endswith('.xls'):
+        yield pd.read_excel(file_path, sheet_name=sheet)
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        yield from _iter_row_chunks(ws.iter_rows(values_only=True), chunk_size)
+    finally:
+        wb.close()
+
+
+def _calamine_cell(value):
+    """calamine 单元格值转换为与 pd.read_excel(engine="calamine") 一致的值"""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        return value if value else None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def iter_calamine_chunks(
+        file_path: Union[str, Path],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sheet: Union[int, str] = 0,
+) -> Iterator[pd.DataFrame]:
+    """用 calamine 解析工作表，按块产出 DataFrame
+
+    calamine 加载工作表时一次性解析全部单元格（Rust 实现，比 openpyxl 快得多），
+    之后逐行转换并按块产出，第一个块不必等待整个 DataFrame 构建完成，块之间可以检查取消。
+    """
+    from python_calamine import CalamineWorkbook
+
+    wb = CalamineWorkbook.from_path(str(file_path))
+    try:
+        ws = wb.get_sheet_by_index(sheet) if isinstance(sheet, int) else wb.get_sheet_by_name(sheet)
+        rows = (tuple(_calamine_cell(value) for value in row) for row in ws.iter_rows())
+        yield from _iter_row_chunks(rows, chunk_size)
+    finally:
+        wb.close()
+
+
+def _trimmed_width(row: tuple) -> int:
+    """去掉右侧空单元格后的宽度"""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+
+def _iter_row_chunks(rows_iter: Iterable[tuple], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """将逐行读取的单元格值（第一行为表头，空单元格为 None）按块转换为 DataFrame
+
+    与 pd.read_excel 一致，列数取表头和各数据行去掉右侧空单元格后的最大宽度，表头为空的列
+    命名为 Unnamed: i。超出表头的列在后面的行才出现时，从该数据块起增加这些列，
+    之前的块没有这些列（concat_chunks 合并后为空值）。
+    """
+    rows_iter = iter(rows_iter)
+    raw_header = next(rows_iter, None)
+    if raw_header is None:
+        return
+    raw_header = tuple(raw_header)
+    width = _trimmed_width(raw_header)
+    header = _make_header(raw_header[:width])
+
+    start = 0
+    rows = []
+    for row in rows_iter:
+        if len(row) > width and any(value is not None for value in row[width:]):
+            width = _trimmed_width(row)
+            header = _make_header(raw_header[:width] + (None,) * (width - len(raw_header)))
+            # 当前块中之前的行补齐新增的列
+            rows = [r + (None,) * (width - len(r)) for r in rows]
+        row = tuple(row[:width])
+        # 与 pd.read_excel 一致，跳过整行为空的行
+        if all(value is None for value in row):
+            continue
+        if len(row) < width:
+            row = row + (None,) * (width - len(row))
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            chunk = _rows_to_frame(rows, header)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            rows = []
+            yield chunk
+
+    if rows or start == 0:
+        chunk = _rows_to_frame(rows, header)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        yield chunk
+
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """合并所有块并统一各块类型推断不一致的列"""
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks).infer_objects()
+
@@ -0,0 +1,262 @@
+import importlib.util
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from utils.excel_reader import (DEFAULT_CHUNK_SIZE, iter_calamine_chunks, iter_excel_chunks,
+                                 sheet_names as excel_sheet_names)
+
+# 自动选择时不指定后端
+BACKEND_AUTO = "auto"
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + (".csv", ".parquet")
+
+# CSV 不是 UTF-8 时依次尝试的编码（国内导出的 CSV 常为 GBK）
+CSV_ENCODINGS = ("utf-8-sig", "gb18030")
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _slice_chunks(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """将一次性读取的 DataFrame 按块产出，保证至少产出一个块（含列结构）"""
+    if df.empty:
+        yield df
+        return
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+class ReaderBackend:
+    """文件读取后端的基类
+
+    子类声明支持的扩展名及依赖的模块，实现 iter_chunks；sheet_names 默认返回单个空名称，
+    表示文件没有工作表的概念（CSV、Parquet）。
+    """
+
+    name = ""
+    extensions: Tuple[str, ...] = ()
+    requires: Tuple[str, ...] = ()
+    # 是否逐块解析（内存中只有当前块），磁盘分段模式只使用流式后端
+    streaming = True
+
+    def available(self) -> bool:
+        return all(_installed(module) for module in self.requires)
+
+    def supports(self, file_path: Union[str, Path]) -> bool:
+        return str(file_path).lower().endswith(self.extensions)
+
+    def sheet_names(self, file_path: Union[str, Path]) -> List[str]:
+        return [""]
+
+    def iter_chunks(self, file_path: Union[str, Path], chunk_size: int, sheet: Union[int, str]) -> Iterator[pd.DataFrame]:
+        raise NotImplementedError
+
+
+class CalamineBackend(ReaderBackend):
+    """Rust 实现的 calamine 解析器，一次性解析整个工作表后逐行按块产出，速度远快于 openpyxl"""
+
+    name = "calamine"
+    extensions = EXCEL_EXTENSIONS
+    requires = ("python_calamine",)
+    streaming = False
+
+    def sheet_names(self, file_path):
+        from python_calamine import CalamineWorkbook
+
+        return list(CalamineWorkbook.from_path(str(file_path)).sheet_names)
+
+    def iter_chunks(self, file_path, chunk_size, sheet):
+        yield from iter_calamine_chunks(file_path, chunk_size, sheet=sheet)
+
+
+class OpenpyxlBackend(ReaderBackend):
+    """openpyxl 只读模式逐行流式解析，内存占用低，第一个块最早可用"""
+
+    name = "openpyxl"
+    extensions = (".xlsx", ".xlsm")
+    requires = ("openpyxl",)
+
+    def sheet_names(self, file_path):
+        return excel_sheet_names(file_path)
+
+    def iter_chunks(self, file_path, chunk_size, sheet):
+        yield from iter_excel_chunks(file_path, chunk_size, sheet=sheet)
+
+
+class XlrdBackend(ReaderBackend):
+    """旧版 .xls 格式的解析器"""
+
+    name = "xlrd"
+    extensions = (".xls",)
+    requires = ("xlrd",)
+    streaming = False
+
+    def sheet_names(self, file_path):
+        with pd.ExcelFile(file_path, engine="xlrd") as xls:
+            return list(xls.sheet_names)
+
+    def iter_chunks(self, file_path, chunk_size, sheet):
+        yield from _slice_chunks(pd.read_excel(file_path, sheet_name=sheet, engine="xlrd"), chunk_size)
+
+
+class CsvBackend(ReaderBackend):
+    """pandas C 解析器按块读取 CSV，自动识别 UTF-8 / GBK 编码"""
+
+    name = "csv"
+    extensions = (".csv",)
+    requires = ()
+
+    @staticmethod
+    def detect_encoding(file_path) -> str:
+        """读取文件开头的样本判断编码"""
+        with open(file_path, "rb") as f:
+            sample = f.read(1024 * 1024)
+        if len(sample) == 1024 * 1024:
+            # 样本末尾可能截断多字节字符，忽略最后几个字节
+            sample = sample[:-4]
+        for encoding in CSV_ENCODINGS:
+            try:
+                sample.decode(encoding)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return CSV_ENCODINGS[0]
+
+    def iter_chunks(self, file_path, chunk_size, sheet):
+        encoding = self.detect_encoding(file_path)
+        with pd.read_csv(file_path, chunksize=chunk_size, encoding=encoding) as reader:
+            yield from reader
+
+
+class ParquetBackend(ReaderBackend):
+    """pyarrow 按行组批量读取 Parquet"""
+
+    name = "parquet"
+    extensions = (".parquet",)
+    requires = ("pyarrow",)
+
+    def iter_chunks(self, file_path, chunk_size, sheet):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        empty = True
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield parquet_file.schema_arrow.empty_table().to_pandas()
+
+
+# 按优先级排列：同一扩展名有多个可用后端时选择靠前的
+BACKENDS: Tuple[ReaderBackend, ...] = (
+    CalamineBackend(),
+    OpenpyxlBackend(),
+    XlrdBackend(),
+    CsvBackend(),
+    ParquetBackend(),
+)
+
+_REASONS = {
+    "calamine": "已安装 python-calamine，整表一次性解析最快",
+    "openpyxl": "未安装 python-calamine，使用 openpyxl 只读模式流式解析",
+    "xlrd": "未安装 python-calamine，.xls 使用 xlrd 解析",
+    "csv": "CSV 文件按块读取",
+    "parquet": "Parquet 文件按行组读取",
+}
+
+
+def choose_backend(
+        file_path: Union[str, Path],
+        preferred: str = BACKEND_AUTO,
+        streaming: bool = False
+) -> Tuple[ReaderBackend, str]:
+    """为文件选择读取后端
+
+    :param file_path: 文件路径
+    :param preferred: 指定的后端名称，为 auto 或不可用时自动选择最快的可用后端
+    :param streaming: 优先选择逐块解析的后端（内存受限时），没有可用的流式后端时不限制
+    :return: (后端, 选择原因)
+    """
+    candidates = [backend for backend in BACKENDS if backend.supports(file_path)]
+    if not candidates:
+        raise ValueError(f"不支持的文件类型: {Path(file_path).suffix}")
+    if streaming:
+        streamed = [backend for backend in candidates if backend.streaming and backend.available()]
+        if streamed:
+            return streamed[0], "内存受限，使用逐块解析的后端"
+
+    if preferred != BACKEND_AUTO:
+        for backend in candidates:
+            if backend.name == preferred and backend.available():
+                return backend, f"配置指定使用 {preferred}"
+
+    for backend in candidates:
+        if backend.available():
+            reason = _REASONS[backend.name]
+            if preferred != BACKEND_AUTO:
+                reason = f"配置指定的 {preferred} 不可用，{reason}"
+            return backend, reason
+
+    missing = " 或 ".join(module for backend in candidates for module in backend.requires)
+    raise ImportError(f"读取 {Path(file_path).suffix} 文件需要安装 {missing}")
+
+
+def sheet_names(file_path: Union[str, Path], preferred: str = BACKEND_AUTO) -> List[str]:
+    """列出文件中的工作表，CSV、Parquet 返回单个空名称"""
+    backend, _ = choose_backend(file_path, preferred)
+    return backend.sheet_names(file_path)
+
+
+def iter_file_chunks(
+        file_path: Union[str, Path],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sheet: Union[int, str] = 0,
+        preferred: str = BACKEND_AUTO,
+        streaming: bool = False,
+        report: Optional[Dict[str, Any]] = None
+) -> Iterator[pd.DataFrame]:
+    """用最快的可用后端读取文件，按块产出 DataFrame，块的行索引全局连续
+
+    :param file_path: Excel / CSV / Parquet 文件路径
+    :param chunk_size: 每个块的行数
+    :param sheet: 工作表序号或名称（CSV、Parquet 忽略）
+    :param preferred: 指定的后端名称，默认自动选择
+    :param streaming: 优先选择逐块解析的后端
+    :param report: 传入字典时写入解析统计：后端、选择原因、行数、块数、
+                   第一个块的耗时和总耗时（秒）
+    """
+    backend, reason = choose_backend(file_path, preferred, streaming)
+    if report is not None:
+        report.update({"file": str(file_path), "backend": backend.name, "reason": reason,
+                       "rows": 0, "chunks": 0, "first_chunk_seconds": None, "seconds": None})
+
+    started = time.perf_counter()
+    # 生成器在块之间暂停时（如界面处理数据块）不计入解析耗时
+    elapsed = 0.0
+    start_row = 0
+    chunks = backend.iter_chunks(file_path, chunk_size, sheet)
+    while True:
+        began = time.perf_counter()
+        chunk = next(chunks, None)
+        elapsed += time.perf_counter() - began
+        if chunk is None:
+            break
+        chunk.index = pd.RangeIndex(start_row, start_row + len(chunk))
+        start_row += len(chunk)
+        if report is not None:
+            if report["first_chunk_seconds"] is None:
+                report["first_chunk_seconds"] = round(time.perf_counter() - started, 3)
+            report["rows"] = start_row
+            report["chunks"] += 1
+            report["seconds"] = round(elapsed, 3)
+        yield chunk
+
+
+def format_read_report(report: Dict[str, Any]) -> str:
+    """格式化为状态栏显示的解析统计"""
+    return f"{report['backend']} 解析耗时 {report['seconds']} 秒（{report['reason']}）"
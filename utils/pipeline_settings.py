@@ -0,0 +1,54 @@
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from utils.dtype_optimizer import DEFAULT_CATEGORY_RATIO
+from utils.segment_store import DEFAULT_MEMORY_MB, HAS_PYARROW, estimate_memory
+
+# 写入模式：界面显示名称 -> 内部模式，命令行也接受内部模式名称
+WRITE_MODES = {
+    "追加": "append",
+    "增量同步": "sync",
+    "整表替换": "staging",
+}
+
+
+def resolve_mode(mode: str) -> str:
+    """将写入模式的显示名称或内部名称转换为内部名称"""
+    if mode in WRITE_MODES:
+        return WRITE_MODES[mode]
+    if mode in WRITE_MODES.values():
+        return mode
+    raise ValueError(f"未知的写入模式: {mode}")
+
+
+def optimize_options(config) -> Optional[Dict[str, Any]]:
+    """列类型压缩参数（optimize_dtypes 的关键字参数），未启用时返回 None
+
+    :param config: Config 实例
+    """
+    if not config.get('optimize.enabled', True):
+        return None
+    return {
+        "category_ratio": config.get('optimize.category_ratio', DEFAULT_CATEGORY_RATIO),
+        "arrow_strings": config.get('optimize.arrow_strings', False),
+    }
+
+
+def memory_budget(config) -> int:
+    """磁盘分段模式的内存预算（字节），也是解码后段缓存的上限"""
+    return int(config.get('out_of_core.memory_mb', DEFAULT_MEMORY_MB)) * 1024 * 1024
+
+
+def use_out_of_core(config, file_path: Union[str, Path], mode: Optional[str] = None) -> bool:
+    """按 out_of_core.mode 判断单个文件是否逐块写入磁盘分段
+
+    :param config: Config 实例
+    :param mode: 覆盖配置中的 out_of_core.mode（on / off / auto）
+    :return: on 时总是使用；auto 时预计内存超出预算才使用；未安装 pyarrow 时不使用
+    """
+    mode = mode or config.get('out_of_core.mode', 'auto')
+    if mode == 'off' or not HAS_PYARROW:
+        return False
+    if mode == 'on':
+        return True
+    return estimate_memory(file_path) > memory_budget(config)
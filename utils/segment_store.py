@@ -0,0 +1,254 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+
+    HAS_PYARROW = True
+except ImportError:
+    pa = None
+    HAS_PYARROW = False
+
+DEFAULT_MEMORY_MB = 512
+# xlsx 解析为 DataFrame 后占用内存约为文件大小的倍数，用于自动判断是否启用磁盘分段
+XLSX_EXPANSION = 10
+# 其它格式的膨胀倍数：CSV 为纯文本，Parquet 为列式压缩
+EXPANSIONS = {".csv": 3, ".parquet": 5}
+
+
+def estimate_memory(file_path: Union[str, Path]) -> int:
+    """粗略估算文件完整加载到内存后的字节数"""
+    return os.path.getsize(file_path) * EXPANSIONS.get(Path(file_path).suffix.lower(), XLSX_EXPANSION)
+
+
+def _to_arrow(df: pd.DataFrame) -> "pa.Table":
+    """转换为 Arrow 表，混合类型的 object 列（如 Excel 中数字和文本混排）转换为字符串"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            if pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+                df[col] = df[col].map(lambda v: v if v is None or pd.isna(v) else str(v)).astype(object)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class SegmentStore:
+    """磁盘上的列式分段存储，用于超出内存预算的数据。
+
+    每个数据块写成一个 Arrow IPC 文件（段），读取时通过内存映射打开，只有被访问的段
+    才会解码为 DataFrame。解码后的段保存在按字节数限制的 LRU 缓存中（cache_bytes），
+    表格滚动时只需读取可见行所在的段。
+
+    写入线程追加段的同时，界面线程可以读取已写入的段。
+
+    示例：
+    >>> store = SegmentStore(".cache/segments", cache_bytes=512 * 1024 * 1024)
+    >>> for chunk in iter_excel_chunks(path):
+    ...     store.append(chunk)
+    >>> store.value(12345, 0)
+    >>> store.close()
+    """
+
+    def __init__(self, base_dir: Union[str, Path, None] = None, cache_bytes: int = DEFAULT_MEMORY_MB * 1024 * 1024):
+        """
+        :param base_dir: 段文件所在的父目录，为空时使用系统临时目录
+        :param cache_bytes: 解码后的段占用内存上限（字节），至少保留一个段
+        """
+        if not HAS_PYARROW:
+            raise ImportError("磁盘分段模式需要安装 pyarrow：pip install pyarrow")
+        if base_dir is not None:
+            Path(base_dir).mkdir(parents=True, exist_ok=True)
+        self.directory = Path(tempfile.mkdtemp(prefix="segments_", dir=base_dir))
+        self.cache_bytes = cache_bytes
+        self.columns: List[str] = []
+        self.dtypes: Optional[pd.Series] = None
+        self._paths: List[Path] = []
+        self._offsets: List[int] = []
+        self._hashes: List[bytes] = []
+        self._row_count = 0
+        self._versions = 0
+        # 段编号 -> (列数组列表, 字节数)
+        self._cache: "OrderedDict[int, Tuple[list, int]]" = OrderedDict()
+        self._cache_used = 0
+        self._lock = threading.RLock()
+
+    # ----------------------------写入----------------------------
+    def _write_file(self, df: pd.DataFrame) -> Path:
+        self._versions += 1
+        path = self.directory / f"seg_{self._versions:06d}.arrow"
+        table = _to_arrow(df)
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return path
+
+    @staticmethod
+    def _hash(df: pd.DataFrame) -> bytes:
+        return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).digest()
+
+    def append(self, df: pd.DataFrame) -> int:
+        """追加一个数据块作为新的段，返回段编号"""
+        df = df.reset_index(drop=True)
+        path = self._write_file(df)
+        digest = self._hash(df)
+        with self._lock:
+            if not self._paths:
+                self.columns = [str(col) for col in df.columns]
+                self.dtypes = df.dtypes
+            elif df.shape[1] > len(self.columns):
+                # 后面的数据块在右侧出现了新的列，之前的段读取时补齐为空列
+                self.columns = [str(col) for col in df.columns]
+                self.dtypes = pd.concat([self.dtypes, df.dtypes.iloc[len(self.dtypes):]])
+            self._paths.append(path)
+            self._offsets.append(self._row_count)
+            self._hashes.append(digest)
+            self._row_count += len(df)
+            return len(self._paths) - 1
+
+    def replace(self, index: int, df: pd.DataFrame) -> None:
+        """用行数相同的 DataFrame（如增加了结果列）替换一个段"""
+        with self._lock:
+            old_path = self._paths[index]
+            expected = self.segment_rows(index)
+        if len(df) != expected:
+            raise ValueError(f"段 {index} 的行数应为 {expected}，实际为 {len(df)}")
+        df = df.reset_index(drop=True)
+        path = self._write_file(df)
+        digest = self._hash(df)
+        with self._lock:
+            self._paths[index] = path
+            self._hashes[index] = digest
+            if index == 0:
+                self.columns = [str(col) for col in df.columns]
+                self.dtypes = df.dtypes
+            self._drop_cached(index)
+        self._remove(old_path)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            # Windows 下仍被内存映射的文件无法删除，随目录在 close 时清理
+            pass
+
+    # ----------------------------读取----------------------------
+    def __len__(self) -> int:
+        return self._row_count
+
+    @property
+    def n_segments(self) -> int:
+        return len(self._paths)
+
+    def segment_rows(self, index: int) -> int:
+        """一个段的行数"""
+        end = self._offsets[index + 1] if index + 1 < len(self._offsets) else self._row_count
+        return end - self._offsets[index]
+
+    def read_segment(self, index: int) -> pd.DataFrame:
+        """通过内存映射读取一个段，不进入缓存（流式处理时使用）"""
+        with self._lock:
+            path = self._paths[index]
+        with pa.memory_map(str(path), "r") as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+        if df.shape[1] < len(self.columns):
+            df = df.reindex(columns=self.columns)
+        return df
+
+    def iter_segments(self) -> Iterator[pd.DataFrame]:
+        """依次读取每个段，内存中同时只有一个段"""
+        for index in range(self.n_segments):
+            yield self.read_segment(index)
+
+    def _drop_cached(self, index: int) -> None:
+        cached = self._cache.pop(index, None)
+        if cached is not None:
+            self._cache_used -= cached[1]
+
+    def _cached_arrays(self, index: int) -> list:
+        with self._lock:
+            cached = self._cache.get(index)
+            if cached is not None:
+                self._cache.move_to_end(index)
+                return cached[0]
+        df = self.read_segment(index)
+        arrays = [
+            series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+            for series in (df.iloc[:, i] for i in range(df.shape[1]))
+        ]
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._drop_cached(index)
+            self._cache[index] = (arrays, nbytes)
+            self._cache_used += nbytes
+            while self._cache_used > self.cache_bytes and len(self._cache) > 1:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._cache_used -= evicted
+        return arrays
+
+    def locate(self, row: int) -> Tuple[int, int]:
+        """行号所在的段编号及段内行号"""
+        with self._lock:
+            index = bisect_right(self._offsets, row) - 1
+            return index, row - self._offsets[index]
+
+    def value(self, row: int, col: int) -> Any:
+        """读取单个单元格，所在段按需从磁盘解码"""
+        index, local = self.locate(row)
+        return self._cached_arrays(index)[col][local]
+
+    def segment_column(self, index: int, col: int) -> Any:
+        """一个段中一列的数组，段按需从磁盘解码"""
+        return self._cached_arrays(index)[col]
+
+    def head(self, n: int) -> pd.DataFrame:
+        if not self.n_segments:
+            return pd.DataFrame()
+        return self.read_segment(0).head(n)
+
+    def unique_values(self, column: str) -> list:
+        """逐段收集一列的不同值（保持首次出现的顺序，不含空值）"""
+        seen = {}
+        for df in self.iter_segments():
+            seen.update(dict.fromkeys(df[column].dropna().unique().tolist()))
+        return list(seen)
+
+    def fingerprint(self) -> str:
+        """全部段内容的指纹"""
+        digest = hashlib.sha1()
+        with self._lock:
+            digest.update(repr((self.columns, self._row_count, len(self._paths))).encode("utf-8"))
+            for segment_hash in self._hashes:
+                digest.update(segment_hash)
+        return digest.hexdigest()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """合并全部段为一个 DataFrame（会将所有数据读入内存）"""
+        frames = list(self.iter_segments())
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def cache_used(self) -> int:
+        return self._cache_used
+
+    def close(self) -> None:
+        """释放缓存并删除段文件"""
+        with self._lock:
+            self._cache.clear()
+            self._cache_used = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"SegmentStore(rows={self._row_count}, segments={self.n_segments}, directory='{self.directory}')"
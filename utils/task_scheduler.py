@@ -0,0 +1,274 @@
+import itertools
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+from utils.cancellation import CancellationToken, TaskCancelled
+from utils.tracing import span
+
+# 任务优先级，线程池中排队的任务按优先级从高到低开始执行
+PRIORITY_INTERACTIVE = 10  # 用户正在等待的任务，如打开文件时的预览
+PRIORITY_NORMAL = 0
+PRIORITY_BULK = -10  # 批量任务，如写入数据库
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# 工作线程发往主线程的内部事件，其余事件名由任务通过 TaskContext.emit 自定义
+_RESULT = "__result__"
+_ERROR = "__error__"
+_CANCELLED = "__cancelled__"
+_PROGRESS = "progress"
+
+
+class TaskContext:
+    """任务函数的第一个参数：检查取消、向主线程发送事件和进度
+
+    示例：
+    >>> def load(task, path):
+    ...     for chunk in iter_file_chunks(path):
+    ...         task.check()                  # 已取消时抛出 TaskCancelled
+    ...         task.emit("chunk", chunk)     # 主线程的 on_event("chunk", chunk) 收到
+    ...     task.span.set(rows=...)           # 补充阶段追踪的字段
+    """
+
+    __slots__ = ("token", "span", "_task_id", "_post")
+
+    def __init__(self, task_id: int, token: CancellationToken, post: Callable[[int, str, Any], None]):
+        self.token = token
+        self.span = None
+        self._task_id = task_id
+        self._post = post
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def check(self) -> None:
+        """任务已被取消时抛出 TaskCancelled，长循环每轮调用一次"""
+        self.token.raise_if_cancelled()
+
+    def emit(self, event: str, payload: Any = None) -> None:
+        """向主线程发送一个事件；任务取消后不再发送"""
+        if not self.token.cancelled:
+            self._post(self._task_id, event, payload)
+
+    def progress(self, value: int) -> None:
+        """发送进度（0-100），主线程的 on_progress 收到"""
+        self.emit(_PROGRESS, value)
+
+
+class TaskHandle:
+    """submit 返回的任务句柄，用于取消任务或查询状态"""
+
+    def __init__(self, task_id: int, name: str, group: Optional[str], priority: int,
+                 callbacks: Dict[str, Optional[Callable]]):
+        self.id = task_id
+        self.name = name
+        self.group = group
+        self.priority = priority
+        self.token = CancellationToken()
+        self.state = QUEUED
+        self.callbacks = callbacks
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    @property
+    def done(self) -> bool:
+        return self.state in (FINISHED, FAILED, CANCELLED)
+
+    def cancel(self) -> None:
+        """请求取消：排队中的任务不再执行，运行中的任务在下一次检查时退出，之后发出的事件全部丢弃"""
+        self.token.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务函数返回（在工作线程中），超时返回 False"""
+        return self._done.wait(timeout)
+
+    def __repr__(self) -> str:
+        return f"TaskHandle(id={self.id}, name='{self.name}', group={self.group!r}, state='{self.state}')"
+
+
+class _Runnable(QRunnable):
+    def __init__(self, scheduler: "TaskScheduler", handle: TaskHandle, func: Callable, args: tuple,
+                 kwargs: dict, fields: dict):
+        super().__init__()
+        self.scheduler = scheduler
+        self.handle = handle
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.fields = fields
+
+    def run(self):
+        handle = self.handle
+        post = self.scheduler._post
+        try:
+            if handle.token.cancelled:
+                # 排队期间已被取消，不再执行
+                post(handle.id, _CANCELLED, None)
+                return
+            handle.state = RUNNING
+            context = TaskContext(handle.id, handle.token, post)
+            try:
+                with span(handle.name, **self.fields) as current:
+                    context.span = current
+                    result = self.func(context, *self.args, **self.kwargs)
+            except TaskCancelled:
+                post(handle.id, _CANCELLED, None)
+            except Exception as e:
+                post(handle.id, _ERROR, (type(e), str(e)))
+            else:
+                post(handle.id, _RESULT, result)
+        finally:
+            handle._done.set()
+
+
+class TaskScheduler(QObject):
+    """统一的后台任务调度器，基于 QThreadPool
+
+    - 任务函数在线程池中执行，第一个参数为 TaskContext，通过它检查取消、发送事件和进度
+    - 所有回调（on_event / on_progress / on_result / on_error / on_cancelled / on_finished）都在主线程中调用
+    - 同一分组（group）同时只保留最新的任务：提交新任务时自动取消该分组中的旧任务，
+      旧任务之后发出的事件和结果直接丢弃，不会再更新界面
+    - 排队的任务按优先级执行，用户等待的加载优先于批量写入
+
+    示例：
+    >>> scheduler = TaskScheduler(self)
+    >>> scheduler.submit(load_file_task, path, group="load", priority=PRIORITY_INTERACTIVE,
+    ...                  on_event=self._on_load_event, on_error=self._show_error)
+    """
+
+    _task_event = Signal(int, str, object)
+
+    def __init__(self, parent: Optional[QObject] = None, max_threads: Optional[int] = None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._ids = itertools.count(1)
+        self._tasks: Dict[int, Tuple[TaskHandle, _Runnable]] = {}
+        self._groups: Dict[str, TaskHandle] = {}
+        # 工作线程中发出，按队列连接在主线程中处理
+        self._task_event.connect(self._dispatch)
+
+    def submit(
+            self,
+            func: Callable,
+            *args: Any,
+            name: Optional[str] = None,
+            group: Optional[str] = None,
+            priority: int = PRIORITY_NORMAL,
+            fields: Optional[Dict[str, Any]] = None,
+            on_event: Optional[Callable[[str, Any], None]] = None,
+            on_progress: Optional[Callable[[int], None]] = None,
+            on_result: Optional[Callable[[Any], None]] = None,
+            on_error: Optional[Callable[[Tuple[type, str]], None]] = None,
+            on_cancelled: Optional[Callable[[], None]] = None,
+            on_finished: Optional[Callable[[TaskHandle], None]] = None,
+            **kwargs: Any,
+    ) -> TaskHandle:
+        """提交任务
+
+        :param func: 任务函数，调用方式为 func(TaskContext, *args, **kwargs)
+        :param name: 任务名称，也是阶段追踪的名称，默认为函数名
+        :param group: 分组，提交时取消该分组中仍在运行的旧任务
+        :param priority: 排队时的优先级
+        :param fields: 阶段追踪的附加字段
+        :param on_finished: 任务以任何方式结束（完成、失败、取消）后调用，参数为任务句柄
+        """
+        if group is not None:
+            self.cancel(group)
+        handle = TaskHandle(next(self._ids), name or func.__name__, group, priority, {
+            "event": on_event, "progress": on_progress, "result": on_result, "error": on_error,
+            "cancelled": on_cancelled, "finished": on_finished,
+        })
+        runnable = _Runnable(self, handle, func, args, kwargs, dict(fields or {}))
+        self._tasks[handle.id] = (handle, runnable)
+        if group is not None:
+            self._groups[group] = handle
+        self.pool.start(runnable, priority)
+        return handle
+
+    def current(self, group: str) -> Optional[TaskHandle]:
+        """分组中最新的未结束任务"""
+        return self._groups.get(group)
+
+    def is_busy(self, group: str) -> bool:
+        handle = self._groups.get(group)
+        return handle is not None and not handle.cancelled
+
+    def cancel(self, group: str) -> None:
+        """取消分组中的任务"""
+        handle = self._groups.pop(group, None)
+        if handle is not None:
+            handle.cancel()
+
+    def cancel_all(self) -> None:
+        for handle, _ in self._tasks.values():
+            handle.cancel()
+        self._groups.clear()
+
+    def shutdown(self, timeout_ms: int = -1) -> bool:
+        """取消所有任务并等待线程池中的任务返回（关闭窗口时调用），超时返回 False
+
+        不检查取消的任务（如数据库写入）会执行完毕，避免留下写了一半的事务。
+        """
+        self.cancel_all()
+        return self.pool.waitForDone(timeout_ms)
+
+    def _post(self, task_id: int, event: str, payload: Any) -> None:
+        try:
+            self._task_event.emit(task_id, event, payload)
+        except RuntimeError:
+            # 窗口已销毁（调度器随之删除），没有接收方
+            pass
+
+    @Slot(int, str, object)
+    def _dispatch(self, task_id: int, event: str, payload: Any) -> None:
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return
+        handle = entry[0]
+        callbacks = handle.callbacks
+
+        if event not in (_RESULT, _ERROR, _CANCELLED):
+            if handle.cancelled:
+                # 已被取消或被新任务取代，丢弃排队中的事件
+                return
+            callback = callbacks["progress"] if event == _PROGRESS else callbacks["event"]
+            if callback is not None:
+                if event == _PROGRESS:
+                    callback(payload)
+                else:
+                    callback(event, payload)
+            return
+
+        del self._tasks[task_id]
+        if self._groups.get(handle.group) is handle:
+            del self._groups[handle.group]
+
+        if handle.cancelled or event == _CANCELLED:
+            # 任务函数没有检查取消而正常返回时，结果同样丢弃
+            handle.state = CANCELLED
+            callback, args = callbacks["cancelled"], ()
+        elif event == _ERROR:
+            handle.state = FAILED
+            callback, args = callbacks["error"], (payload,)
+        else:
+            handle.state = FINISHED
+            callback, args = callbacks["result"], (payload,)
+        try:
+            if callback is not None:
+                callback(*args)
+        finally:
+            if callbacks["finished"] is not None:
+                callbacks["finished"](handle)
@@ -0,0 +1,304 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Union
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，峰值内存改用 psutil（未安装时不记录）
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_LOG_FILE = "logs/trace.jsonl"
+DEFAULT_MAX_MB = 10
+DEFAULT_BACKUPS = 3
+DEFAULT_PROFILE_DIR = "logs/profiles"
+# 内存中保留的最近阶段记录数，供诊断窗口汇总
+RECENT_SPANS = 2000
+
+_logger = logging.getLogger("excel_tool.trace")
+_logger.propagate = False
+
+_state = {
+    "enabled": False,
+    "profile": False,
+    "profile_dir": DEFAULT_PROFILE_DIR,
+}
+_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_SPANS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def current_rss() -> Optional[int]:
+    """进程当前的常驻内存（字节），无法获取时返回 None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        # Linux 未安装 psutil 时读取 /proc，第二项为常驻内存页数
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """进程启动以来的峰值常驻内存（字节），无法获取时返回 None
+
+    这是整个进程的历史最高值，一次大文件加载之后的所有阶段都会得到同一个值，
+    单个阶段的内存占用看 Span 记录的 rss_delta。
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def configure(
+        enabled: bool = False,
+        log_file: Union[str, Path, None] = DEFAULT_LOG_FILE,
+        max_mb: float = DEFAULT_MAX_MB,
+        backups: int = DEFAULT_BACKUPS,
+        profile: bool = False,
+        profile_dir: Union[str, Path] = DEFAULT_PROFILE_DIR,
+) -> None:
+    """开启或关闭阶段追踪
+
+    :param enabled: 是否记录阶段耗时，关闭时 span 直接返回空操作对象
+    :param log_file: 阶段记录写入的 JSON Lines 文件，为空时只保留在内存中
+    :param max_mb: 日志文件达到该大小（MB）后轮转
+    :param backups: 保留的轮转文件个数
+    :param profile: 是否对每个线程最外层的阶段运行 cProfile，结果写入 profile_dir
+    :param profile_dir: cProfile 结果（.prof）目录
+    """
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        handler.close()
+
+    _state.update(enabled=bool(enabled), profile=bool(enabled and profile), profile_dir=str(profile_dir))
+    if enabled and log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(log_file, maxBytes=int(max_mb * 1024 * 1024), backupCount=backups,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+
+
+def configure_from(config) -> None:
+    """按配置文件的 tracing 设置开启或关闭阶段追踪（config 为 Config 实例）"""
+    configure(
+        enabled=config.get('tracing.enabled', False),
+        log_file=config.get('tracing.log_file', DEFAULT_LOG_FILE),
+        max_mb=config.get('tracing.max_mb', DEFAULT_MAX_MB),
+        backups=config.get('tracing.backups', DEFAULT_BACKUPS),
+        profile=config.get('tracing.profile', False),
+        profile_dir=config.get('tracing.profile_dir', DEFAULT_PROFILE_DIR),
+    )
+
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空操作阶段，所有调用都不做任何事"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_rows(self, rows: int) -> None:
+        pass
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """一个阶段的记录：墙钟时间、当前线程的 CPU 时间、处理行数和内存
+
+    内存记录阶段结束时的常驻内存（rss）、阶段内的变化（rss_delta，结束减开始）以及
+    进程的历史峰值（process_peak_rss）。同一线程中嵌套的阶段记录父阶段名称；
+    开启 profile 时只对线程最外层的阶段运行 cProfile。
+    """
+
+    __slots__ = ("name", "fields", "rows", "_wall", "_cpu", "_rss", "_parent", "_profiler")
+
+    def __init__(self, name: str, fields: Dict[str, Any]):
+        self.name = name
+        self.fields = fields
+        self.rows = fields.pop("rows", None)
+        self._profiler = None
+
+    def add_rows(self, rows: int) -> None:
+        self.rows = (self.rows or 0) + rows
+
+    def set(self, **fields: Any) -> None:
+        if "rows" in fields:
+            self.rows = fields.pop("rows")
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self._parent = stack[-1].name if stack else None
+        if _state["profile"] and not stack:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # 已有其它分析器在运行（如外部调试器）
+                self._profiler = None
+        stack.append(self)
+        self._rss = current_rss()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        _local.stack.pop()
+        rss = current_rss()
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "span": self.name,
+            "parent": self._parent,
+            "wall": round(wall, 6),
+            "cpu": round(cpu, 6),
+            "rows": self.rows,
+            "rss": rss,
+            "rss_delta": rss - self._rss if rss is not None and self._rss is not None else None,
+            "process_peak_rss": peak_rss(),
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+            "ok": exc_type is None,
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        if self.fields:
+            record["fields"] = self.fields
+        if self._profiler is not None:
+            self._profiler.disable()
+            record["profile"] = _dump_profile(self._profiler, self.name)
+        _record(record)
+        return False
+
+
+def span(name: str, **fields: Any):
+    """记录一个阶段，用法：
+
+    >>> with span("fuzzy_match_column", engine="cdist") as s:
+    ...     s.add_rows(len(df))
+
+    追踪关闭时返回共享的空操作对象，开销只有一次函数调用。
+    """
+    if not _state["enabled"]:
+        return _NOOP
+    return Span(name, fields)
+
+
+def traced(name: str, rows: Optional[Callable[[Any], int]] = None, fields: Sequence[str] = ()):
+    """函数装饰器：每次调用记录为一个阶段
+
+    :param name: 阶段名称
+    :param rows: 由返回值计算处理行数的函数，如 len
+    :param fields: 调用时以关键字传入、需要一起记录的参数名
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return func(*args, **kwargs)
+            with Span(name, {key: kwargs[key] for key in fields if key in kwargs}) as current:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    current.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def _dump_profile(profiler: cProfile.Profile, name: str) -> Optional[str]:
+    """保存 cProfile 结果，可用 pstats、snakeviz 等工具查看"""
+    directory = Path(_state["profile_dir"])
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{name}_{datetime.now():%Y%m%d_%H%M%S_%f}_{threading.get_ident()}.prof"
+        profiler.dump_stats(str(path))
+    except OSError:
+        return None
+    return str(path)
+
+
+def _record(record: Dict[str, Any]) -> None:
+    with _lock:
+        _recent.append(record)
+    if _logger.handlers:
+        _logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def recent_spans() -> List[Dict[str, Any]]:
+    """最近记录的阶段（最多 RECENT_SPANS 条）"""
+    with _lock:
+        return list(_recent)
+
+
+def clear() -> None:
+    with _lock:
+        _recent.clear()
+
+
+def summarize(spans: Optional[Iterable[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """按阶段名称汇总：次数、总耗时、平均和最长耗时、CPU 时间、行数、行/秒、
+    单次执行的最大内存增长和进程峰值内存
+
+    :param spans: 阶段记录，默认为最近记录的阶段
+    :return: 按总耗时从大到小排序的汇总
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for record in recent_spans() if spans is None else spans:
+        item = summary.setdefault(record["span"], {
+            "span": record["span"], "count": 0, "errors": 0, "wall": 0.0, "max_wall": 0.0, "cpu": 0.0,
+            "rows": 0, "max_rss_delta": None, "process_peak_rss": None,
+        })
+        item["count"] += 1
+        item["errors"] += 0 if record.get("ok", True) else 1
+        item["wall"] += record["wall"]
+        item["max_wall"] = max(item["max_wall"], record["wall"])
+        item["cpu"] += record["cpu"]
+        item["rows"] += record.get("rows") or 0
+        if record.get("rss_delta") is not None:
+            item["max_rss_delta"] = max(item["max_rss_delta"] or 0, record["rss_delta"])
+        if record.get("process_peak_rss") is not None:
+            item["process_peak_rss"] = max(item["process_peak_rss"] or 0, record["process_peak_rss"])
+    for item in summary.values():
+        item["mean_wall"] = item["wall"] / item["count"]
+        item["rows_per_s"] = item["rows"] / item["wall"] if item["rows"] and item["wall"] else None
+    return sorted(summary.values(), key=lambda item: item["wall"], reverse=True)
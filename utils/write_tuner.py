@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+DEFAULT_MIN_BATCH_SIZE = 100
+DEFAULT_MAX_BATCH_SIZE = 100000
+# 每次调整批大小的倍数
+DEFAULT_STEP = 1.5
+# 吞吐量下降超过该比例才反向调整，避免被单批的波动带偏
+TOLERANCE = 0.05
+# 单条语句最多使用 max_allowed_packet 的比例，为语句本身和转义留出余量
+PACKET_HEADROOM = 0.8
+
+
+class AdaptiveBatchSizer:
+    """按实测吞吐量自动调整写入批大小
+
+    每写完一批调用 record 记录行数、字节数和耗时，按爬山法调整下一批的大小：
+    吞吐量（行/秒）没有明显下降时沿当前方向继续放大或缩小，下降时反向。
+    批大小限制在 [min_size, max_size] 之间，并且估算的语句字节数不超过 max_bytes
+    （通常取 MySQL max_allowed_packet 的 80%）。
+
+    多个写入线程可共用同一个实例。
+
+    示例：
+    >>> sizer = AdaptiveBatchSizer(1000)
+    >>> size = sizer.size_for(row_bytes=200)
+    >>> sizer.record(size, size * 200, 0.05)
+    """
+
+    def __init__(
+            self,
+            initial: int,
+            min_size: int = DEFAULT_MIN_BATCH_SIZE,
+            max_size: int = DEFAULT_MAX_BATCH_SIZE,
+            max_bytes: Optional[int] = None,
+            step: float = DEFAULT_STEP,
+            on_batch: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        :param initial: 初始批大小（行）
+        :param min_size: 批大小下限
+        :param max_size: 批大小上限
+        :param max_bytes: 单批估算字节数上限
+        :param step: 每次调整的倍数
+        :param on_batch: 每批写入后以 snapshot() 结果调用的回调
+        """
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.max_bytes = max_bytes
+        self.step = step
+        self.on_batch = on_batch
+        self.initial = initial
+        self._lock = threading.Lock()
+        self._batches: List[Dict[str, float]] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._method: Optional[str] = None
+        self.restart(initial)
+
+    def restart(self, initial: int) -> None:
+        """从新的初始批大小重新开始调整，已记录的统计保留"""
+        with self._lock:
+            self._size = float(self._clamp(initial))
+            self._direction = 1
+            self._last_rate: Optional[float] = None
+
+    def use_method(self, method: str, initial: int) -> None:
+        """切换写入方式（如 LOAD DATA 回退为 INSERT）时从该方式的初始批大小重新调整，方式不变时保持当前大小"""
+        if method != self._method:
+            self._method = method
+            self.restart(initial)
+
+    def _clamp(self, size: float) -> int:
+        return int(min(max(size, self.min_size), self.max_size))
+
+    def limit_bytes(self, max_bytes: Optional[int]) -> None:
+        """设置单批字节数上限，传入 MySQL 的 max_allowed_packet 时自动留出余量"""
+        self.max_bytes = int(max_bytes * PACKET_HEADROOM) if max_bytes else None
+
+    def size_for(self, row_bytes: Optional[float] = None) -> int:
+        """下一批的行数，row_bytes 为每行的估算字节数"""
+        with self._lock:
+            if self._started is None:
+                self._started = time.perf_counter()
+            size = self._clamp(self._size)
+        if self.max_bytes and row_bytes:
+            # 字节上限优先于下限，单行超过上限时每批一行
+            size = min(size, max(1, int(self.max_bytes // row_bytes)))
+        return size
+
+    def record(self, rows: int, nbytes: int, seconds: float) -> None:
+        """记录一批的写入结果并调整下一批的大小"""
+        seconds = max(seconds, 1e-6)
+        rate = rows / seconds
+        with self._lock:
+            self._finished = time.perf_counter()
+            self._batches.append({
+                "size": rows,
+                "bytes": nbytes,
+                "seconds": seconds,
+                "rows_per_s": rate,
+            })
+            if self._last_rate is not None and rate < self._last_rate * (1 - TOLERANCE):
+                self._direction = -self._direction
+            self._last_rate = rate
+            factor = self.step if self._direction > 0 else 1 / self.step
+            self._size = min(max(self._size * factor, self.min_size), self.max_size)
+            # 到达边界后下一次从边界往回试探
+            if self._size in (self.min_size, self.max_size):
+                self._direction = 1 if self._size == self.min_size else -1
+        if self.on_batch:
+            self.on_batch(self.snapshot())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前累计的写入统计，速率按开始以来的墙钟时间计算（并行写入时即总吞吐量）"""
+        with self._lock:
+            rows = sum(b["size"] for b in self._batches)
+            nbytes = sum(b["bytes"] for b in self._batches)
+            if self._started is not None and self._finished is not None:
+                elapsed = max(self._finished - self._started, 1e-6)
+            else:
+                elapsed = 0.0
+            return {
+                "rows": rows,
+                "bytes": nbytes,
+                "seconds": round(elapsed, 3),
+                "rows_per_s": rows / elapsed if elapsed else 0.0,
+                "bytes_per_s": nbytes / elapsed if elapsed else 0.0,
+                "batch_size": self._clamp(self._size),
+                "batches": len(self._batches),
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        """本次写入的汇总，包括吞吐量最高的批大小，用于之后调整初始值和上下限"""
+        summary = self.snapshot()
+        with self._lock:
+            best = max(self._batches, key=lambda b: b["rows_per_s"], default=None)
+        summary.update({
+            "initial_batch_size": self.initial,
+            "min_batch_size": self.min_size,
+            "max_batch_size": self.max_size,
+            "max_bytes": self.max_bytes,
+            "best_batch_size": int(best["size"]) if best else None,
+            "best_rows_per_s": round(best["rows_per_s"], 1) if best else None,
+        })
+        summary["rows_per_s"] = round(summary["rows_per_s"], 1)
+        summary["bytes_per_s"] = round(summary["bytes_per_s"], 1)
+        return summary
+
+
+def format_throughput(stats: Dict[str, Any]) -> str:
+    """格式化为状态栏显示的吞吐量文本"""
+    return (
+        f"{stats['rows_per_s']:,.0f} 行/秒，{stats['bytes_per_s'] / 1024 / 1024:.2f} MB/秒，"
+        f"批大小 {stats['batch_size']}"
+    )
+
+
+def save_run_summary(summary: Dict[str, Any], path: Union[str, Path]) -> None:
+    """将一次写入的汇总追加到 JSON Lines 文件"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {"time": datetime.now().isoformat(timespec="seconds"), **summary}
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")